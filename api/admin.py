@@ -3,14 +3,16 @@ from .models import (
     Usuario, 
     Cuestionario, 
     Pregunta, 
-    RespuestaUsuario, 
+    RespuestaUsuario,
+    ResultadoCuestionario,
     DiarioEmocional, 
     RegistroEmocion,  
     Articulo,         
     Tip, 
     Ejercicio, 
     Publicacion,
-    Comentario
+    Comentario,
+    ResumenDiarioUsuario
 )
 
 # Registramos los modelos para que aparezcan en el panel
@@ -18,6 +20,7 @@ admin.site.register(Usuario)
 admin.site.register(DiarioEmocional)
 admin.site.register(Cuestionario)
 admin.site.register(Pregunta)
+admin.site.register(ResultadoCuestionario)
 admin.site.register(RespuestaUsuario)
 
 @admin.register(RegistroEmocion)
@@ -31,4 +34,5 @@ admin.site.register(Articulo)
 admin.site.register(Tip)
 admin.site.register(Ejercicio)
 admin.site.register(Publicacion)
-admin.site.register(Comentario)
\ No newline at end of file
+admin.site.register(Comentario)
+admin.site.register(ResumenDiarioUsuario)
\ No newline at end of file
@@ -0,0 +1,146 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Usuario, UsuarioToken
+
+
+# --- AUTENTICACIÓN JWT SIN CONSULTA POR PETICIÓN ---
+# JWTAuthentication de simplejwt hace un SELECT de Usuario en cada petición, aunque la
+# vista solo lea el catálogo. Aquí el usuario se arma con los claims del token y solo
+# se consulta la base, como mucho una vez cada JWT_ESTADO_USUARIO_TTL segundos por
+# usuario y proceso, para comprobar que sigue activo, que su contraseña no cambió
+# (los tokens llevan el hash de la contraseña, ver SIMPLE_JWT['CHECK_REVOKE_TOKEN']) y
+# si sigue siendo staff. El claim is_staff del token es solo informativo para el
+# frontend: un refresh token vive días y quitarle el staff a alguien no puede esperar.
+
+CLAIMS_USUARIO = ('seudonimo', 'is_staff')
+
+
+class TokenUsuario(RefreshToken):
+    """RefreshToken que además lleva seudonimo e is_staff; el access token los copia."""
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in CLAIMS_USUARIO:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class EstadoUsuarios:
+    """
+    Caché en memoria del proceso: usuario -> (is_active, huella de la contraseña, is_staff).
+    Acotada a `maximo` entradas; cuando se llena se descarta entera.
+    """
+    def __init__(self, maximo=10000):
+        self.maximo = maximo
+        self.entradas = {}
+        self.lock = threading.Lock()
+
+    def obtener(self, usuario_id, refrescar=False):
+        entrada = None if refrescar else self._vigente(usuario_id)
+        if entrada is not None:
+            return entrada[1]
+        fila = Usuario.objects.filter(pk=usuario_id).values_list('is_active', 'password', 'is_staff').first()
+        return self._recordar(usuario_id, fila)
+
+    async def aobtener(self, usuario_id, refrescar=False):
+        """Igual que obtener(), con el ORM asíncrono (vistas de api/vistas_async.py)."""
+        entrada = None if refrescar else self._vigente(usuario_id)
+        if entrada is not None:
+            return entrada[1]
+        fila = await Usuario.objects.filter(pk=usuario_id).values_list('is_active', 'password', 'is_staff').afirst()
+        return self._recordar(usuario_id, fila)
+
+    def _vigente(self, usuario_id):
+        entrada = self.entradas.get(usuario_id)
+        if entrada is not None and entrada[0] > time.monotonic():
+            return entrada
+        return None
+
+    def _recordar(self, usuario_id, fila):
+        estado = None if fila is None else (fila[0], get_md5_hash_password(fila[1]), fila[2])
+        with self.lock:
+            if len(self.entradas) >= self.maximo:
+                self.entradas.clear()
+            self.entradas[usuario_id] = (time.monotonic() + settings.JWT_ESTADO_USUARIO_TTL, estado)
+        return estado
+
+    def olvidar(self, usuario_id=None):
+        with self.lock:
+            if usuario_id is None:
+                self.entradas.clear()
+            else:
+                self.entradas.pop(usuario_id, None)
+
+
+estado_usuarios = EstadoUsuarios()
+
+
+def usuario_desde_token(token, is_staff):
+    """
+    UsuarioToken con id, los claims del token e is_staff de EstadoUsuarios (no del
+    token); los demás campos quedan diferidos.
+    """
+    conocidos = {'id': uuid.UUID(str(token[jwt_settings.USER_ID_CLAIM])), 'is_active': True}
+    for claim in CLAIMS_USUARIO:
+        if claim in token:  # tokens emitidos antes de agregar los claims
+            conocidos[claim] = token[claim]
+    conocidos['is_staff'] = is_staff
+    campos = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in conocidos]
+    return UsuarioToken.from_db('default', campos, [conocidos[campo] for campo in campos])
+
+
+class JWTAutenticacionSinConsulta(JWTAuthentication):
+    def get_user(self, validated_token):
+        usuario_id, revocacion = self._claims(validated_token)
+        estado = estado_usuarios.obtener(usuario_id)
+        if self._huella_distinta(estado, revocacion):
+            # El token puede ser más nuevo que lo recordado (p. ej. el login regeneró el
+            # hash con otro hasher, ver api/hashers.py): se confirma contra la base
+            estado = estado_usuarios.obtener(usuario_id, refrescar=True)
+        return self._verificar(validated_token, estado, revocacion)
+
+    async def aauthenticate(self, request):
+        """authenticate() para vistas async: mismo resultado, sin bloquear el event loop."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        usuario_id, revocacion = self._claims(validated_token)
+        estado = await estado_usuarios.aobtener(usuario_id)
+        if self._huella_distinta(estado, revocacion):
+            estado = await estado_usuarios.aobtener(usuario_id, refrescar=True)
+        return self._verificar(validated_token, estado, revocacion)
+
+    def _claims(self, validated_token):
+        if jwt_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        return str(validated_token[jwt_settings.USER_ID_CLAIM]), validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM)
+
+    def _huella_distinta(self, estado, revocacion):
+        return estado is not None and jwt_settings.CHECK_REVOKE_TOKEN and revocacion != estado[1]
+
+    def _verificar(self, validated_token, estado, revocacion):
+        if estado is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        activo, huella, is_staff = estado
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not activo:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if jwt_settings.CHECK_REVOKE_TOKEN and revocacion != huella:
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return usuario_desde_token(validated_token, is_staff)
@@ -0,0 +1,91 @@
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Left
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.pagination import PageNumberPagination
+
+
+# --- BÚSQUEDA DE TEXTO COMPLETO ---
+# En Postgres, Articulo y Publicacion tienen una columna `busqueda` (tsvector) que
+# mantiene un trigger (ver migración 0013) con índice GIN y la configuración
+# 'spanish_unaccent' (stemming en español + sin tildes). Los resultados se ordenan por
+# SearchRank y traen un fragmento resaltado con SearchHeadline.
+# Con otros motores (SQLite en desarrollo/tests) se usa un respaldo simple con icontains.
+
+CONFIG_BUSQUEDA = 'spanish_unaccent'
+LARGO_FRAGMENTO = 200
+
+
+class BusquedaTextoCompleto(BaseFilterBackend):
+    """
+    Filtro de DRF para ?search=. La vista define:
+    - campos_busqueda: campos de texto del respaldo simple (en orden de importancia)
+    - campo_fragmento: campo del que se extrae el fragmento resaltado
+    """
+    search_param = 'search'
+
+    def get_termino(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        termino = self.get_termino(request)
+        if not termino:
+            return queryset
+        if connection.vendor == 'postgresql':
+            return self.buscar_postgres(queryset, termino, view)
+        return self.buscar_simple(queryset, termino, view)
+
+    def buscar_postgres(self, queryset, termino, view):
+        consulta = SearchQuery(termino, config=CONFIG_BUSQUEDA, search_type='websearch')
+        return queryset.filter(busqueda=consulta).annotate(
+            relevancia=SearchRank(F('busqueda'), consulta),
+            fragmento=SearchHeadline(
+                view.campo_fragmento, consulta, config=CONFIG_BUSQUEDA,
+                start_sel='<mark>', stop_sel='</mark>', max_words=35, min_words=15,
+            ),
+        ).order_by('-relevancia', '-pk')
+
+    def buscar_simple(self, queryset, termino, view):
+        filtro = Q()
+        for palabra in termino.split():
+            coincide = Q()
+            for campo in view.campos_busqueda:
+                coincide |= Q(**{f'{campo}__icontains': palabra})
+            filtro &= coincide
+        return queryset.filter(filtro).annotate(
+            relevancia=Value(1.0, output_field=FloatField()),
+            fragmento=Left(view.campo_fragmento, LARGO_FRAGMENTO),
+        ).order_by('-pk')
+
+
+class BusquedaPaginacion(PageNumberPagination):
+    """
+    Los resultados por relevancia no tienen una clave estable para un cursor; se
+    paginan por número de página (las búsquedas rara vez pasan de las primeras).
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+class BusquedaMixin:
+    """Cambia serializador y paginación cuando la petición trae ?search=."""
+    serializer_busqueda_class = None
+
+    def es_busqueda(self):
+        return bool(BusquedaTextoCompleto().get_termino(self.request))
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and self.es_busqueda():
+            return self.serializer_busqueda_class
+        return super().get_serializer_class()
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.es_busqueda():
+                self._paginator = BusquedaPaginacion()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
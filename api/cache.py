@@ -0,0 +1,184 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+# --- CACHÉ VERSIONADA DEL CATÁLOGO ---
+# Artículos, tips, ejercicios y cuestionarios son datos de referencia que solo cambian
+# desde el admin. Cada catálogo tiene un contador de generación que forma parte de la
+# clave; al guardar o borrar cualquier fila (ver signals.py) el contador sube y las
+# entradas viejas quedan inalcanzables sin necesidad de borrar nada.
+
+def _clave_generacion(catalogo):
+    return f'catalogo:{catalogo}:gen'
+
+
+def _clave_modificado(catalogo):
+    return f'catalogo:{catalogo}:modificado'
+
+
+def generacion(catalogo):
+    # Si la clave se perdió (reinicio, desalojo LRU) se parte de la hora actual en vez
+    # de 1, para no volver a una generación ya usada y servir datos viejos.
+    valor = cache.get(_clave_generacion(catalogo))
+    if valor is None:
+        if cache.add(_clave_generacion(catalogo), time.time_ns(), timeout=None):
+            # Generación nueva: lo que el cliente tenga es, como mucho, de antes de ahora
+            _marcar_modificado(catalogo)
+        valor = cache.get(_clave_generacion(catalogo))
+    return valor
+
+
+def invalidar(catalogo):
+    """Sube la generación del catálogo: todo lo cacheado antes deja de usarse."""
+    try:
+        cache.incr(_clave_generacion(catalogo))
+    except ValueError:
+        cache.set(_clave_generacion(catalogo), time.time_ns(), timeout=None)
+    _marcar_modificado(catalogo)
+
+
+def _marcar_modificado(catalogo):
+    # Last-Modified tiene resolución de segundos: dos cambios en el mismo segundo deben
+    # dar fechas distintas, si no un If-Modified-Since del primero validaría el segundo
+    anterior = cache.get(_clave_modificado(catalogo), 0)
+    cache.set(_clave_modificado(catalogo), max(int(time.time()), anterior + 1), timeout=None)
+
+
+def modificado(catalogo):
+    """Segundos epoch del último cambio en el catálogo (altas, ediciones y bajas), o None."""
+    return cache.get(_clave_modificado(catalogo))
+
+
+def clave(catalogo, *partes):
+    resumen = hashlib.md5('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+    return f'catalogo:{catalogo}:{generacion(catalogo)}:{resumen}'
+
+
+def clave_peticion(catalogo, request):
+    """
+    Clave por URL: incluye filtros (?categoria=), búsqueda y cursor de paginación, y el
+    esquema y el host porque los enlaces 'next'/'previous' del cuerpo son absolutos.
+    """
+    parametros = sorted(request.query_params.lists())
+    return clave(catalogo, request.scheme, request.get_host(), request.path, parametros)
+
+
+# Versiones asíncronas para las vistas de api/vistas_async.py (misma clave, misma generación)
+
+async def ageneracion(catalogo):
+    valor = await cache.aget(_clave_generacion(catalogo))
+    if valor is None:
+        if await cache.aadd(_clave_generacion(catalogo), time.time_ns(), timeout=None):
+            await _amarcar_modificado(catalogo)
+        valor = await cache.aget(_clave_generacion(catalogo))
+    return valor
+
+
+async def _amarcar_modificado(catalogo):
+    anterior = await cache.aget(_clave_modificado(catalogo), 0)
+    await cache.aset(_clave_modificado(catalogo), max(int(time.time()), anterior + 1), timeout=None)
+
+
+async def aclave(catalogo, *partes):
+    resumen = hashlib.md5('|'.join(str(parte) for parte in partes).encode()).hexdigest()
+    return f'catalogo:{catalogo}:{await ageneracion(catalogo)}:{resumen}'
+
+
+def segundos_hasta_medianoche():
+    """Segundos que faltan para el próximo cambio de día en TIME_ZONE."""
+    ahora = timezone.localtime()
+    manana = timezone.make_aware(datetime.combine(ahora.date() + timedelta(days=1), datetime.min.time()))
+    return max(int((manana - ahora).total_seconds()), 1)
+
+
+class CatalogoCacheMixin:
+    """
+    Mixin para vistas GET de solo lectura sobre el catálogo. Guarda en caché el
+    payload ya serializado (response.data) y lo devuelve sin tocar la base de datos.
+    """
+    catalogo = None
+
+    def get(self, request, *args, **kwargs):
+        key = clave_peticion(self.catalogo, request)
+        datos = cache.get(key)
+        if datos is not None:
+            return Response(datos)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOGO_CACHE_TIMEOUT)
+        return response
+
+
+# --- PETICIONES CONDICIONALES (ETag / Last-Modified / 304) ---
+
+class RespuestaCondicionalMixin:
+    """
+    Añade ETag y Last-Modified a una vista GET y responde 304 si el cliente ya tiene
+    la versión actual (If-None-Match / If-Modified-Since), antes de serializar nada.
+
+    Los validadores salen de una sola agregación (fecha más reciente + cantidad de filas)
+    sobre el queryset filtrado. En las vistas del catálogo se guardan en caché por
+    generación, así que revalidar no consulta la base mientras nada cambie.
+
+    Last-Modified solo se envía si hay una fecha que cambia con cualquier escritura,
+    bajas incluidas: la del último cambio del catálogo (ver invalidar). La fecha más
+    reciente de las filas no sirve (editar sin tocarla o borrar una fila no la cambia),
+    así que las vistas por usuario solo validan con ETag.
+    """
+    campo_fecha = None
+
+    def get(self, request, *args, **kwargs):
+        ultima, firma = self.validadores_cacheados()
+        etag = quote_etag(hashlib.md5(f'{ultima}|{firma}'.encode()).hexdigest())
+        last_modified = self.ultima_modificacion()
+
+        no_modificado = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if no_modificado is not None:
+            return no_modificado
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def ultima_modificacion(self):
+        catalogo = getattr(self, 'catalogo', None)
+        return modificado(catalogo) if catalogo is not None else None
+
+    def validadores_cacheados(self):
+        catalogo = getattr(self, 'catalogo', None)
+        if catalogo is None:
+            return self.validadores()
+        key = clave(catalogo, 'validadores', self.request.path, sorted(self.request.query_params.lists()))
+        valores = cache.get(key)
+        if valores is None:
+            valores = self.validadores()
+            cache.set(key, valores, settings.CATALOGO_CACHE_TIMEOUT)
+        return valores
+
+    def validadores(self):
+        """Devuelve (fecha más reciente o None, firma con el resto de datos que definen la versión)."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        if lookup in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup]})
+        datos = queryset.order_by().aggregate(ultima=Max(self.campo_fecha), total=Count('pk'))
+        catalogo = getattr(self, 'catalogo', None)
+        if catalogo is not None:
+            # Las ediciones no cambian la fecha de publicación; la generación sí
+            return datos['ultima'], [datos['total'], generacion(catalogo)]
+        # Datos por usuario (ej: diario): la versión de un usuario no vale para otro
+        return datos['ultima'], [datos['total'], getattr(self.request.user, 'pk', None)]
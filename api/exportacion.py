@@ -0,0 +1,108 @@
+import csv
+import heapq
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+
+from .models import DiarioEmocional, RegistroEmocion, RespuestaUsuario, EjercicioCompletado
+
+
+# --- EXPORTACIÓN DEL HISTORIAL COMPLETO ---
+# GET /api/v1/export/ devuelve todo lo que el usuario registró (diario, emociones,
+# respuestas a cuestionarios y ejercicios completados) en una sola línea de tiempo.
+# Cada modelo se lee con .iterator(chunk_size) en orden de fecha (usando los índices
+# usuario+fecha) y heapq.merge los intercala en una pasada: en memoria solo hay un
+# lote por modelo, sin importar cuánto historial tenga el usuario.
+# Con DISABLE_SERVER_SIDE_CURSORS (DB_PGBOUNCER=1) .iterator() no tiene cursor del
+# servidor y psycopg trae el resultado entero; ahí cada modelo se lee en páginas de
+# CHUNK_SIZE filas por keyset (fecha, id), cada una en su propia consulta.
+# Bajo ASGI, Django junta en memoria todo lo que devuelve un iterador síncrono antes de
+# enviarlo; ahí la vista entrega las líneas con en_lotes_async().
+
+CHUNK_SIZE = 500
+
+# tipo -> (queryset por usuario, campo de fecha, columnas exportadas)
+FUENTES = {
+    'diario': (
+        lambda usuario: DiarioEmocional.objects.filter(usuario=usuario),
+        'fecha_entrada', ['id', 'titulo', 'contenido', 'humor'],
+    ),
+    'emocion': (
+        lambda usuario: RegistroEmocion.objects.filter(usuario=usuario),
+        'fecha_registro', ['id', 'emocion', 'intensidad', 'nota'],
+    ),
+    'respuesta': (
+        lambda usuario: RespuestaUsuario.objects.filter(usuario=usuario),
+        'fecha_respuesta', ['id', 'pregunta__cuestionario__nombre', 'pregunta__texto', 'valor_respuesta'],
+    ),
+    'ejercicio': (
+        lambda usuario: EjercicioCompletado.objects.filter(usuario=usuario),
+        'fecha_completado', ['id', 'ejercicio__titulo'],
+    ),
+}
+
+# Columnas del CSV: la unión de todas, en este orden (las que no aplican quedan vacías)
+COLUMNAS = ['tipo', 'fecha']
+for _, _, _columnas in FUENTES.values():
+    COLUMNAS += [columna for columna in _columnas if columna not in COLUMNAS]
+
+
+def _registros(tipo, usuario):
+    consulta, campo_fecha, columnas = FUENTES[tipo]
+    filas = consulta(usuario).order_by(campo_fecha, 'pk').values(campo_fecha, *columnas)
+    if connections[filas.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        filas = _por_paginas(filas, campo_fecha)
+    else:
+        filas = filas.iterator(chunk_size=CHUNK_SIZE)
+    for fila in filas:
+        yield {'tipo': tipo, 'fecha': fila.pop(campo_fecha), **fila}
+
+
+def _por_paginas(filas, campo_fecha):
+    """WHERE (fecha, id) > (última entregada) ORDER BY fecha, id LIMIT CHUNK_SIZE, hasta agotar."""
+    pagina = list(filas[:CHUNK_SIZE])
+    while pagina:
+        fecha, pk = pagina[-1][campo_fecha], pagina[-1]['id']
+        yield from pagina
+        if len(pagina) < CHUNK_SIZE:
+            return
+        siguientes = filas.filter(Q(**{f'{campo_fecha}__gt': fecha}) | Q(**{campo_fecha: fecha, 'pk__gt': pk}))
+        pagina = list(siguientes[:CHUNK_SIZE])
+
+
+def historial(usuario):
+    """Todos los registros del usuario, de todos los tipos, ordenados por fecha."""
+    return heapq.merge(*(_registros(tipo, usuario) for tipo in FUENTES), key=lambda registro: registro['fecha'])
+
+
+def como_ndjson(registros):
+    for registro in registros:
+        yield json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+class _Eco:
+    """Buffer que devuelve lo que se le escribe: csv.writer sin acumular nada."""
+    def write(self, valor):
+        return valor
+
+
+def como_csv(registros):
+    escritor = csv.DictWriter(_Eco(), fieldnames=COLUMNAS)
+    yield escritor.writeheader()
+    for registro in registros:
+        registro['fecha'] = registro['fecha'].isoformat()
+        yield escritor.writerow(registro)
+
+
+async def en_lotes_async(lineas):
+    """
+    Las líneas de un generador síncrono como iterador async, de a CHUNK_SIZE por salto
+    al hilo síncrono (el mismo siempre: el cursor de la base es de ese hilo).
+    """
+    siguiente_lote = sync_to_async(lambda: ''.join(islice(lineas, CHUNK_SIZE)), thread_sensitive=True)
+    while lote := await siguiente_lote():
+        yield lote
@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import ScryptPasswordHasher
+
+
+# --- HASH DE CONTRASEÑAS EN UN POOL DE PROCESOS ---
+# scrypt es costoso en memoria (128 * r * n bytes por hash), lo que encarece los ataques
+# con GPU. Calcularlo es puro CPU: si se hace en el hilo del worker WSGI, un pico de
+# registros/logins deja a todos los workers ocupados hasheando. Aquí el cálculo va a un
+# pool de HASH_PROCESOS procesos y el hilo de la petición solo espera el resultado; un
+# semáforo limita cuántos hashes hay en vuelo para no encolar sin límite.
+# Los hashes viejos (PBKDF2 o scrypt con otros parámetros) se regeneran solos en el
+# siguiente login: Django llama a must_update() al verificar la contraseña.
+
+def _scrypt(password, salt, n, r, p, maxmem):
+    # Se ejecuta en el proceso hijo: solo hashlib, nada de Django
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=64)
+
+
+class PoolHash:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.en_vuelo = None
+        self.pid = None
+
+    def _iniciar(self):
+        procesos = settings.HASH_PROCESOS
+        # 'spawn': los hijos no heredan conexiones a la base ni hilos del worker
+        self.executor = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'))
+        self.en_vuelo = threading.BoundedSemaphore(procesos * 2)
+        self.pid = os.getpid()
+
+    def calcular(self, *argumentos):
+        if not settings.HASH_PROCESOS:
+            return _scrypt(*argumentos)
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                self._iniciar()
+            executor, en_vuelo = self.executor, self.en_vuelo
+        with en_vuelo:
+            try:
+                return executor.submit(_scrypt, *argumentos).result()
+            except BrokenProcessPool:
+                # Un hijo murió (OOM, kill): se recrea el pool en la próxima llamada
+                with self.lock:
+                    if self.executor is executor:
+                        self.executor = None
+                return _scrypt(*argumentos)
+
+
+pool_hash = PoolHash()
+
+
+class ScryptEnPoolPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt con n=2^15, r=8, p=3 (32 MiB por hash, una de las configuraciones
+    recomendadas por OWASP) calculado en pool_hash. Usa el mismo formato y nombre de
+    algoritmo que el ScryptPasswordHasher de Django, así que los hashes son intercambiables.
+    """
+    work_factor = 2**15
+    block_size = 8
+    parallelism = 3
+    maxmem = 64 * 1024 * 1024
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = pool_hash.calcular(password.encode(), salt.encode(), n, r, p, self.maxmem)
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+
+from . import popularidad
+from .models import Publicacion
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- LIKES DIFERIDOS (WRITE-BEHIND) ---
+# Con settings.LIKES_BUFFER activo, ToggleLikeView no toca la base: cada toggle queda
+# en la caché 'likes' y responde al instante con un conteo optimista. `vaciar()` (el
+# comando `manage.py vaciar_likes` o un hilo por proceso, ver LIKES_BUFFER_HILO) lleva
+# lo acumulado a la tabla de likes con bulk_create/delete por lotes y recalcula
+# num_likes y puntaje_popular de las publicaciones tocadas.
+#
+# Claves (todas con operaciones atómicas de la API de caché: add/incr):
+#   estado:{pub}:{usuario}  contador de toggles; impar = tiene like. Se inicializa
+#                           con el estado en la base la primera vez.
+#   log:n / log:{i}         registro secuencial de toggles (pub, usuario, estado, signo)
+#   log:hecho               último registro ya llevado a la base
+#   delta:{pub}             likes todavía no llevados a la base (para el conteo optimista)
+
+Like = Publicacion.likes.through
+
+# Un registro reservado (incr de log:n) pero aún no escrito se espera este tiempo antes
+# de darlo por perdido (el proceso que lo reservó murió entre el incr y el set)
+SEGUNDOS_HUECO = 30
+SEGUNDOS_BLOQUEO = 60
+
+
+def _cache():
+    return caches['likes']
+
+
+def _incr(almacen, clave, delta=1, timeout=None):
+    almacen.add(clave, 0, timeout=timeout)
+    return almacen.incr(clave, delta)
+
+
+def alternar(publicacion_id, usuario_id):
+    """Registra un toggle sin tocar la base (salvo la primera vez por usuario). Devuelve si quedó con like."""
+    almacen = _cache()
+    clave = f'estado:{publicacion_id}:{usuario_id}'
+    if almacen.get(clave) is None:
+        tenia_like = Like.objects.filter(publicacion_id=publicacion_id, usuario_id=usuario_id).exists()
+        almacen.add(clave, int(tenia_like), timeout=settings.LIKES_BUFFER_TTL)
+    estado = almacen.incr(clave)
+    liked = estado % 2 == 1
+    signo = 1 if liked else -1
+
+    # log:n y log:hecho no vencen: si se perdieran, el vaciador dejaría de avanzar
+    i = _incr(almacen, 'log:n')
+    almacen.set(f'log:{i}', (publicacion_id, usuario_id, estado, signo), timeout=settings.LIKES_BUFFER_TTL)
+    _incr(almacen, f'delta:{publicacion_id}', signo, timeout=settings.LIKES_BUFFER_TTL)
+    return liked
+
+
+def pendientes(publicacion_id):
+    """Likes de la publicación que todavía no están en num_likes (puede ser negativo)."""
+    return _cache().get(f'delta:{publicacion_id}', 0)
+
+
+class Vaciador:
+    """Lleva los toggles acumulados a la base. Una sola instancia vacía a la vez (bloqueo en la caché)."""
+
+    def __init__(self, lote=1000):
+        self.lote = lote
+        self.hueco = None  # (índice, desde cuándo falta)
+
+    def vaciar(self):
+        """Procesa hasta `lote` registros; devuelve cuántos procesó."""
+        almacen = _cache()
+        if not almacen.add('vaciado:bloqueo', 1, timeout=SEGUNDOS_BLOQUEO):
+            return 0
+        try:
+            return self._vaciar(almacen)
+        finally:
+            almacen.delete('vaciado:bloqueo')
+
+    def vaciar_todo(self):
+        total = 0
+        while procesados := self.vaciar():
+            total += procesados
+        return total
+
+    def _vaciar(self, almacen):
+        hecho = almacen.get('log:hecho', 0)
+        ultimo = min(almacen.get('log:n', 0), hecho + self.lote)
+        claves = [f'log:{i}' for i in range(hecho + 1, ultimo + 1)]
+        guardados = almacen.get_many(claves)
+
+        registros = []
+        for i, clave in enumerate(claves, start=hecho + 1):
+            if clave in guardados:
+                registros.append(guardados[clave])
+            elif self._esperar_hueco(i):
+                ultimo = i - 1
+                break
+        if ultimo <= hecho:
+            return 0
+
+        # Estado final por (publicación, usuario): el contador vigente manda; si ya
+        # venció, el mayor visto en los registros
+        estados = {}
+        deltas = defaultdict(int)
+        for publicacion_id, usuario_id, estado, signo in registros:
+            par = (publicacion_id, usuario_id)
+            estados[par] = max(estados.get(par, 0), estado)
+            deltas[publicacion_id] += signo
+        vigentes = almacen.get_many([f'estado:{p}:{u}' for p, u in estados])
+        for (publicacion_id, usuario_id), estado in estados.items():
+            estados[publicacion_id, usuario_id] = vigentes.get(f'estado:{publicacion_id}:{usuario_id}', estado)
+
+        with transaction.atomic():
+            self._aplicar(estados)
+        for publicacion_id, delta in deltas.items():
+            if delta:
+                _incr(almacen, f'delta:{publicacion_id}', -delta, timeout=settings.LIKES_BUFFER_TTL)
+        almacen.set('log:hecho', ultimo, timeout=None)
+        almacen.delete_many(claves[:ultimo - hecho])
+        return ultimo - hecho
+
+    def _esperar_hueco(self, i):
+        """True si hay que cortar antes del registro i (todavía no se escribió)."""
+        if self.hueco is None or self.hueco[0] != i:
+            self.hueco = (i, time.monotonic())
+        if time.monotonic() - self.hueco[1] < SEGUNDOS_HUECO:
+            return True
+        logger.warning('Registro de like %s perdido; se omite.', i)
+        return False
+
+    def _aplicar(self, estados):
+        con_like, sin_like = defaultdict(list), defaultdict(list)
+        for (publicacion_id, usuario_id), estado in estados.items():
+            (con_like if estado % 2 == 1 else sin_like)[publicacion_id].append(usuario_id)
+        por_publicacion = con_like.keys() | sin_like.keys()
+
+        existentes = set(Publicacion.objects.filter(pk__in=por_publicacion).values_list('pk', flat=True))
+        nuevos = []
+        for publicacion_id in existentes:  # las borradas mientras tanto se ignoran
+            nuevos += [Like(publicacion_id=publicacion_id, usuario_id=u) for u in con_like[publicacion_id]]
+            if sin_like[publicacion_id]:
+                Like.objects.filter(publicacion_id=publicacion_id, usuario_id__in=sin_like[publicacion_id]).delete()
+        Like.objects.bulk_create(nuevos, ignore_conflicts=True, batch_size=self.lote)
+
+        # num_likes se recalcula desde la tabla (queda exacto aunque se repita un lote)
+        publicaciones = list(
+            Publicacion.objects.con_conteos_reales().filter(pk__in=existentes).select_for_update()
+            .only('num_likes', 'num_comentarios', 'fecha_creacion')
+        )
+        for publicacion in publicaciones:
+            publicacion.num_likes = publicacion.likes_reales
+            publicacion.puntaje_popular = popularidad.puntaje(
+                publicacion.num_likes, publicacion.num_comentarios, publicacion.fecha_creacion,
+            )
+        Publicacion.objects.bulk_update(publicaciones, ['num_likes', 'puntaje_popular'])
+
+
+# --- HILO VACIADOR (opcional, uno por proceso) ---
+_hilo = None
+_hilo_lock = threading.Lock()
+
+
+def _bucle(intervalo):
+    vaciador = Vaciador()
+    while True:
+        time.sleep(intervalo)
+        try:
+            vaciador.vaciar_todo()
+        except Exception:
+            logger.exception('Error al vaciar los likes diferidos')
+        finally:
+            close_old_connections()
+
+
+def asegurar_hilo():
+    """Arranca el hilo vaciador de este proceso si settings.LIKES_BUFFER_HILO está activo."""
+    global _hilo
+    if not settings.LIKES_BUFFER_HILO or _hilo is not None:
+        return
+    with _hilo_lock:
+        if _hilo is None:
+            _hilo = threading.Thread(
+                target=_bucle, args=(settings.LIKES_BUFFER_INTERVALO,), name='vaciar-likes', daemon=True,
+            )
+            _hilo.start()
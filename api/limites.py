@@ -0,0 +1,86 @@
+import math
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+# --- LÍMITE DE PETICIONES (TOKEN BUCKET) ---
+# Las vistas que escriben declaran un `throttle_scope` (registro, publicaciones,
+# comentarios, likes) y su tasa va en REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] con el
+# formato de DRF: '30/min' = balde de 30 tokens que se rellena a 30 por minuto.
+# Solo se limitan los métodos que escriben; las lecturas no gastan tokens.
+#
+# El balde se guarda como GCRA: un único entero por usuario y scope con el momento
+# (en ms) en que el balde vuelve a estar lleno. Cada petición lo lee y hace como mucho
+# una escritura atómica:
+#   - balde con tokens: cache.incr de un intervalo; decide el valor que devuelve incr,
+#     así dos peticiones simultáneas no pueden gastar el mismo token;
+#   - balde lleno (nuevo, vencido o ya rellenado): cache.set a ahora + intervalo. Dos
+#     peticiones simultáneas aquí pueden quedar contadas como una (a favor del cliente);
+#   - sin tokens: no escribe nada, el rechazo no gasta.
+# Sin consultas a la base: el usuario sale del token (api/autenticacion.py).
+# Las cabeceras RateLimit-* las agrega CabecerasLimiteMiddleware (api/middleware.py).
+
+# Cuánto se conserva un balde sin uso; vencido equivale a un balde lleno
+SEGUNDOS_CLAVE = 60 * 60 * 24
+
+
+class BaldeTokensThrottle(BaseThrottle):
+    cache = default_cache
+    timer = time.time
+    duraciones = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope is None or request.method in SAFE_METHODS:
+            return True
+        capacidad, periodo = self.parse_rate(scope)
+        ident = request.user.pk if request.user.is_authenticated else self.get_ident(request)
+        clave = f'balde:{scope}:{ident}'
+
+        # Todo en milisegundos enteros (incr solo suma enteros)
+        periodo = periodo * 1000
+        intervalo = periodo // capacidad
+        ahora = int(self.timer() * 1000)
+        lleno_en, permitida = self._consumir(clave, intervalo, periodo, ahora)
+
+        if not permitida:
+            self.espera = (lleno_en - ahora - periodo + intervalo) / 1000
+        request._request.limite_tasa = {
+            'limite': capacidad,
+            'restantes': max((periodo - (lleno_en - ahora)) // intervalo, 0),
+            'reinicio': math.ceil(max(lleno_en - ahora, 0) / 1000),
+        }
+        return permitida
+
+    def _consumir(self, clave, intervalo, periodo, ahora):
+        """Gasta un token si hay. Devuelve (momento en que el balde estará lleno, si se permitió)."""
+        lleno_en = self.cache.get(clave)
+        if lleno_en is not None and lleno_en >= ahora:
+            if lleno_en + intervalo - ahora > periodo:
+                return lleno_en, False
+            try:
+                lleno_en = self.cache.incr(clave, intervalo)
+                # Si otra petición se llevó el último token entre el get y el incr, el
+                # intervalo queda gastado: como mucho uno de más por carrera
+                return lleno_en, lleno_en - ahora <= periodo
+            except ValueError:
+                pass  # venció entre el get y el incr
+        lleno_en = ahora + intervalo
+        self.cache.set(clave, lleno_en, timeout=SEGUNDOS_CLAVE)
+        return lleno_en, True
+
+    def parse_rate(self, scope):
+        try:
+            tasa = api_settings.DEFAULT_THROTTLE_RATES[scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No hay tasa configurada para el scope '{scope}'.")
+        cantidad, periodo = tasa.split('/')
+        return int(cantidad), self.duraciones[periodo[0]]
+
+    def wait(self):
+        return math.ceil(self.espera)
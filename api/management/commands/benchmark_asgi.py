@@ -0,0 +1,114 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from api.autenticacion import TokenUsuario
+from api.models import Usuario
+
+
+# Pares (vista síncrona de DRF, versión async de api/vistas_async.py)
+RUTAS = [
+    ('tips/dia/', 'async/tips/dia/'),
+    ('contenido/articulos/', 'async/contenido/articulos/'),
+    ('foro/publicaciones/', 'async/foro/publicaciones/'),
+    ('user/me/', 'async/user/me/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga contra un servidor ya levantado, por ejemplo:\n"
+        "  uvicorn menteabierta.asgi:application --workers 4\n"
+        "Compara cada lectura síncrona con su versión async manteniendo --conexiones "
+        "conexiones keep-alive abiertas durante --segundos. Crea (o reusa) un usuario de prueba "
+        "en la base del servidor para firmar el token; las respuestas distintas de 200 "
+        "(p. ej. tips/dia/ sin tips cargados) cuentan como errores. Solo usa la biblioteca estándar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/v1/')
+        parser.add_argument('--conexiones', type=int, default=500)
+        parser.add_argument('--segundos', type=float, default=15)
+
+    def handle(self, *args, url, conexiones, segundos, **options):
+        if not url.endswith('/'):
+            url += '/'
+        token = self.crear_usuario()
+        for sincrona, asincrona in RUTAS:
+            for ruta in (sincrona, asincrona):
+                resultado = asyncio.run(self.cargar(url + ruta, token, conexiones, segundos))
+                self.stdout.write(f'{ruta:32} ' + resultado)
+
+    def crear_usuario(self):
+        # Con el ORM y no con /auth/registro/: el registro tiene límite por IP y cada
+        # corrida gastaría un token. Se crea en la misma base que usa el servidor.
+        usuario, _ = Usuario.objects.get_or_create(
+            email='carga@menteabierta.test', defaults={'password': make_password(None)},  # sin login posible
+        )
+        return str(TokenUsuario.for_user(usuario).access_token)
+
+    async def cargar(self, url, token, conexiones, segundos):
+        partes = urlsplit(url)
+        peticion = (
+            f'GET {partes.path}?{partes.query} HTTP/1.1\r\nHost: {partes.netloc}\r\n'
+            f'Authorization: Bearer {token}\r\nConnection: keep-alive\r\n\r\n'
+        ).encode()
+        tiempos, errores = [], [0]
+        fin = time.perf_counter() + segundos
+
+        async def cliente():
+            lector = escritor = None
+            while time.perf_counter() < fin:
+                try:
+                    if escritor is None:
+                        lector, escritor = await asyncio.open_connection(partes.hostname, partes.port or 80)
+                    inicio = time.perf_counter()
+                    escritor.write(peticion)
+                    await escritor.drain()
+                    estado, sigue_abierta = await self.leer_respuesta(lector)
+                    if estado == 200:
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                    else:
+                        errores[0] += 1
+                    if not sigue_abierta:
+                        escritor.close()
+                        escritor = None
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    # Conexión cerrada por el servidor o respuesta incompleta: se reconecta
+                    errores[0] += 1
+                    if escritor is not None:
+                        escritor.close()
+                    escritor = None
+            if escritor is not None:
+                escritor.close()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(conexiones)))
+        total = time.perf_counter() - inicio
+        if not tiempos:
+            return f'sin respuestas 200 ({errores[0]} errores)'
+        tiempos.sort()
+        return (
+            f'{len(tiempos) / total:8.0f} req/s  p50={statistics.median(tiempos):7.1f}ms  '
+            f'p99={tiempos[int(len(tiempos) * 0.99) - 1]:7.1f}ms  errores={errores[0]}'
+        )
+
+    async def leer_respuesta(self, lector):
+        estado = int((await lector.readline()).split()[1])
+        cabeceras = {}
+        while (linea := await lector.readline()) not in (b'\r\n', b''):
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        if 'content-length' in cabeceras:
+            await lector.readexactly(int(cabeceras['content-length']))
+        elif cabeceras.get('transfer-encoding') == 'chunked':
+            while True:
+                tamano = int((await lector.readline()).split(b';')[0], 16)
+                await lector.readexactly(tamano + 2)
+                if tamano == 0:
+                    break
+        return estado, cabeceras.get('connection', '').lower() != 'close'
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.autenticacion import JWTAutenticacionSinConsulta, TokenUsuario, estado_usuarios
+from api.models import Articulo, Tip, Usuario
+from api.views import ArticuloListView, TipDelDiaView
+
+
+VISTAS = [('TipDelDiaView', TipDelDiaView), ('ArticuloListView', ArticuloListView)]
+AUTENTICACIONES = [
+    ('JWTAuthentication', JWTAuthentication),
+    ('JWTAutenticacionSinConsulta', JWTAutenticacionSinConsulta),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara peticiones por segundo de TipDelDiaView y ArticuloListView autenticando con "
+        "JWTAuthentication (un SELECT del usuario por petición) y con JWTAutenticacionSinConsulta. "
+        "Las vistas se llaman en proceso, sin servidor HTTP, con la caché del catálogo caliente, "
+        "así que la diferencia es casi solo el costo de la autenticación. Los datos se siembran "
+        "en una transacción que se revierte al terminar, y la caché es una en memoria propia "
+        "del comando: la de la aplicación no se toca."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=2000)
+
+    def handle(self, *args, peticiones, **options):
+        # Las páginas cacheadas serían de datos que se revierten: nada de esto va a la caché real
+        caches = {**settings.CACHES, 'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-autenticacion',
+        }}
+        with override_settings(CACHES=caches), transaction.atomic():
+            usuario = Usuario.objects.create_user(email='benchmark@menteabierta.test', password='benchmark-123')
+            Tip.objects.create(titulo='Respira', contenido='...')
+            Articulo.objects.bulk_create(Articulo(titulo=f'Artículo {i}', resumen='...', contenido='...') for i in range(20))
+            token = str(TokenUsuario.for_user(usuario).access_token)
+            request = APIRequestFactory().get('/', HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+            estado_usuarios.olvidar()
+            for nombre_vista, vista in VISTAS:
+                for nombre_auth, autenticacion in AUTENTICACIONES:
+                    view = vista.as_view(authentication_classes=[autenticacion])
+                    view(request)  # calienta la caché del catálogo y el estado del usuario
+                    inicio = time.perf_counter()
+                    for _ in range(peticiones):
+                        respuesta = view(request)
+                        respuesta.render()
+                    segundos = time.perf_counter() - inicio
+                    self.stdout.write(
+                        f'{nombre_vista:18} {nombre_auth:28} {peticiones / segundos:10.0f} req/s'
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.busqueda import BusquedaTextoCompleto
+from api.models import Articulo
+
+
+VOCABULARIO = (
+    'ansiedad estrés sueño descanso respiración emociones tristeza calma relaciones pareja '
+    'familia trabajo universidad exámenes autocuidado meditación hábitos rutina ejercicio '
+    'pensamientos preocupación miedo insomnio energía gratitud límites comunicación apoyo '
+    'bienestar equilibrio atención presente cuerpo mente tensión alivio cansancio ánimo'
+).split()
+
+TERMINOS = ['ansiedad', 'insomnio', 'respiracion', 'limites pareja', 'gratitud diaria']
+
+
+class _VistaSearchFilter:
+    # La configuración que tenía ArticuloListView antes de la búsqueda de texto completo
+    search_fields = ['titulo', 'resumen', 'categoria']
+
+
+class _VistaTextoCompleto:
+    campos_busqueda = ['titulo', 'resumen', 'contenido']
+    campo_fragmento = 'contenido'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de ?search= en artículos: SearchFilter (ILIKE) contra la "
+        "búsqueda de texto completo. Siembra artículos dentro de una transacción que se "
+        "revierte al terminar. Pensado para correr contra Postgres."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articulos', type=int, default=100_000)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, articulos, repeticiones, semilla, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'Sin Postgres se mide el respaldo simple, no el índice GIN.'
+            ))
+        random.seed(semilla)
+        with transaction.atomic():
+            self.sembrar(articulos)
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE api_articulo')
+
+            factory = APIRequestFactory()
+            for termino in TERMINOS:
+                request = Request(factory.get('/', {'search': termino}))
+                antes = self.medir(SearchFilter(), request, _VistaSearchFilter(), repeticiones)
+                despues = self.medir(BusquedaTextoCompleto(), request, _VistaTextoCompleto(), repeticiones)
+                self.stdout.write(
+                    f'{termino!r:20} SearchFilter p50={antes[0]:8.2f}ms p95={antes[1]:8.2f}ms | '
+                    f'texto completo p50={despues[0]:8.2f}ms p95={despues[1]:8.2f}ms'
+                )
+            transaction.set_rollback(True)
+
+    def sembrar(self, cantidad, lote=2000):
+        def texto(palabras):
+            return ' '.join(random.choices(VOCABULARIO, k=palabras))
+
+        categorias = [valor for valor, _ in Articulo.CATEGORIAS_ARTICULO]
+        for inicio in range(0, cantidad, lote):
+            Articulo.objects.bulk_create(
+                Articulo(
+                    titulo=texto(6), resumen=texto(25), contenido=texto(300),
+                    categoria=random.choice(categorias),
+                )
+                for _ in range(min(lote, cantidad - inicio))
+            )
+        self.stdout.write(f'{cantidad} artículos sembrados.')
+
+    def medir(self, backend, request, vista, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            list(backend.filter_queryset(request, Articulo.objects.all(), vista)[:10])
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.95) - 1]
@@ -0,0 +1,51 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de conexión por petición. Simula N peticiones (request_started, "
+        "un SELECT 1, request_finished) con CONN_MAX_AGE=0 (una conexión nueva por "
+        "petición) y con la configuración actual de DATABASES (conexión persistente o pool). "
+        "Tiene sentido contra Postgres; con SQLite conectar es casi gratis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=500)
+
+    def handle(self, *args, peticiones, **options):
+        ajustes = connection.settings_dict
+        actual = ajustes['CONN_MAX_AGE']
+        pool = ajustes.get('OPTIONS', {}).get('pool')
+        descripcion = 'pool psycopg' if pool else f'CONN_MAX_AGE={actual}'
+
+        if not pool:
+            ajustes['CONN_MAX_AGE'] = 0
+            self.medir('sin persistencia (CONN_MAX_AGE=0)', peticiones)
+            ajustes['CONN_MAX_AGE'] = actual
+        self.medir(f'configuración actual ({descripcion})', peticiones)
+
+    def medir(self, nombre, peticiones):
+        connection.close()
+        conexiones_abiertas = 0
+        tiempos = []
+        for _ in range(peticiones):
+            inicio = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            if connection.connection is None:
+                conexiones_abiertas += 1
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        connection.close()
+        tiempos.sort()
+        self.stdout.write(
+            f'{nombre:45} media={statistics.mean(tiempos):.3f}ms p50={statistics.median(tiempos):.3f}ms '
+            f'p99={tiempos[int(len(tiempos) * 0.99) - 1]:.3f}ms conexiones={conexiones_abiertas}'
+        )
@@ -0,0 +1,67 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from api.models import Usuario
+
+
+CLAVE = 'benchmark-login-123'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de POST /api/v1/auth/login/ (p50/p99) con N logins concurrentes, "
+        "llamando a la vista en proceso desde un pool de hilos. Con --sin-pool el hash se "
+        "calcula en el hilo de la petición (HASH_PROCESOS=0) para comparar. Crea usuarios "
+        "temporales y los borra al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=8)
+        parser.add_argument('--peticiones', type=int, default=100)
+        parser.add_argument('--sin-pool', action='store_true')
+
+    def handle(self, *args, concurrencia, peticiones, sin_pool, **options):
+        prefijo = f'benchmark-{uuid.uuid4().hex[:8]}'
+        # Un hash calculado una vez para todos los usuarios: sembrar no es lo que se mide
+        hash_ = make_password(CLAVE)
+        emails = [f'{prefijo}-{i}@menteabierta.test' for i in range(concurrencia)]
+        Usuario.objects.bulk_create(Usuario(email=email, password=hash_) for email in emails)
+        vista = TokenObtainPairView.as_view()
+        factory = APIRequestFactory()
+
+        def login(i):
+            request = factory.post(
+                '/api/v1/auth/login/', {'email': emails[i % concurrencia], 'password': CLAVE}, format='json',
+            )
+            inicio = time.perf_counter()
+            respuesta = vista(request)
+            duracion = (time.perf_counter() - inicio) * 1000
+            connection.close()
+            assert respuesta.status_code == 200, respuesta.data
+            return duracion
+
+        try:
+            with override_settings(**({'HASH_PROCESOS': 0} if sin_pool else {})):
+                login(0)  # arranca el pool de procesos fuera de la medición
+                inicio = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+                    tiempos = sorted(hilos.map(login, range(peticiones)))
+                total = time.perf_counter() - inicio
+        finally:
+            Usuario.objects.filter(email__startswith=prefijo).delete()
+
+        p99 = tiempos[max(int(len(tiempos) * 0.99) - 1, 0)]
+        self.stdout.write(
+            f'{"sin pool" if sin_pool else "con pool"}: concurrencia={concurrencia} '
+            f'p50={statistics.median(tiempos):.1f}ms p99={p99:.1f}ms '
+            f'{peticiones / total:.1f} logins/s'
+        )
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from api import popularidad
+from api.models import Publicacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplica el decaimiento por edad al puntaje del feed ?orden=popular. Pensado para "
+        "correr periódicamente (p. ej. cada 15 minutos por cron). Solo recalcula las "
+        "publicaciones que todavía compiten (puntaje sobre el piso o creadas en los "
+        "últimos --dias): el resto ya se apagó y no cambia de posición."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, dias, batch_size, **options):
+        ahora = timezone.now()
+        vigentes = Publicacion.objects.filter(
+            Q(puntaje_popular__gt=popularidad.PISO) | Q(fecha_creacion__gte=ahora - timedelta(days=dias))
+        ).only('num_likes', 'num_comentarios', 'fecha_creacion').order_by('pk')
+
+        # Solo se escribe puntaje_popular: un like que llegue entre la lectura y el
+        # UPDATE vuelve a fijar su propio puntaje, y la próxima pasada lo alinea.
+        lote = []
+        total = 0
+        for publicacion in vigentes.iterator(chunk_size=batch_size):
+            publicacion.puntaje_popular = popularidad.puntaje(
+                publicacion.num_likes, publicacion.num_comentarios, publicacion.fecha_creacion, ahora,
+            )
+            lote.append(publicacion)
+            if len(lote) >= batch_size:
+                total += Publicacion.objects.bulk_update(lote, ['puntaje_popular'])
+                lote = []
+        if lote:
+            total += Publicacion.objects.bulk_update(lote, ['puntaje_popular'])
+        self.stdout.write(self.style.SUCCESS(f'{total} puntajes recalculados.'))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from api import puntajes
+from api.models import Cuestionario, Pregunta, RespuestaUsuario, ResultadoCuestionario
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-puntúa todos los envíos históricos (por ejemplo, tras cambiar la estrategia "
+        "o los pesos de un cuestionario). El puntaje se calcula con una agregación SQL "
+        "por cuestionario; los resultados se escriben con bulk_create + upsert. Solo se "
+        "puntúan los envíos que responden todas las preguntas puntuables. Las respuestas "
+        "sueltas que el endpoint de una sola respuesta guardaba antes (una fecha por "
+        "respuesta, nunca puntuadas) no forman un envío y se ignoran; hoy ese endpoint solo "
+        "acepta una respuesta que completa el cuestionario y la puntúa al guardarla."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cuestionario', type=int, help='Id de un único cuestionario.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, cuestionario, batch_size, **options):
+        cuestionarios = Cuestionario.objects.order_by('pk')
+        if cuestionario:
+            cuestionarios = cuestionarios.filter(pk=cuestionario)
+
+        total = 0
+        for c in cuestionarios:
+            total += self.recalcular(c, batch_size)
+        self.stdout.write(self.style.SUCCESS(f'{total} resultados recalculados.'))
+
+    @transaction.atomic
+    def recalcular(self, cuestionario, batch_size):
+        estrategia = puntajes.ESTRATEGIAS[cuestionario.estrategia_puntaje]
+        puntuables = cuestionario.preguntas.filter(tipo_pregunta__in=Pregunta.RANGOS_VALOR).count()
+        # Un envío = respuestas del mismo usuario con la misma fecha_respuesta, y tiene
+        # que cubrir todas las preguntas puntuables (igual que ResponderCuestionarioView)
+        envios = (
+            RespuestaUsuario.objects.filter(pregunta__cuestionario=cuestionario)
+            .values('usuario_id', 'fecha_respuesta')
+            .annotate(puntaje=estrategia.agregado(), num_respuestas=Count('id'))
+            .filter(num_respuestas__gte=puntuables)
+            .order_by()
+        )
+
+        lote = []
+        total = 0
+        for envio in envios.iterator(chunk_size=batch_size):
+            lote.append(ResultadoCuestionario(
+                usuario_id=envio['usuario_id'], cuestionario=cuestionario,
+                fecha_respuesta=envio['fecha_respuesta'], estrategia=cuestionario.estrategia_puntaje,
+                puntaje=envio['puntaje'], severidad=puntajes.severidad(cuestionario, envio['puntaje']),
+                num_respuestas=envio['num_respuestas'],
+            ))
+            if len(lote) >= batch_size:
+                total += self.guardar(lote)
+                lote = []
+        return total + self.guardar(lote)
+
+    def guardar(self, lote):
+        ResultadoCuestionario.objects.bulk_create(
+            lote, update_conflicts=True,
+            unique_fields=['usuario', 'cuestionario', 'fecha_respuesta'],
+            update_fields=['estrategia', 'puntaje', 'severidad', 'num_respuestas'],
+        )
+        return len(lote)
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from api import popularidad
+from api.models import Publicacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula num_likes, num_comentarios y puntaje_popular de las publicaciones "
+        "cuyos contadores no coinciden con las tablas de likes y comentarios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Publicaciones corregidas por cada bulk_update.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo informa cuántas publicaciones están desfasadas.')
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        # Una sola consulta encuentra las filas desfasadas comparando con COUNT correlacionado
+        desfasadas = (
+            Publicacion.objects.con_conteos_reales()
+            .filter(~Q(num_likes=F('likes_reales')) | ~Q(num_comentarios=F('comentarios_reales')))
+            .values_list('id', flat=True)
+            .order_by('id')
+        )
+
+        lote = []
+        total = 0
+        for publicacion_id in desfasadas.iterator(chunk_size=batch_size):
+            lote.append(publicacion_id)
+            total += 1
+            if len(lote) >= batch_size:
+                self._corregir(lote, dry_run)
+                lote = []
+        self._corregir(lote, dry_run)
+
+        accion = 'desfasadas (sin cambios, --dry-run)' if dry_run else 'corregidas'
+        self.stdout.write(self.style.SUCCESS(f'{total} publicaciones {accion}.'))
+
+    def _corregir(self, ids, dry_run):
+        if not ids or dry_run:
+            return
+        # Los conteos se vuelven a leer con las filas bloqueadas: un like o comentario
+        # concurrente (UPDATE con F()) espera a este lote y suma sobre el valor corregido
+        with transaction.atomic():
+            publicaciones = list(
+                Publicacion.objects.con_conteos_reales().filter(pk__in=ids).select_for_update()
+                .only('num_likes', 'num_comentarios', 'fecha_creacion')
+            )
+            for publicacion in publicaciones:
+                publicacion.num_likes = publicacion.likes_reales
+                publicacion.num_comentarios = publicacion.comentarios_reales
+                publicacion.puntaje_popular = popularidad.puntaje(
+                    publicacion.num_likes, publicacion.num_comentarios, publicacion.fecha_creacion,
+                )
+            Publicacion.objects.bulk_update(publicaciones, ['num_likes', 'num_comentarios', 'puntaje_popular'])
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from api.models import Usuario, DiarioEmocional, RegistroEmocion, ResumenDiarioUsuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye ResumenDiarioUsuario desde el diario y los registros de emociones. "
+        "Procesa los usuarios por lotes; cada lote se reemplaza en su propia transacción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Usuarios procesados por lote.')
+        parser.add_argument('--usuario', help='Email de un único usuario a reconstruir.')
+
+    def handle(self, *args, batch_size, usuario, **options):
+        usuarios = Usuario.objects.order_by('pk').values_list('pk', flat=True)
+        if usuario:
+            usuarios = usuarios.filter(email=usuario)
+
+        lote = []
+        total = 0
+        for usuario_id in usuarios.iterator(chunk_size=batch_size):
+            lote.append(usuario_id)
+            if len(lote) >= batch_size:
+                total += self.reconstruir(lote)
+                lote = []
+        if lote:
+            total += self.reconstruir(lote)
+        self.stdout.write(self.style.SUCCESS(f'{total} resúmenes diarios reconstruidos.'))
+
+    @transaction.atomic
+    def reconstruir(self, usuario_ids):
+        # Dos agregaciones en la base (por usuario y día) y un bulk_create por lote
+        resumenes = {}
+
+        def resumen(usuario_id, fecha):
+            clave = (usuario_id, fecha)
+            if clave not in resumenes:
+                resumenes[clave] = ResumenDiarioUsuario(usuario_id=usuario_id, fecha=fecha, emociones={})
+            return resumenes[clave]
+
+        entradas = (
+            DiarioEmocional.objects.filter(usuario_id__in=usuario_ids)
+            .annotate(fecha=TruncDate('fecha_entrada'))
+            .values('usuario_id', 'fecha')
+            .annotate(total=Count('id'), humor=Sum('humor'))
+            .order_by()
+        )
+        for fila in entradas:
+            r = resumen(fila['usuario_id'], fila['fecha'])
+            r.entradas_diario = fila['total']
+            r.humor_suma = fila['humor']
+
+        registros = (
+            RegistroEmocion.objects.filter(usuario_id__in=usuario_ids)
+            .annotate(fecha=TruncDate('fecha_registro'))
+            .values('usuario_id', 'fecha', 'emocion')
+            .annotate(total=Count('id'), intensidad=Sum('intensidad'))
+            .order_by()
+        )
+        for fila in registros:
+            r = resumen(fila['usuario_id'], fila['fecha'])
+            r.registros_emocion += fila['total']
+            r.intensidad_suma += fila['intensidad']
+            r.emociones[fila['emocion']] = {'total': fila['total'], 'intensidad_suma': fila['intensidad']}
+
+        ResumenDiarioUsuario.objects.filter(usuario_id__in=usuario_ids).delete()
+        ResumenDiarioUsuario.objects.bulk_create(resumenes.values(), batch_size=1000)
+        return len(resumenes)
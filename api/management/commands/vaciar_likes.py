@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.likes import Vaciador
+
+
+class Command(BaseCommand):
+    help = (
+        "Lleva a la base los likes acumulados en la caché 'likes' (settings.LIKES_BUFFER). "
+        "Sin --intervalo vacía lo pendiente y termina; con --intervalo N queda en un bucle "
+        "vaciando cada N segundos. Solo un vaciador trabaja a la vez aunque corran varios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, intervalo, batch_size, **options):
+        vaciador = Vaciador(lote=batch_size)
+        while True:
+            total = vaciador.vaciar_todo()
+            if not intervalo:
+                break
+            if total:
+                self.stdout.write(f'{total} toggles llevados a la base.')
+            close_old_connections()
+            time.sleep(intervalo)
+        self.stdout.write(self.style.SUCCESS(f'{total} toggles llevados a la base.'))
@@ -0,0 +1,149 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from rest_framework.renderers import JSONRenderer
+
+
+# --- MÉTRICAS POR ENDPOINT ---
+# Con settings.METRICAS activo, MetricasMiddleware (api/middleware.py) mide cada petición
+# muestreada: tiempo total, consultas y tiempo en la base (connection.execute_wrapper),
+# tiempo de render del JSON de DRF (ver JSONRendererMedido) y tamaño de la respuesta.
+# Armar serializer.data (lo caro de serializar) ocurre dentro de la vista y cuenta en el
+# total, no en el render. Se devuelve en la cabecera Server-Timing y se acumula en histogramas por
+# nombre de URL ('foro-lista', 'diario-list-create'...), en memoria de cada proceso.
+# GET /api/v1/_metrics (solo staff) los expone en formato de texto de Prometheus.
+
+# Medición de la petición en curso (None si no se está midiendo)
+actual = ContextVar('medicion_actual', default=None)
+
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CUBETAS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100)
+CUBETAS_BYTES = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# nombre -> (descripción, cubetas, campo de Medicion)
+HISTOGRAMAS = {
+    'menteabierta_peticion_segundos': ('Duración total de la petición.', CUBETAS_SEGUNDOS, 'total'),
+    'menteabierta_bd_consultas': ('Consultas a la base por petición.', CUBETAS_CONSULTAS, 'consultas'),
+    'menteabierta_bd_segundos': ('Tiempo en la base por petición.', CUBETAS_SEGUNDOS, 'bd'),
+    'menteabierta_render_segundos': ('Tiempo de render del JSON por petición.', CUBETAS_SEGUNDOS, 'render'),
+    'menteabierta_respuesta_bytes': ('Tamaño del cuerpo de la respuesta.', CUBETAS_BYTES, 'tamano'),
+}
+
+
+class Medicion:
+    __slots__ = ('inicio', 'total', 'consultas', 'bd', 'render', 'tamano')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.total = 0.0
+        self.consultas = 0
+        self.bd = 0.0
+        self.render = 0.0
+        self.tamano = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Envoltura para connection.execute_wrapper: cuenta y cronometra cada consulta."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.bd += time.perf_counter() - inicio
+            self.consultas += 1
+
+    def terminar(self, respuesta):
+        self.total = time.perf_counter() - self.inicio
+        if not respuesta.streaming:
+            self.tamano = len(respuesta.content)
+
+    def server_timing(self):
+        return (
+            f'total;dur={self.total * 1000:.1f}, '
+            f'bd;dur={self.bd * 1000:.1f};desc="{self.consultas} consultas", '
+            f'render;dur={self.render * 1000:.1f}'
+        )
+
+
+class JSONRendererMedido(JSONRenderer):
+    """JSONRenderer que suma su tiempo a la medición en curso (si la hay)."""
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        medicion = actual.get()
+        if medicion is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        inicio = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            medicion.render += time.perf_counter() - inicio
+
+
+class Histograma:
+    __slots__ = ('cubetas', 'conteos', 'suma', 'total')
+
+    def __init__(self, cubetas):
+        self.cubetas = cubetas
+        self.conteos = [0] * (len(cubetas) + 1)  # la última es +Inf
+        self.suma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(self.cubetas, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class Registro:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.lock:
+            self.histogramas = {}  # (nombre, vista, metodo) -> Histograma
+            self.respuestas = {}   # (vista, metodo, estado) -> cantidad
+
+    def observar(self, vista, metodo, estado, medicion):
+        with self.lock:
+            for nombre, (_, cubetas, campo) in HISTOGRAMAS.items():
+                clave = (nombre, vista, metodo)
+                if clave not in self.histogramas:
+                    self.histogramas[clave] = Histograma(cubetas)
+                self.histogramas[clave].observar(getattr(medicion, campo))
+            clave = (vista, metodo, estado)
+            self.respuestas[clave] = self.respuestas.get(clave, 0) + 1
+
+    def prometheus(self):
+        """Texto en el formato de exposición de Prometheus (version=0.0.4)."""
+        with self.lock:
+            histogramas = sorted(self.histogramas.items())
+            respuestas = sorted(self.respuestas.items())
+
+        lineas = [
+            '# HELP menteabierta_respuestas_total Respuestas por vista, método y estado.',
+            '# TYPE menteabierta_respuestas_total counter',
+        ]
+        for (vista, metodo, estado), cantidad in respuestas:
+            lineas.append(
+                f'menteabierta_respuestas_total{{vista="{_escapar(vista)}",metodo="{metodo}",estado="{estado}"}} {cantidad}'
+            )
+        for nombre, (descripcion, cubetas, _) in HISTOGRAMAS.items():
+            lineas += [f'# HELP {nombre} {descripcion}', f'# TYPE {nombre} histogram']
+            for (de, vista, metodo), histograma in histogramas:
+                if de != nombre:
+                    continue
+                etiquetas = f'vista="{_escapar(vista)}",metodo="{metodo}"'
+                acumulado = 0
+                for limite, conteo in zip(cubetas + ('+Inf',), histograma.conteos):
+                    acumulado += conteo
+                    lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                lineas.append(f'{nombre}_sum{{{etiquetas}}} {histograma.suma}')
+                lineas.append(f'{nombre}_count{{{etiquetas}}} {histograma.total}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registro = Registro()
@@ -0,0 +1,260 @@
+import hashlib
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import metricas
+
+
+# --- IDEMPOTENCIA DE LOS POST ---
+# La app móvil reintenta los POST cuando la red falla (comentarios, emociones,
+# respuestas, ejercicios completados) y cada reintento creaba una fila duplicada.
+# Si la petición trae la cabecera Idempotency-Key, la primera respuesta se guarda en
+# la caché 'idempotencia' (acotada y con TTL, ver settings.CACHES) bajo una clave por
+# usuario; los reintentos reciben esa misma respuesta sin volver a ejecutar la vista.
+# Si dos copias llegan a la vez, la segunda recibe 409 mientras la primera termina.
+
+CABECERA = 'HTTP_IDEMPOTENCY_KEY'
+LARGO_MAXIMO_CLAVE = 255
+SEGUNDOS_BLOQUEO = 30
+# Respuestas que dependen del momento (sesión vencida, permisos, límite de peticiones,
+# conflicto) no se guardan: el reintento debe volver a ejecutarse.
+ESTADOS_NO_GUARDADOS = {401, 403, 408, 409, 429}
+
+
+def _usuario_del_token(request):
+    """
+    Id del usuario del token JWT, sin ir a la base: basta con validar la firma.
+    La autenticación de DRF ocurre después, dentro de la vista.
+    """
+    autenticacion = JWTAuthentication()
+    cabecera = autenticacion.get_header(request)
+    if cabecera is None:
+        return None
+    token = autenticacion.get_raw_token(cabecera)
+    if token is None:
+        return None
+    try:
+        return autenticacion.get_validated_token(token).get(jwt_settings.USER_ID_CLAIM)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+class IdempotenciaMiddleware:
+    # Funciona con WSGI y con ASGI: en modo async no obliga a pasar las vistas async
+    # (api/vistas_async.py) por async_to_sync
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        clave_cliente = request.META.get(CABECERA)
+        if request.method != 'POST' or not clave_cliente:
+            return self.get_response(request)
+        if len(clave_cliente) > LARGO_MAXIMO_CLAVE:
+            return self._clave_larga()
+
+        usuario = request.user.pk if request.user.is_authenticated else _usuario_del_token(request)
+        if usuario is None:
+            # Sin usuario no hay a quién asociar la clave; la vista responderá 401
+            return self.get_response(request)
+
+        almacen = caches['idempotencia']
+        clave, clave_bloqueo, huella = self._claves(request, usuario, clave_cliente)
+        guardada = almacen.get(clave)
+        if guardada is not None:
+            return self._repetir(guardada, huella)
+        if not almacen.add(clave_bloqueo, huella, timeout=SEGUNDOS_BLOQUEO):
+            # Otra copia de la misma petición se está ejecutando (o terminó justo ahora)
+            return self._en_curso(almacen.get(clave), huella)
+
+        try:
+            respuesta = self.get_response(request)
+            if self._guardable(respuesta):
+                almacen.set(clave, self._guardar(respuesta, huella), timeout=settings.IDEMPOTENCIA_TIMEOUT)
+        finally:
+            almacen.delete(clave_bloqueo)
+        return respuesta
+
+    async def __acall__(self, request):
+        clave_cliente = request.META.get(CABECERA)
+        if request.method != 'POST' or not clave_cliente:
+            return await self.get_response(request)
+        if len(clave_cliente) > LARGO_MAXIMO_CLAVE:
+            return self._clave_larga()
+
+        usuario = await request.auser()
+        usuario = usuario.pk if usuario.is_authenticated else _usuario_del_token(request)
+        if usuario is None:
+            return await self.get_response(request)
+
+        almacen = caches['idempotencia']
+        clave, clave_bloqueo, huella = self._claves(request, usuario, clave_cliente)
+        guardada = await almacen.aget(clave)
+        if guardada is not None:
+            return self._repetir(guardada, huella)
+        if not await almacen.aadd(clave_bloqueo, huella, timeout=SEGUNDOS_BLOQUEO):
+            return self._en_curso(await almacen.aget(clave), huella)
+
+        try:
+            respuesta = await self.get_response(request)
+            if self._guardable(respuesta):
+                await almacen.aset(clave, self._guardar(respuesta, huella), timeout=settings.IDEMPOTENCIA_TIMEOUT)
+        finally:
+            await almacen.adelete(clave_bloqueo)
+        return respuesta
+
+    def _claves(self, request, usuario, clave_cliente):
+        base = hashlib.md5(f'{usuario}|{clave_cliente}'.encode()).hexdigest()
+        huella = hashlib.md5(request.path.encode() + b'|' + request.body).hexdigest()
+        return f'idem:{base}', f'idem:{base}:bloqueo', huella
+
+    def _guardable(self, respuesta):
+        return (
+            respuesta.status_code < 500 and respuesta.status_code not in ESTADOS_NO_GUARDADOS
+            and not respuesta.streaming
+        )
+
+    def _guardar(self, respuesta, huella):
+        return {
+            'huella': huella,
+            'estado': respuesta.status_code,
+            'contenido': respuesta.content,
+            'tipo': respuesta.get('Content-Type'),
+            'ubicacion': respuesta.get('Location'),
+        }
+
+    def _clave_larga(self):
+        return JsonResponse({'detail': 'Idempotency-Key demasiado larga.'}, status=400)
+
+    def _en_curso(self, guardada, huella):
+        if guardada is not None:
+            return self._repetir(guardada, huella)
+        respuesta = JsonResponse(
+            {'detail': 'Una petición con esta Idempotency-Key todavía se está procesando.'}, status=409,
+        )
+        respuesta['Retry-After'] = '1'
+        return respuesta
+
+    def _repetir(self, guardada, huella):
+        if guardada['huella'] != huella:
+            return JsonResponse(
+                {'detail': 'La Idempotency-Key ya se usó con otra petición.'}, status=422,
+            )
+        respuesta = HttpResponse(guardada['contenido'], status=guardada['estado'], content_type=guardada['tipo'])
+        if guardada['ubicacion']:
+            respuesta['Location'] = guardada['ubicacion']
+        respuesta['Idempotent-Replayed'] = 'true'
+        return respuesta
+
+
+# --- CABECERAS DE LÍMITE DE PETICIONES ---
+# BaldeTokensThrottle (api/limites.py) deja el estado del balde en la petición; aquí se
+# copia a las cabeceras RateLimit-* de la respuesta, incluida la 429 (que además trae
+# Retry-After desde DRF).
+
+class CabecerasLimiteMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        return self._cabeceras(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._cabeceras(request, await self.get_response(request))
+
+    def _cabeceras(self, request, respuesta):
+        limite = getattr(request, 'limite_tasa', None)
+        if limite is not None:
+            respuesta['RateLimit-Limit'] = str(limite['limite'])
+            respuesta['RateLimit-Remaining'] = str(limite['restantes'])
+            respuesta['RateLimit-Reset'] = str(limite['reinicio'])
+        return respuesta
+
+
+# --- MÉTRICAS POR ENDPOINT ---
+# Solo se instala con settings.METRICAS (si no, MiddlewareNotUsed lo saca de la cadena
+# y no cuesta nada). METRICAS_MUESTREO es la fracción de peticiones que se miden; las
+# demás solo pagan un random(). Bajo ASGI el ORM no corre en el hilo del event loop:
+# las vistas síncronas de DRF y las consultas de las async van todas al mismo hilo de la
+# petición (sync_to_async con thread_sensitive), y ahí se instala el execute_wrapper.
+
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.muestreo = settings.METRICAS_MUESTREO
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return self.get_response(request)
+        medicion = metricas.Medicion()
+        token = metricas.actual.set(medicion)
+        try:
+            with connection.execute_wrapper(medicion):
+                respuesta = self.get_response(request)
+        finally:
+            metricas.actual.reset(token)
+        return self._registrar(request, respuesta, medicion)
+
+    async def __acall__(self, request):
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return await self.get_response(request)
+        medicion = metricas.Medicion()
+        token = metricas.actual.set(medicion)
+        await sync_to_async(self._instalar, thread_sensitive=True)(medicion)
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            await sync_to_async(self._quitar, thread_sensitive=True)(medicion)
+            metricas.actual.reset(token)
+        return self._registrar(request, respuesta, medicion)
+
+    # `connection` se resuelve en el hilo que corre la función: tienen que ejecutarse ahí
+    @staticmethod
+    def _instalar(medicion):
+        connection.execute_wrappers.append(medicion)
+
+    @staticmethod
+    def _quitar(medicion):
+        connection.execute_wrappers.remove(medicion)
+
+    def _registrar(self, request, respuesta, medicion):
+        medicion.terminar(respuesta)
+        # Nombre de la URL (no la ruta con ids) para que las series no crezcan sin límite
+        vista = request.resolver_match.view_name if request.resolver_match else 'sin_ruta'
+        metricas.registro.observar(vista, request.method, respuesta.status_code, medicion)
+        respuesta['Server-Timing'] = medicion.server_timing()
+        return respuesta
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_registroemocion_intensidad_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['-fecha_publicacion', '-id'], name='articulo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articulo',
+            index=models.Index(fields=['categoria', '-fecha_publicacion', '-id'], name='articulo_cat_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuestionario',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['-fecha_creacion', '-id'], name='cuestionario_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diarioemocional',
+            index=models.Index(fields=['usuario', '-fecha_entrada', '-id'], name='diario_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ejercicio',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='ejercicio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ejerciciocompletado',
+            index=models.Index(fields=['usuario', '-fecha_completado'], name='completado_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='publicacion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['categoria', '-fecha_creacion', '-id'], name='publicacion_cat_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroemocion',
+            index=models.Index(fields=['usuario', '-fecha_registro'], name='emocion_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tip',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='tip_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tip',
+            index=models.Index(fields=['categoria', '-fecha_creacion', '-id'], name='tip_cat_fecha_idx'),
+        ),
+    ]
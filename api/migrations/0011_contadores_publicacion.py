@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def poblar_contadores(apps, schema_editor):
+    Publicacion = apps.get_model('api', 'Publicacion')
+    Comentario = apps.get_model('api', 'Comentario')
+
+    def conteo(queryset):
+        queryset = queryset.order_by().values('publicacion').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(queryset, output_field=models.IntegerField()), 0)
+
+    Publicacion.objects.update(
+        num_likes=conteo(Publicacion.likes.through.objects.filter(publicacion=OuterRef('pk'))),
+        num_comentarios=conteo(Comentario.objects.filter(publicacion=OuterRef('pk'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicacion',
+            name='num_comentarios',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='publicacion',
+            name='num_likes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_contadores_publicacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diarioemocional',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:02
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations
+
+
+# Configuración de búsqueda: stemming en español ignorando tildes ("ansiedad" ~ "ANSIEDÁD")
+CONFIGURACION_SQL = """
+CREATE TEXT SEARCH CONFIGURATION spanish_unaccent (COPY = spanish);
+ALTER TEXT SEARCH CONFIGURATION spanish_unaccent
+    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+"""
+
+# Trigger BEFORE INSERT/UPDATE que recalcula el tsvector con pesos (A título, B resumen,
+# C contenido). El UPDATE final rellena las filas existentes.
+TRIGGER_SQL = """
+CREATE FUNCTION {tabla}_busqueda_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.busqueda := {vector};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {tabla}_busqueda_actualizar
+    BEFORE INSERT OR UPDATE OF {columnas} ON {tabla}
+    FOR EACH ROW EXECUTE FUNCTION {tabla}_busqueda_trigger();
+
+CREATE INDEX {tabla}_busqueda_gin ON {tabla} USING gin (busqueda);
+
+UPDATE {tabla} SET busqueda = {vector_filas};
+"""
+
+REVERTIR_TRIGGER_SQL = """
+DROP INDEX IF EXISTS {tabla}_busqueda_gin;
+DROP TRIGGER IF EXISTS {tabla}_busqueda_actualizar ON {tabla};
+DROP FUNCTION IF EXISTS {tabla}_busqueda_trigger();
+"""
+
+
+def vector(columnas, prefijo):
+    return ' || '.join(
+        f"setweight(to_tsvector('spanish_unaccent', coalesce({prefijo}{columna}, '')), '{peso}')"
+        for columna, peso in columnas
+    )
+
+
+TABLAS = {
+    'api_articulo': [('titulo', 'A'), ('resumen', 'B'), ('contenido', 'C')],
+    'api_publicacion': [('titulo', 'A'), ('contenido', 'C')],
+}
+
+
+def solo_postgres(sql):
+    # El tsvector, el trigger y el índice GIN solo existen en Postgres; en SQLite la
+    # columna queda vacía y api/busqueda.py usa el respaldo simple.
+    def ejecutar(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return ejecutar
+
+
+def crear_triggers_sql():
+    return '\n'.join(
+        TRIGGER_SQL.format(
+            tabla=tabla,
+            columnas=', '.join(columna for columna, _ in columnas),
+            vector=vector(columnas, 'NEW.'),
+            vector_filas=vector(columnas, ''),
+        )
+        for tabla, columnas in TABLAS.items()
+    )
+
+
+def revertir_triggers_sql():
+    return '\n'.join(REVERTIR_TRIGGER_SQL.format(tabla=tabla) for tabla in TABLAS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_diarioemocional_fecha_actualizacion'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.RunPython(
+            solo_postgres(CONFIGURACION_SQL),
+            solo_postgres('DROP TEXT SEARCH CONFIGURATION IF EXISTS spanish_unaccent;'),
+        ),
+        migrations.AddField(
+            model_name='articulo',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='publicacion',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(solo_postgres(crear_triggers_sql()), solo_postgres(revertir_triggers_sql())),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_busqueda_texto_completo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('entradas_diario', models.PositiveIntegerField(default=0)),
+                ('humor_suma', models.PositiveIntegerField(default=0)),
+                ('registros_emocion', models.PositiveIntegerField(default=0)),
+                ('intensidad_suma', models.PositiveIntegerField(default=0)),
+                ('emociones', models.JSONField(default=dict)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha'],
+                'unique_together': {('usuario', 'fecha')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_resumendiariousuario'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='respuestausuario',
+            name='fecha_respuesta',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_respuesta_fecha_compartida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuestionario',
+            name='estrategia_puntaje',
+            field=models.CharField(choices=[('SUMA', 'Suma simple'), ('PONDERADA', 'Suma ponderada por pregunta')], default='SUMA', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cuestionario',
+            name='rangos_severidad',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='pregunta',
+            name='invertida',
+            field=models.BooleanField(default=False, help_text='Se puntúa como (mínimo + máximo - valor)'),
+        ),
+        migrations.AddField(
+            model_name='pregunta',
+            name='peso',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.CreateModel(
+            name='ResultadoCuestionario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_respuesta', models.DateTimeField()),
+                ('estrategia', models.CharField(max_length=20)),
+                ('puntaje', models.FloatField()),
+                ('severidad', models.CharField(blank=True, max_length=100)),
+                ('num_respuestas', models.PositiveIntegerField()),
+                ('cuestionario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultados', to='api.cuestionario')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultados_cuestionarios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha_respuesta'],
+                'indexes': [models.Index(fields=['usuario', '-fecha_respuesta', '-id'], name='resultado_usuario_fecha_idx')],
+                'unique_together': {('usuario', 'cuestionario', 'fecha_respuesta')},
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_puntaje_cuestionarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperacionSincronizacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.UUIDField()),
+                ('resultado', models.JSONField()),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RegistroEliminado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('diario', 'Entrada de diario'), ('emocion', 'Registro de emoción')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('fecha_eliminacion', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='registroemocion',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='diarioemocional',
+            index=models.Index(fields=['usuario', 'fecha_actualizacion'], name='diario_usuario_act_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroemocion',
+            index=models.Index(fields=['usuario', 'fecha_actualizacion'], name='emocion_usuario_act_idx'),
+        ),
+        migrations.AddField(
+            model_name='operacionsincronizacion',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='operaciones_sync', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='registroeliminado',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registros_eliminados', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='operacionsincronizacion',
+            unique_together={('usuario', 'clave')},
+        ),
+        migrations.AddIndex(
+            model_name='registroeliminado',
+            index=models.Index(fields=['usuario', 'fecha_eliminacion'], name='eliminado_usuario_fecha_idx'),
+        ),
+    ]
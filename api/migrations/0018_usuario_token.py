@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_sincronizacion_offline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsuarioToken',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('api.usuario',),
+        ),
+    ]
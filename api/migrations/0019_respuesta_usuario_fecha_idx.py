@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_usuario_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='respuestausuario',
+            index=models.Index(fields=['usuario', 'fecha_respuesta', 'id'], name='respuesta_usuario_fecha_idx'),
+        ),
+    ]
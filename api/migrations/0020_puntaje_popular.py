@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+import api.popularidad
+from django.db import migrations, models
+
+
+def poblar_puntajes(apps, schema_editor):
+    Publicacion = apps.get_model('api', 'Publicacion')
+    publicaciones = list(Publicacion.objects.only('num_likes', 'num_comentarios', 'fecha_creacion'))
+    for publicacion in publicaciones:
+        publicacion.puntaje_popular = api.popularidad.puntaje(
+            publicacion.num_likes, publicacion.num_comentarios, publicacion.fecha_creacion,
+        )
+    Publicacion.objects.bulk_update(publicaciones, ['puntaje_popular'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_respuesta_usuario_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publicacion',
+            name='puntaje_popular',
+            field=models.FloatField(default=api.popularidad.puntaje_inicial, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['-puntaje_popular', '-id'], name='publicacion_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicacion',
+            index=models.Index(fields=['categoria', '-puntaje_popular', '-id'], name='publicacion_cat_popular_idx'),
+        ),
+        migrations.RunPython(poblar_puntajes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_puntaje_popular'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['publicacion', 'fecha_creacion', 'id'], name='comentario_pub_fecha_idx'),
+        ),
+    ]
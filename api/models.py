@@ -1,7 +1,12 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 import uuid
 from django.core.validators import MinValueValidator, MaxValueValidator
+from . import popularidad
 
 # --- GESTOR DE USUARIOS ---
 class UsuarioManager(BaseUserManager):
@@ -36,12 +41,30 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+
+class UsuarioToken(Usuario):
+    """
+    Usuario armado con los claims del JWT (id, seudonimo) y el is_staff que recuerda
+    EstadoUsuarios, sin consultar la base (ver api/autenticacion.py). El resto de los campos quedan diferidos: el primero que se
+    lee trae todos juntos en una sola consulta.
+    """
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        diferidos = self.get_deferred_fields()
+        if fields is not None and diferidos and set(fields) <= diferidos:
+            fields = diferidos
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
 # --- MODELO DIARIO EMOCIONAL (Actualizado) ---
 class DiarioEmocional(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='entradas_diario')
     # NUEVO CAMPO: Título para la tarjeta en el listado
     titulo = models.CharField(max_length=200, default="Sin título") 
     fecha_entrada = models.DateTimeField(auto_now_add=True)
+    # Cambia con cada edición: sirve como validador HTTP (ETag/Last-Modified)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     contenido = models.TextField()
     
     ESCALA_HUMOR = [
@@ -51,10 +74,22 @@ class DiarioEmocional(models.Model):
 
     class Meta:
         ordering = ['-fecha_entrada']
+        indexes = [
+            # Listado del diario: WHERE usuario = ? ORDER BY fecha_entrada DESC, id DESC
+            models.Index(fields=['usuario', '-fecha_entrada', '-id'], name='diario_usuario_fecha_idx'),
+            # Sincronización: cambios desde una marca de tiempo (GET /api/v1/sync/?desde=)
+            models.Index(fields=['usuario', 'fecha_actualizacion'], name='diario_usuario_act_idx'),
+        ]
         
         
 # --- MODELO CUESTIONARIO (Actualizado) ---
 class Cuestionario(models.Model):
+    # Estrategias de puntaje disponibles (implementadas en api/puntajes.py)
+    ESTRATEGIAS_PUNTAJE = [
+        ('SUMA', 'Suma simple'),
+        ('PONDERADA', 'Suma ponderada por pregunta'),
+    ]
+
     nombre = models.CharField(max_length=255, unique=True)
     descripcion = models.TextField(blank=True, null=True)
     # NUEVO CAMPO: Para mostrar "1 min" o "5-7 min" en la tarjeta
@@ -62,6 +97,20 @@ class Cuestionario(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     activo = models.BooleanField(default=True)
 
+    # Cómo se calcula el resultado de cada envío (ver api/puntajes.py)
+    estrategia_puntaje = models.CharField(max_length=20, choices=ESTRATEGIAS_PUNTAJE, default='SUMA')
+    # Rangos de severidad en orden ascendente, ej: [{"hasta": 4, "nivel": "Mínima"}, {"hasta": 9, "nivel": "Leve"}]
+    rangos_severidad = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            # Índice parcial: solo los cuestionarios activos son los que se listan
+            models.Index(
+                fields=['-fecha_creacion', '-id'], name='cuestionario_activo_idx',
+                condition=models.Q(activo=True),
+            ),
+        ]
+
     def __str__(self):
         return self.nombre
         
@@ -76,11 +125,22 @@ class Pregunta(models.Model):
         ('TEXTO', 'Texto Libre'),
     ]
 
+    # Valores válidos de valor_respuesta según el tipo (mínimo, máximo; None = sin tope).
+    # Las de texto libre no tienen valor numérico y no se aceptan en valor_respuesta.
+    RANGOS_VALOR = {
+        'ESCALA': (1, 10),
+        'SELECCION': (0, None),
+        'BOOLEAN': (0, 1),
+    }
+
     cuestionario = models.ForeignKey(Cuestionario, on_delete=models.CASCADE, related_name='preguntas')
     texto = models.TextField()
     # NUEVO CAMPO: Tipo de visualización
     tipo_pregunta = models.CharField(max_length=20, choices=TIPOS_PREGUNTA, default='SELECCION')
     orden = models.IntegerField(default=1)
+    # Para el puntaje: peso en la suma ponderada e ítems con escala invertida
+    peso = models.FloatField(default=1.0)
+    invertida = models.BooleanField(default=False, help_text="Se puntúa como (mínimo + máximo - valor)")
 
     class Meta:
         ordering = ['orden']
@@ -94,10 +154,42 @@ class RespuestaUsuario(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='respuestas')
     pregunta = models.ForeignKey(Pregunta, on_delete=models.CASCADE, related_name='respuestas')
     valor_respuesta = models.IntegerField()
-    fecha_respuesta = models.DateTimeField(auto_now_add=True)
+    # default (no auto_now_add) para que todas las respuestas de un mismo envío
+    # compartan la misma fecha, que identifica al envío
+    fecha_respuesta = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         unique_together = ('usuario', 'pregunta', 'fecha_respuesta')
+        indexes = [
+            # Exportación del historial: WHERE usuario = ? ORDER BY fecha_respuesta, id
+            models.Index(fields=['usuario', 'fecha_respuesta', 'id'], name='respuesta_usuario_fecha_idx'),
+        ]
+
+
+# --- RESULTADO DE UN ENVÍO DE CUESTIONARIO ---
+class ResultadoCuestionario(models.Model):
+    """
+    Puntaje de un envío (todas las respuestas de un usuario a un cuestionario con la
+    misma fecha_respuesta). Se calcula una vez al guardar el envío; si cambia la
+    estrategia: python manage.py recalcular_puntajes
+    """
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='resultados_cuestionarios')
+    cuestionario = models.ForeignKey(Cuestionario, on_delete=models.CASCADE, related_name='resultados')
+    fecha_respuesta = models.DateTimeField()
+    estrategia = models.CharField(max_length=20)
+    puntaje = models.FloatField()
+    severidad = models.CharField(max_length=100, blank=True)
+    num_respuestas = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-fecha_respuesta']
+        unique_together = ('usuario', 'cuestionario', 'fecha_respuesta')
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_respuesta', '-id'], name='resultado_usuario_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario.email} - {self.cuestionario.nombre}: {self.puntaje}"
         
         
 # --- MÓDULO 3: REGISTRO DE EMOCIONES ---
@@ -128,14 +220,90 @@ class RegistroEmocion(models.Model):
     nota = models.TextField(blank=True, null=True, help_text="Nota privada opcional sobre la emoción")
 
     fecha_registro = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-fecha_registro']
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_registro'], name='emocion_usuario_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha_actualizacion'], name='emocion_usuario_act_idx'),
+        ]
         verbose_name = "Registro de Emoción"
         verbose_name_plural = "Registros de Emociones"
 
     def __str__(self):
         return f"{self.usuario.email} - {self.emocion} (Nivel: {self.intensidad})"
+
+
+
+# --- RESUMEN DIARIO POR USUARIO (rollup para tendencias) ---
+class ResumenDiarioUsuario(models.Model):
+    """
+    Totales por usuario y día del diario y de los registros de emociones. Se actualiza
+    en la misma transacción que cada alta/edición/baja (ver api/resumenes.py), así las
+    pantallas de tendencias leen unas pocas filas en vez de todo el historial.
+    Reconstrucción completa: python manage.py reconstruir_resumenes
+    """
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='resumenes_diarios')
+    fecha = models.DateField()
+
+    entradas_diario = models.PositiveIntegerField(default=0)
+    humor_suma = models.PositiveIntegerField(default=0)
+
+    registros_emocion = models.PositiveIntegerField(default=0)
+    intensidad_suma = models.PositiveIntegerField(default=0)
+    # Por emoción: {"FELIZ": {"total": 2, "intensidad_suma": 15}, ...}
+    emociones = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['-fecha']
+        unique_together = ('usuario', 'fecha')
+
+    def __str__(self):
+        return f"{self.usuario.email} - {self.fecha}"
+
+    @property
+    def humor_promedio(self):
+        return self.humor_suma / self.entradas_diario if self.entradas_diario else None
+
+    @property
+    def intensidad_promedio(self):
+        return self.intensidad_suma / self.registros_emocion if self.registros_emocion else None
+
+
+
+# --- SINCRONIZACIÓN OFFLINE (ver api/sincronizacion.py) ---
+class OperacionSincronizacion(models.Model):
+    """
+    Resultado de cada operación aplicada por POST /api/v1/sync/, guardado con la clave
+    de idempotencia que genera el cliente: si el cliente reintenta, se devuelve el
+    mismo resultado sin volver a aplicar la operación.
+    """
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='operaciones_sync')
+    clave = models.UUIDField()
+    resultado = models.JSONField()
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('usuario', 'clave')
+
+
+class RegistroEliminado(models.Model):
+    """Marca de borrado para que la sincronización informe qué filas ya no existen."""
+    TIPOS = [
+        ('diario', 'Entrada de diario'),
+        ('emocion', 'Registro de emoción'),
+    ]
+
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='registros_eliminados')
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    objeto_id = models.BigIntegerField()
+    fecha_eliminacion = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'fecha_eliminacion'], name='eliminado_usuario_fecha_idx'),
+        ]
         
         
 # --- MÓDULO 7: EJERCICIOS DE AUTOCUIDADO ---
@@ -172,6 +340,11 @@ class Ejercicio(models.Model):
     
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id'], name='ejercicio_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"{self.titulo} ({self.categoria})"
 
@@ -183,12 +356,43 @@ class EjercicioCompletado(models.Model):
 
     class Meta:
         ordering = ['-fecha_completado']
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_completado'], name='completado_usuario_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.usuario.email} completó {self.ejercicio.titulo}"
         
        
 # --- MÓDULO 10: FORO COMUNITARIO ---       
+class PublicacionQuerySet(models.QuerySet):
+    def con_interacciones(self, usuario=None):
+        """
+        Carga autor y si `usuario` ya dio like en una cantidad constante de consultas
+        (sin consultas extra por fila). Los conteos ya vienen en num_likes/num_comentarios.
+        """
+        queryset = self.select_related('usuario')
+        if usuario is not None and usuario.is_authenticated:
+            likes = Publicacion.likes.through.objects.filter(publicacion=OuterRef('pk'), usuario=usuario)
+            return queryset.annotate(ya_di_like=Exists(likes))
+        return queryset.annotate(ya_di_like=Value(False))
+
+    def con_conteos_reales(self):
+        """Anota los conteos calculados desde las tablas (para reconciliar los contadores)."""
+        likes = Publicacion.likes.through.objects.filter(publicacion=OuterRef('pk'))
+        comentarios = Comentario.objects.filter(publicacion=OuterRef('pk'))
+        return self.annotate(
+            likes_reales=_subconteo(likes),
+            comentarios_reales=_subconteo(comentarios),
+        )
+
+
+def _subconteo(queryset):
+    # COUNT(*) correlacionado: evita el producto cartesiano de dos JOIN + DISTINCT
+    conteo = queryset.order_by().values('publicacion').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(conteo, output_field=models.IntegerField()), 0)
+
+
 class Publicacion(models.Model):
     CATEGORIAS_FORO = [
         ('ANSIEDAD', 'Ansiedad'),
@@ -207,13 +411,33 @@ class Publicacion(models.Model):
     # Sistema de Likes (Muchos usuarios pueden dar like a muchas publicaciones)
     likes = models.ManyToManyField(Usuario, related_name='publicaciones_likeadas', blank=True)
 
+    # Contadores desnormalizados: se actualizan con F() en la misma transacción que el
+    # like/comentario. Si se desfasan: python manage.py reconciliar_contadores
+    num_likes = models.PositiveIntegerField(default=0, editable=False)
+    num_comentarios = models.PositiveIntegerField(default=0, editable=False)
+    # Ranking del feed ?orden=popular: likes + comentarios con decaimiento por edad (ver api/popularidad.py)
+    puntaje_popular = models.FloatField(default=popularidad.puntaje_inicial, editable=False)
+
+    # tsvector de título + contenido; lo mantiene un trigger de Postgres (ver api/busqueda.py)
+    busqueda = SearchVectorField(null=True, editable=False)
+
+    objects = PublicacionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Feed general y feed filtrado por categoría (?categoria=ANSIEDAD)
+            models.Index(fields=['-fecha_creacion', '-id'], name='publicacion_fecha_idx'),
+            models.Index(fields=['categoria', '-fecha_creacion', '-id'], name='publicacion_cat_fecha_idx'),
+            # Feed popular (?orden=popular), general y por categoría
+            models.Index(fields=['-puntaje_popular', '-id'], name='publicacion_popular_idx'),
+            models.Index(fields=['categoria', '-puntaje_popular', '-id'], name='publicacion_cat_popular_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.usuario.email}"
 
-    # Métodos auxiliares para contar interacciones
+    # Métodos auxiliares para contar interacciones (COUNT real, sin usar los contadores)
     def total_likes(self):
         return self.likes.count()
 
@@ -229,6 +453,10 @@ class Comentario(models.Model):
 
     class Meta:
         ordering = ['fecha_creacion'] # Los comentarios más viejos primero (cronológico)
+        indexes = [
+            # Comentarios de una publicación en orden cronológico (paginación por cursor)
+            models.Index(fields=['publicacion', 'fecha_creacion', 'id'], name='comentario_pub_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"Comentario de {self.usuario.email} en {self.publicacion.titulo}"
@@ -261,8 +489,15 @@ class Articulo(models.Model):
     
     fecha_publicacion = models.DateTimeField(auto_now_add=True)
 
+    # tsvector de título + resumen + contenido; lo mantiene un trigger de Postgres (ver api/busqueda.py)
+    busqueda = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ['-fecha_publicacion']
+        indexes = [
+            models.Index(fields=['-fecha_publicacion', '-id'], name='articulo_fecha_idx'),
+            models.Index(fields=['categoria', '-fecha_publicacion', '-id'], name='articulo_cat_fecha_idx'),
+        ]
         verbose_name = "Artículo Psicoeducativo"
         verbose_name_plural = "Artículos Psicoeducativos"
 
@@ -290,6 +525,10 @@ class Tip(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id'], name='tip_fecha_idx'),
+            models.Index(fields=['categoria', '-fecha_creacion', '-id'], name='tip_cat_fecha_idx'),
+        ]
         verbose_name = "Tip de Bienestar"
         verbose_name_plural = "Tips de Bienestar"
 
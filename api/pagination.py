@@ -0,0 +1,133 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+
+
+# --- PAGINACIÓN POR CURSOR (keyset) ---
+# El cursor es opaco (base64) y guarda la posición del último elemento visto, así
+# que pedir la página N es un "WHERE fecha < x ORDER BY fecha" que usa el índice,
+# no un OFFSET que recorre todas las filas anteriores. El 'id' va como desempate
+# para que el orden sea estable cuando dos filas comparten la misma fecha.
+
+class CursorPaginacion(CursorPagination):
+    """
+    Paginación por defecto (REST_FRAMEWORK['DEFAULT_PAGINATION_CLASS']).
+    El cliente puede pedir ?page_size=N, limitado siempre por max_page_size.
+    """
+    ordering = ('-id',)
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class DiarioPaginacion(CursorPaginacion):
+    ordering = ('-fecha_entrada', '-id')
+    page_size = 20
+
+
+class ResultadoPaginacion(CursorPaginacion):
+    ordering = ('-fecha_respuesta', '-id')
+    page_size = 20
+
+
+class PublicacionPaginacion(CursorPaginacion):
+    ordering = ('-fecha_creacion', '-id')
+    page_size = 20
+
+
+class PublicacionPopularPaginacion(CursorPaginacion):
+    """Feed ?orden=popular: recorre el índice publicacion_popular_idx."""
+    ordering = ('-puntaje_popular', '-id')
+    page_size = 20
+
+
+class ComentarioPaginacion(CursorPaginacion):
+    """Comentarios de una publicación, los más viejos primero (índice comentario_pub_fecha_idx)."""
+    ordering = ('fecha_creacion', 'id')
+    page_size = 20
+
+
+class ArticuloPaginacion(CursorPaginacion):
+    ordering = ('-fecha_publicacion', '-id')
+    page_size = 10
+    max_page_size = 50
+
+
+class CatalogoPaginacion(CursorPaginacion):
+    """Tips, ejercicios y cuestionarios: catálogos pequeños, páginas grandes."""
+    ordering = ('-fecha_creacion', '-id')
+    page_size = 50
+    max_page_size = 200
+
+
+# --- PAGINACIÓN POR CURSOR PARA LAS VISTAS ASYNC ---
+# CursorPagination de DRF evalúa el queryset de forma síncrona. Las vistas de
+# api/vistas_async.py leen la página con el ORM async y dejan a DRF todo lo demás:
+# el cursor (el mismo en las dos vistas, así que los enlaces sirven en ambas), los
+# enlaces 'next'/'previous' y la forma de la respuesta.
+
+class _PaginaLeida:
+    """Página ya leída: paginate_queryset la ordena, filtra y corta sin ir a la base."""
+    def __init__(self, filas):
+        self.filas = filas
+
+    def order_by(self, *campos):
+        return self
+
+    def filter(self, **filtros):
+        return self
+
+    def __getitem__(self, corte):
+        return self.filas
+
+
+async def paginar_async(paginacion, request, queryset):
+    """
+    Equivalente async de paginacion.paginate_queryset() + get_paginated_response().data:
+    {'next', 'previous', 'results'} con las filas de la página en 'results' (sin serializar).
+    NotFound si el cursor no es válido, como en la vista síncrona.
+    """
+    request = Request(request)
+    page_size = paginacion.get_page_size(request)
+    ordering = paginacion.get_ordering(request, queryset, None)
+    cursor = paginacion.decode_cursor(request)
+    offset, reverse, posicion = cursor if cursor is not None else (0, False, None)
+
+    # La misma consulta que arma paginate_queryset
+    if reverse:
+        queryset = queryset.order_by(*(campo[1:] if campo.startswith('-') else f'-{campo}' for campo in ordering))
+    else:
+        queryset = queryset.order_by(*ordering)
+    if posicion is not None:
+        campo = ordering[0]
+        operador = 'lt' if reverse != campo.startswith('-') else 'gt'
+        queryset = queryset.filter(**{f'{campo.lstrip("-")}__{operador}': posicion})
+    filas = [fila async for fila in queryset[offset:offset + page_size + 1]]
+
+    filas = paginacion.paginate_queryset(_PaginaLeida(filas), request)
+    return {'next': paginacion.get_next_link(), 'previous': paginacion.get_previous_link(), 'results': filas}
+
+
+# --- MARCA DE SINCRONIZACIÓN ---
+# GET /api/v1/sync/ avanza cada tipo (diario, emociones, eliminados) por su cuenta,
+# así que la marca es un cursor por tipo: la (fecha, pk) de la última fila entregada.
+
+def codificar_marca(marca):
+    texto = '|'.join(f'{nombre}:{pk}:{fecha.isoformat()}' for nombre, (fecha, pk) in marca.items())
+    return urlsafe_b64encode(texto.encode()).decode()
+
+
+def leer_marca(texto):
+    """{tipo: (fecha, pk)} de una marca de codificar_marca(). ValueError si no es una."""
+    marca = {}
+    if not texto:
+        return marca  # sin filas todavía: la marca vacía es "desde el principio"
+    for parte in urlsafe_b64decode(texto.encode()).decode().split('|'):
+        nombre, pk, fecha = parte.split(':', 2)
+        fecha = datetime.fromisoformat(fecha)
+        if fecha.tzinfo is None:
+            raise ValueError(texto)
+        marca[nombre] = (fecha, int(pk))
+    return marca
@@ -0,0 +1,53 @@
+from django.db.models import FloatField, Func, Value
+from django.db.models.functions import Greatest, Power
+from django.utils import timezone
+
+
+# --- PUNTAJE "POPULAR" DEL FORO ---
+# Cada Publicacion guarda su puntaje en una columna indexada (puntaje_popular), así el
+# feed ?orden=popular es un recorrido por índice igual que el cronológico, sin contar
+# likes ni comentarios por petición. Estilo Hacker News: las interacciones suben el
+# puntaje y la edad lo hace decaer.
+#   - Al dar/quitar like o comentar se recalcula en el mismo UPDATE del contador, en
+#     SQL (puntaje_sql) con los contadores de la fila tal como están al escribirla.
+#   - `manage.py recalcular_popularidad` (periódico, p. ej. cada 15 min por cron)
+#     aplica el decaimiento a las publicaciones que todavía no se apagaron.
+
+PESO_COMENTARIO = 2
+GRAVEDAD = 1.5
+# Por debajo de este puntaje una publicación ya no compite en el feed popular y el
+# comando periódico deja de recalcularla
+PISO = 0.001
+
+
+def puntaje(num_likes, num_comentarios, fecha_creacion, ahora=None):
+    horas = max(((ahora or timezone.now()) - fecha_creacion).total_seconds() / 3600, 0)
+    return (num_likes + PESO_COMENTARIO * num_comentarios + 1) / (horas + 2) ** GRAVEDAD
+
+
+class _Epoch(Func):
+    """Segundos epoch de una columna de fecha."""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra):
+        # SQLite guarda las fechas como texto UTC: días julianos desde el epoch
+        return self.as_sql(
+            compiler, connection, template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)', **extra,
+        )
+
+
+def puntaje_sql(num_likes, num_comentarios, ahora=None):
+    """
+    puntaje() como expresión para un UPDATE: num_likes y num_comentarios son expresiones
+    (p. ej. F('num_likes') + 1) y la edad sale de la fecha_creacion de la misma fila.
+    """
+    ahora = (ahora or timezone.now()).timestamp()
+    horas = Greatest((Value(ahora) - _Epoch('fecha_creacion')) / 3600, Value(0.0), output_field=FloatField())
+    interacciones = num_likes + PESO_COMENTARIO * num_comentarios + 1
+    return interacciones / Power(horas + 2, Value(GRAVEDAD), output_field=FloatField())
+
+
+def puntaje_inicial():
+    """Default de Publicacion.puntaje_popular: una publicación recién creada, sin interacciones."""
+    return puntaje(0, 0, timezone.now())
@@ -0,0 +1,75 @@
+from abc import ABC, abstractmethod
+
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import Pregunta
+
+
+# --- MOTOR DE PUNTAJE DE CUESTIONARIOS ---
+# Cada Cuestionario declara su estrategia en `estrategia_puntaje`. Una estrategia sabe
+# puntuar un envío en Python (al guardarlo) y también expresarse como agregación SQL,
+# que es lo que usa `manage.py recalcular_puntajes` para re-puntuar todo el historial
+# en la base sin traer las respuestas a Python.
+# Para agregar una estrategia: subclase de EstrategiaPuntaje + registrarla en ESTRATEGIAS
+# + agregarla a Cuestionario.ESTRATEGIAS_PUNTAJE.
+
+def valor_efectivo(pregunta, valor):
+    """Aplica la inversión de escala de los ítems invertidos."""
+    if pregunta.invertida:
+        minimo, maximo = Pregunta.RANGOS_VALOR.get(pregunta.tipo_pregunta, (None, None))
+        if maximo is not None:
+            return minimo + maximo - valor
+    return valor
+
+
+def valor_efectivo_sql():
+    """Lo mismo que valor_efectivo(), como expresión sobre RespuestaUsuario."""
+    invertidos = [
+        When(pregunta__invertida=True, pregunta__tipo_pregunta=tipo, then=Value(minimo + maximo) - F('valor_respuesta'))
+        for tipo, (minimo, maximo) in Pregunta.RANGOS_VALOR.items()
+        if maximo is not None
+    ]
+    return Cast(Case(*invertidos, default=F('valor_respuesta')), FloatField())
+
+
+class EstrategiaPuntaje(ABC):
+    # Abstracta: una estrategia a medias falla al instanciarla en ESTRATEGIAS, al importar
+    @abstractmethod
+    def puntuar(self, respuestas):
+        """`respuestas`: lista de (pregunta, valor_respuesta). Devuelve el puntaje."""
+
+    @abstractmethod
+    def agregado(self):
+        """Expresión de agregación equivalente sobre un queryset de RespuestaUsuario."""
+
+
+class SumaSimple(EstrategiaPuntaje):
+    def puntuar(self, respuestas):
+        return float(sum(valor_efectivo(pregunta, valor) for pregunta, valor in respuestas))
+
+    def agregado(self):
+        return Sum(valor_efectivo_sql())
+
+
+class SumaPonderada(EstrategiaPuntaje):
+    def puntuar(self, respuestas):
+        return float(sum(pregunta.peso * valor_efectivo(pregunta, valor) for pregunta, valor in respuestas))
+
+    def agregado(self):
+        return Sum(valor_efectivo_sql() * F('pregunta__peso'), output_field=FloatField())
+
+
+ESTRATEGIAS = {
+    'SUMA': SumaSimple(),
+    'PONDERADA': SumaPonderada(),
+}
+
+
+def severidad(cuestionario, puntaje):
+    """Nivel del primer rango cuyo 'hasta' alcanza el puntaje (o el último si lo supera)."""
+    rangos = cuestionario.rangos_severidad
+    for rango in rangos:
+        if puntaje <= rango['hasta']:
+            return rango['nivel']
+    return rangos[-1]['nivel'] if rangos else ''
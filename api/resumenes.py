@@ -0,0 +1,103 @@
+from collections import defaultdict
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ResumenDiarioUsuario
+
+
+# --- MANTENIMIENTO INCREMENTAL DE ResumenDiarioUsuario ---
+# Estas funciones se llaman dentro de la transacción de la vista que crea, edita o borra
+# la entrada/registro, así el resumen y el dato original se confirman juntos.
+# Las filas de los días afectados se bloquean (select_for_update) mientras se modifican.
+
+class AcumuladorResumen:
+    """
+    Junta los cambios de varias entradas/registros y los aplica de una vez: una
+    consulta para bloquear los días afectados y un bulk_update (útil en lotes, ver
+    api/sincronizacion.py). Debe usarse dentro de una transacción.
+    """
+    def __init__(self):
+        self.deltas = defaultdict(lambda: {
+            'entradas_diario': 0, 'humor_suma': 0, 'registros_emocion': 0, 'intensidad_suma': 0,
+            'emociones': defaultdict(lambda: [0, 0]),
+        })
+
+    def entrada_diario(self, entrada, signo=1):
+        delta = self.deltas[(entrada.usuario_id, timezone.localdate(entrada.fecha_entrada))]
+        delta['entradas_diario'] += signo
+        delta['humor_suma'] += signo * entrada.humor
+
+    def cambio_humor(self, entrada, humor_anterior):
+        # Una edición solo puede cambiar el humor (la fecha de la entrada no cambia)
+        delta = self.deltas[(entrada.usuario_id, timezone.localdate(entrada.fecha_entrada))]
+        delta['humor_suma'] += entrada.humor - humor_anterior
+
+    def registro_emocion(self, usuario_id, fecha_registro, emocion, intensidad, signo=1):
+        delta = self.deltas[(usuario_id, timezone.localdate(fecha_registro))]
+        delta['registros_emocion'] += signo
+        delta['intensidad_suma'] += signo * intensidad
+        delta['emociones'][emocion][0] += signo
+        delta['emociones'][emocion][1] += signo * intensidad
+
+    def guardar(self):
+        if not self.deltas:
+            return
+        resumenes = self._bloquear()
+        faltantes = [clave for clave in self.deltas if clave not in resumenes]
+        if faltantes:
+            # ignore_conflicts: si otra transacción creó el día entre medio, se usa esa fila
+            ResumenDiarioUsuario.objects.bulk_create(
+                [ResumenDiarioUsuario(usuario_id=usuario_id, fecha=fecha) for usuario_id, fecha in faltantes],
+                ignore_conflicts=True,
+            )
+            resumenes = self._bloquear()
+
+        for clave, delta in self.deltas.items():
+            resumen = resumenes[clave]
+            resumen.entradas_diario += delta['entradas_diario']
+            resumen.humor_suma += delta['humor_suma']
+            resumen.registros_emocion += delta['registros_emocion']
+            resumen.intensidad_suma += delta['intensidad_suma']
+            for emocion, (total, intensidad) in delta['emociones'].items():
+                actual = resumen.emociones.setdefault(emocion, {'total': 0, 'intensidad_suma': 0})
+                actual['total'] += total
+                actual['intensidad_suma'] += intensidad
+                if actual['total'] == 0:
+                    del resumen.emociones[emocion]
+        ResumenDiarioUsuario.objects.bulk_update(
+            resumenes.values(),
+            ['entradas_diario', 'humor_suma', 'registros_emocion', 'intensidad_suma', 'emociones'],
+        )
+        self.deltas.clear()
+
+    def _bloquear(self):
+        filtro = Q()
+        for usuario_id, fecha in self.deltas:
+            filtro |= Q(usuario_id=usuario_id, fecha=fecha)
+        filas = ResumenDiarioUsuario.objects.select_for_update().filter(filtro).order_by('pk')
+        return {(fila.usuario_id, fila.fecha): fila for fila in filas}
+
+
+def aplicar_entrada_diario(entrada, signo=1):
+    """Suma (signo=1) o resta (signo=-1) una entrada del diario al resumen de su día."""
+    acumulador = AcumuladorResumen()
+    acumulador.entrada_diario(entrada, signo)
+    acumulador.guardar()
+
+
+def cambiar_humor_diario(entrada, humor_anterior):
+    if entrada.humor == humor_anterior:
+        return
+    acumulador = AcumuladorResumen()
+    acumulador.cambio_humor(entrada, humor_anterior)
+    acumulador.guardar()
+
+
+def aplicar_registro_emocion(registro, signo=1):
+    """Suma (signo=1) o resta (signo=-1) un registro de emoción al resumen de su día."""
+    acumulador = AcumuladorResumen()
+    acumulador.registro_emocion(
+        registro.usuario_id, registro.fecha_registro, registro.emocion, registro.intensidad, signo,
+    )
+    acumulador.guardar()
@@ -1,7 +1,13 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .autenticacion import TokenUsuario
+from .pagination import leer_marca
 from .models import Usuario, DiarioEmocional
-from .models import Cuestionario, Pregunta, RespuestaUsuario
-from .models import RegistroEmocion
+from .models import Cuestionario, Pregunta, RespuestaUsuario, ResultadoCuestionario
+from .models import RegistroEmocion, ResumenDiarioUsuario
 from .models import Ejercicio, EjercicioCompletado
 from .models import Publicacion, Comentario
 from .models import Articulo
@@ -34,6 +40,14 @@ class UsuarioRegistroSerializer(serializers.ModelSerializer):
         return user
 
 
+class LoginSerializer(TokenObtainPairSerializer):
+    """
+    POST /api/v1/auth/login/ (SIMPLE_JWT['TOKEN_OBTAIN_SERIALIZER']).
+    Los tokens llevan seudonimo e is_staff para autenticar sin consultar la base.
+    """
+    token_class = TokenUsuario
+
+
 # --- SERIALIZADOR PARA ENTRADAS DE DIARIO (RF3) ---
 class DiarioEmocionalSerializer(serializers.ModelSerializer):
     """
@@ -62,10 +76,13 @@ class UsuarioPerfilSerializer(serializers.ModelSerializer):
 class PreguntaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pregunta
-        fields = ['id', 'texto', 'orden']
+        fields = ['id', 'texto', 'tipo_pregunta', 'orden']
 
 class CuestionarioDetailSerializer(serializers.ModelSerializer):
-    """Muestra el cuestionario con sus preguntas anidadas"""
+    """
+    Muestra el cuestionario con sus preguntas anidadas.
+    Usar con prefetch_related('preguntas') para no hacer una consulta por cuestionario.
+    """
     preguntas = PreguntaSerializer(many=True, read_only=True)
 
     class Meta:
@@ -78,10 +95,69 @@ class RespuestaUsuarioSerializer(serializers.ModelSerializer):
         fields = ['id', 'pregunta', 'valor_respuesta', 'fecha_respuesta']
         read_only_fields = ['usuario', 'fecha_respuesta']
 
-    def create(self, validated_data):
-        # Asigna el usuario autenticado automáticamente
-        validated_data['usuario'] = self.context['request'].user
-        return super().create(validated_data)
+
+class RespuestaItemSerializer(serializers.Serializer):
+    pregunta = serializers.IntegerField()
+    valor_respuesta = serializers.IntegerField()
+
+
+class HojaRespuestasSerializer(serializers.Serializer):
+    """
+    Hoja completa de respuestas para POST /api/v1/cuestionarios/{id}/responder/.
+    Espera en el contexto 'cuestionario' con sus preguntas ya precargadas
+    (prefetch_related('preguntas')): validar no hace consultas por respuesta.
+    Los errores se devuelven por posición, alineados con la lista enviada. Hay que
+    responder todas las preguntas puntuables (las de texto libre no cuentan).
+    """
+    MAX_RESPUESTAS = 200
+
+    respuestas = RespuestaItemSerializer(many=True, allow_empty=False, max_length=MAX_RESPUESTAS)
+
+    def validate_respuestas(self, respuestas):
+        preguntas = {pregunta.id: pregunta for pregunta in self.context['cuestionario'].preguntas.all()}
+        vistas = set()
+        errores = []
+        for respuesta in respuestas:
+            errores.append(self.errores_respuesta(respuesta, preguntas, vistas))
+            vistas.add(respuesta['pregunta'])
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        # Los rangos de severidad son para la hoja entera: una parcial no se puntúa
+        faltan = [p.orden for p in preguntas.values() if p.tipo_pregunta in Pregunta.RANGOS_VALOR and p.id not in vistas]
+        if faltan:
+            raise serializers.ValidationError(
+                f"Faltan respuestas para las preguntas {', '.join(map(str, sorted(faltan)))}."
+            )
+        for respuesta in respuestas:
+            respuesta['pregunta'] = preguntas[respuesta['pregunta']]
+        return respuestas
+
+    def errores_respuesta(self, respuesta, preguntas, vistas):
+        pregunta = preguntas.get(respuesta['pregunta'])
+        if pregunta is None:
+            return {'pregunta': ['La pregunta no pertenece a este cuestionario.']}
+        if respuesta['pregunta'] in vistas:
+            return {'pregunta': ['La pregunta está repetida en el envío.']}
+        if pregunta.tipo_pregunta not in Pregunta.RANGOS_VALOR:
+            return {'valor_respuesta': [f'Las preguntas de tipo {pregunta.tipo_pregunta} no admiten valor numérico.']}
+        minimo, maximo = Pregunta.RANGOS_VALOR[pregunta.tipo_pregunta]
+        valor = respuesta['valor_respuesta']
+        if valor < minimo or (maximo is not None and valor > maximo):
+            rango = f'entre {minimo} y {maximo}' if maximo is not None else f'mayor o igual a {minimo}'
+            return {'valor_respuesta': [f'Para {pregunta.tipo_pregunta} el valor debe estar {rango}.']}
+        return {}
+
+
+
+class ResultadoCuestionarioSerializer(serializers.ModelSerializer):
+    cuestionario_nombre = serializers.CharField(source='cuestionario.nombre', read_only=True)
+
+    class Meta:
+        model = ResultadoCuestionario
+        fields = [
+            'id', 'cuestionario', 'cuestionario_nombre', 'fecha_respuesta',
+            'puntaje', 'severidad', 'estrategia', 'num_respuestas',
+        ]
         
         
 class RegistroEmocionSerializer(serializers.ModelSerializer):
@@ -95,6 +171,45 @@ class RegistroEmocionSerializer(serializers.ModelSerializer):
         # Asigna el usuario autenticado automáticamente al guardar
         validated_data['usuario'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class RangoFechasParametrosSerializer(serializers.Serializer):
+    """Valida ?desde=&hasta= (fechas ISO) en los endpoints de tendencias."""
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+
+    def validate(self, data):
+        # Por defecto: los últimos 30 días hasta hoy
+        data.setdefault('hasta', timezone.localdate())
+        data.setdefault('desde', data['hasta'] - timedelta(days=30))
+        if data['desde'] > data['hasta']:
+            raise serializers.ValidationError("'desde' no puede ser posterior a 'hasta'.")
+        return data
+
+
+class EstadisticasEmocionParametrosSerializer(RangoFechasParametrosSerializer):
+    """Valida los parámetros de GET /api/v1/emociones/estadisticas/."""
+    BUCKETS = ['day', 'week', 'month']
+
+    bucket = serializers.ChoiceField(choices=BUCKETS, default='day')
+
+
+class ExportacionParametrosSerializer(serializers.Serializer):
+    """Valida ?formato= de GET /api/v1/export/."""
+    formato = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+
+
+class ResumenDiarioUsuarioSerializer(serializers.ModelSerializer):
+    humor_promedio = serializers.FloatField(read_only=True)
+    intensidad_promedio = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ResumenDiarioUsuario
+        fields = [
+            'fecha', 'entradas_diario', 'humor_suma', 'humor_promedio',
+            'registros_emocion', 'intensidad_suma', 'intensidad_promedio', 'emociones',
+        ]
+
         
 class EjercicioSerializer(serializers.ModelSerializer):
     class Meta:
@@ -118,8 +233,6 @@ class ComentarioSerializer(serializers.ModelSerializer):
 
 class PublicacionSerializer(serializers.ModelSerializer):
     autor_seudonimo = serializers.CharField(source='usuario.seudonimo', read_only=True)
-    num_likes = serializers.SerializerMethodField()
-    num_comentarios = serializers.SerializerMethodField()
     ya_di_like = serializers.SerializerMethodField() # Para saber si pintar el corazón de color
 
     class Meta:
@@ -129,15 +242,13 @@ class PublicacionSerializer(serializers.ModelSerializer):
             'categoria', 'fecha_creacion', 
             'num_likes', 'num_comentarios', 'ya_di_like'
         ]
-        read_only_fields = ['fecha_creacion']
-
-    def get_num_likes(self, obj):
-        return obj.total_likes()
-
-    def get_num_comentarios(self, obj):
-        return obj.total_comentarios()
+        read_only_fields = ['fecha_creacion', 'num_likes', 'num_comentarios']
 
+    # Las vistas anotan ya_di_like con Publicacion.objects.con_interacciones();
+    # la consulta queda solo como respaldo (p.ej. recién creada).
     def get_ya_di_like(self, obj):
+        if hasattr(obj, 'ya_di_like'):
+            return obj.ya_di_like
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
@@ -147,6 +258,15 @@ class PublicacionSerializer(serializers.ModelSerializer):
         validated_data['usuario'] = self.context['request'].user
         return super().create(validated_data)
         
+
+class PublicacionBusquedaSerializer(PublicacionSerializer):
+    """Resultado de ?search= en el foro: agrega relevancia y fragmento resaltado."""
+    relevancia = serializers.FloatField(read_only=True)
+    fragmento = serializers.CharField(read_only=True)
+
+    class Meta(PublicacionSerializer.Meta):
+        fields = PublicacionSerializer.Meta.fields + ['relevancia', 'fragmento']
+        
         
 class ArticuloSerializer(serializers.ModelSerializer):
     class Meta:
@@ -155,9 +275,50 @@ class ArticuloSerializer(serializers.ModelSerializer):
             'id', 'titulo', 'resumen', 'contenido', 
             'categoria', 'imagen_url', 'tiempo_lectura', 'fecha_publicacion'
         ]
+
+
+class ArticuloBusquedaSerializer(ArticuloSerializer):
+    """Resultado de ?search= en artículos: agrega relevancia y fragmento resaltado."""
+    relevancia = serializers.FloatField(read_only=True)
+    fragmento = serializers.CharField(read_only=True)
+
+    class Meta(ArticuloSerializer.Meta):
+        fields = ArticuloSerializer.Meta.fields + ['relevancia', 'fragmento']
         
         
 class TipSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tip
-        fields = ['id', 'titulo', 'contenido', 'categoria']
\ No newline at end of file
+        fields = ['id', 'titulo', 'contenido', 'categoria']
+
+
+# --- SINCRONIZACIÓN OFFLINE ---
+class OperacionSincronizacionSerializer(serializers.Serializer):
+    """Una operación encolada por la app. 'datos' se valida luego con el serializador del tipo."""
+    clave = serializers.UUIDField()
+    tipo = serializers.ChoiceField(choices=['diario', 'emocion'])
+    accion = serializers.ChoiceField(choices=['crear', 'actualizar', 'eliminar'])
+    id = serializers.IntegerField(required=False)
+    datos = serializers.DictField(required=False)
+
+    def validate(self, data):
+        if data['accion'] != 'crear' and 'id' not in data:
+            raise serializers.ValidationError({'id': 'Obligatorio para actualizar o eliminar.'})
+        return data
+
+
+class LoteSincronizacionSerializer(serializers.Serializer):
+    MAX_OPERACIONES = 500
+
+    operaciones = OperacionSincronizacionSerializer(many=True, allow_empty=False, max_length=MAX_OPERACIONES)
+
+
+class CambiosParametrosSerializer(serializers.Serializer):
+    """?desde= de GET /api/v1/sync/: la 'marca' devuelta por la sincronización anterior."""
+    desde = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_desde(self, valor):
+        try:
+            return leer_marca(valor)
+        except ValueError:
+            raise serializers.ValidationError('Marca de sincronización no válida.')
\ No newline at end of file
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+
+from . import cache as catalogo_cache
+from .models import Articulo, Tip, Ejercicio, Cuestionario, Pregunta
+
+
+# --- INVALIDACIÓN DE LA CACHÉ DEL CATÁLOGO ---
+# Qué catálogo se invalida cuando cambia cada modelo. Las preguntas se sirven anidadas
+# dentro de su cuestionario, así que invalidan el catálogo de cuestionarios.
+CATALOGO_POR_MODELO = {
+    Articulo: 'articulos',
+    Tip: 'tips',
+    Ejercicio: 'ejercicios',
+    Cuestionario: 'cuestionarios',
+    Pregunta: 'cuestionarios',
+}
+
+
+def invalidar_catalogo(sender, **kwargs):
+    catalogo_cache.invalidar(CATALOGO_POR_MODELO[sender])
+
+
+for modelo in CATALOGO_POR_MODELO:
+    post_save.connect(invalidar_catalogo, sender=modelo)
+    post_delete.connect(invalidar_catalogo, sender=modelo)
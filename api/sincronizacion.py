@@ -0,0 +1,197 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DiarioEmocional, RegistroEmocion, OperacionSincronizacion, RegistroEliminado
+from .pagination import codificar_marca
+from .resumenes import AcumuladorResumen
+from .serializers import DiarioEmocionalSerializer, RegistroEmocionSerializer
+
+
+# --- SINCRONIZACIÓN OFFLINE ---
+# La app móvil encola altas, ediciones y bajas mientras no tiene conexión y las manda
+# juntas a POST /api/v1/sync/. Cada operación trae una clave de idempotencia: las que
+# ya se aplicaron devuelven el resultado guardado. El lote se aplica en una transacción
+# con un bulk_create / bulk_update / delete por tipo, no fila por fila.
+
+TIPOS = {
+    'diario': (DiarioEmocional, DiarioEmocionalSerializer, ['titulo', 'contenido', 'humor']),
+    'emocion': (RegistroEmocion, RegistroEmocionSerializer, ['emocion', 'intensidad', 'nota']),
+}
+
+
+class LoteEnCurso(Exception):
+    """Otra petición aplicó a la vez alguna de las claves del lote; se deshizo entero."""
+
+
+class LoteSincronizacion:
+    def __init__(self, usuario, operaciones):
+        self.usuario = usuario
+        self.operaciones = operaciones
+        self.resultados = [None] * len(operaciones)
+        self.ahora = timezone.now()
+        self.resumen = AcumuladorResumen()
+        self.crear = {tipo: [] for tipo in TIPOS}           # [(indice, objeto)]
+        self.actualizar = {tipo: {} for tipo in TIPOS}      # {pk: objeto}
+        self.eliminar = {tipo: {} for tipo in TIPOS}        # {pk: objeto}
+        self.nuevas = []                                    # índices de operaciones no vistas antes
+
+    @transaction.atomic
+    def aplicar(self):
+        claves = [operacion['clave'] for operacion in self.operaciones]
+        previas = dict(
+            OperacionSincronizacion.objects.filter(usuario=self.usuario, clave__in=claves)
+            .values_list('clave', 'resultado')
+        )
+        objetos = self._cargar_objetos(previas)
+
+        primera = {}
+        for indice, operacion in enumerate(self.operaciones):
+            clave = operacion['clave']
+            if clave in previas:
+                self.resultados[indice] = previas[clave]
+            elif clave in primera:
+                continue  # clave repetida dentro del lote: se resuelve al final
+            else:
+                primera[clave] = indice
+                self.nuevas.append(indice)
+                self.resultados[indice] = self._preparar(indice, operacion, objetos)
+
+        self._escribir()
+
+        for indice, operacion in enumerate(self.operaciones):
+            if self.resultados[indice] is None:
+                self.resultados[indice] = self.resultados[primera[operacion['clave']]]
+        return self.resultados
+
+    def _cargar_objetos(self, previas):
+        # Una consulta por tipo para todas las filas que se editan o borran (bloqueadas)
+        ids = {tipo: set() for tipo in TIPOS}
+        for operacion in self.operaciones:
+            if operacion['accion'] != 'crear' and operacion['clave'] not in previas:
+                ids[operacion['tipo']].add(operacion.get('id'))
+        objetos = {}
+        for tipo, (modelo, _, _) in TIPOS.items():
+            pks = [pk for pk in ids[tipo] if pk is not None]
+            objetos[tipo] = (
+                modelo.objects.select_for_update().filter(usuario=self.usuario).in_bulk(pks) if pks else {}
+            )
+        return objetos
+
+    def _preparar(self, indice, operacion, objetos):
+        tipo = operacion['tipo']
+        modelo, serializer_class, _ = TIPOS[tipo]
+        base = {'clave': str(operacion['clave']), 'tipo': tipo, 'accion': operacion['accion']}
+
+        if operacion['accion'] == 'crear':
+            serializer = serializer_class(data=operacion.get('datos', {}))
+            if not serializer.is_valid():
+                return {**base, 'estado': 'error', 'errores': serializer.errors}
+            objeto = modelo(usuario=self.usuario, **serializer.validated_data)
+            self.crear[tipo].append((indice, objeto))
+            return base  # el id se completa después del bulk_create
+
+        objeto = objetos[tipo].get(operacion.get('id'))
+        if objeto is None or objeto.pk in self.eliminar[tipo]:
+            return {**base, 'estado': 'error', 'errores': {'id': ['No existe o ya fue eliminado.']}}
+
+        if operacion['accion'] == 'eliminar':
+            self._contar(tipo, objeto, signo=-1)
+            self.eliminar[tipo][objeto.pk] = objeto
+            self.actualizar[tipo].pop(objeto.pk, None)
+            return {**base, 'estado': 'eliminado', 'id': objeto.pk}
+
+        serializer = serializer_class(objeto, data=operacion.get('datos', {}), partial=True)
+        if not serializer.is_valid():
+            return {**base, 'estado': 'error', 'errores': serializer.errors}
+        self._contar(tipo, objeto, signo=-1)
+        for campo, valor in serializer.validated_data.items():
+            setattr(objeto, campo, valor)
+        objeto.fecha_actualizacion = self.ahora
+        self._contar(tipo, objeto, signo=1)
+        self.actualizar[tipo][objeto.pk] = objeto
+        return {**base, 'estado': 'actualizado', 'id': objeto.pk}
+
+    def _contar(self, tipo, objeto, signo):
+        # Mantiene ResumenDiarioUsuario en la misma transacción (ver api/resumenes.py)
+        if tipo == 'diario':
+            self.resumen.entrada_diario(objeto, signo)
+        else:
+            self.resumen.registro_emocion(
+                objeto.usuario_id, objeto.fecha_registro, objeto.emocion, objeto.intensidad, signo,
+            )
+
+    def _escribir(self):
+        eliminados = []
+        for tipo, (modelo, _, campos) in TIPOS.items():
+            if self.crear[tipo]:
+                modelo.objects.bulk_create([objeto for _, objeto in self.crear[tipo]])
+                for indice, objeto in self.crear[tipo]:
+                    self.resultados[indice].update(estado='creado', id=objeto.pk)
+                    self._contar(tipo, objeto, signo=1)
+            if self.actualizar[tipo]:
+                modelo.objects.bulk_update(self.actualizar[tipo].values(), campos + ['fecha_actualizacion'])
+            if self.eliminar[tipo]:
+                modelo.objects.filter(pk__in=list(self.eliminar[tipo])).delete()
+                eliminados += [
+                    RegistroEliminado(usuario=self.usuario, tipo=tipo, objeto_id=pk, fecha_eliminacion=self.ahora)
+                    for pk in self.eliminar[tipo]
+                ]
+
+        RegistroEliminado.objects.bulk_create(eliminados)
+        self.resumen.guardar()
+        # Solo se recuerdan las operaciones aplicadas; las que fallaron se pueden corregir y reintentar.
+        # Si dos envíos del mismo lote llegan a la vez, el segundo choca aquí con la clave
+        # única (usuario, clave) y se deshace: al reintentarlo recibe los resultados guardados.
+        try:
+            OperacionSincronizacion.objects.bulk_create([
+                OperacionSincronizacion(usuario=self.usuario, clave=resultado['clave'], resultado=resultado)
+                for resultado in (self.resultados[indice] for indice in self.nuevas)
+                if resultado['estado'] != 'error'
+            ])
+        except IntegrityError as error:
+            raise LoteEnCurso from error
+
+
+def cambios_desde(usuario, desde, limite):
+    """
+    Filas del usuario cambiadas (o borradas) desde `desde`, como máximo `limite` por tipo.
+    Devuelve los datos y la nueva marca que el cliente debe mandar en la próxima petición.
+
+    La marca guarda por tipo la última (fecha, pk) entregada: un lote de sincronización
+    pone la misma fecha a cientos de filas, así que la fecha sola no alcanza para avanzar
+    de página. `desde` es {tipo: (fecha, pk)} como lo devuelve leer_marca.
+    """
+    desde = desde or {}
+    consultas = {
+        'diario': (DiarioEmocional.objects.filter(usuario=usuario).select_related('usuario'), 'fecha_actualizacion'),
+        'emociones': (RegistroEmocion.objects.filter(usuario=usuario), 'fecha_actualizacion'),
+        'eliminados': (RegistroEliminado.objects.filter(usuario=usuario), 'fecha_eliminacion'),
+    }
+    hay_mas = False
+    filas_por_tipo = {}
+    marca = {}
+    for nombre, (queryset, campo) in consultas.items():
+        if nombre in desde:
+            fecha, pk = desde[nombre]
+            queryset = queryset.filter(Q(**{f'{campo}__gt': fecha}) | Q(**{campo: fecha, 'pk__gt': pk}))
+        filas = list(queryset.order_by(campo, 'pk')[:limite + 1])
+        if len(filas) > limite:
+            filas = filas[:limite]
+            hay_mas = True
+        # La marca se queda en la última fila entregada, y sin filas nuevas no se mueve.
+        # Adelantarla a "ahora" saltaría para siempre las filas con una fecha anterior
+        # cuya transacción todavía no se había confirmado al leer.
+        if filas:
+            marca[nombre] = (getattr(filas[-1], campo), filas[-1].pk)
+        elif nombre in desde:
+            marca[nombre] = desde[nombre]
+        filas_por_tipo[nombre] = filas
+
+    return {
+        'diario': DiarioEmocionalSerializer(filas_por_tipo['diario'], many=True).data,
+        'emociones': RegistroEmocionSerializer(filas_por_tipo['emociones'], many=True).data,
+        'eliminados': [{'tipo': e.tipo, 'id': e.objeto_id} for e in filas_por_tipo['eliminados']],
+        'marca': codificar_marca(marca),
+        'hay_mas': hay_mas,
+    }
@@ -1,3 +1,1453 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+from datetime import datetime, timedelta
+from io import StringIO
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .autenticacion import TokenUsuario, estado_usuarios
+from .cache import modificado
+from .hashers import ScryptEnPoolPasswordHasher
+from .limites import BaldeTokensThrottle
+from .models import Usuario, Publicacion, Comentario, DiarioEmocional
+from .models import Cuestionario, RegistroEmocion, EjercicioCompletado, Ejercicio, Articulo, Tip
+from .models import ResumenDiarioUsuario, RespuestaUsuario, ResultadoCuestionario
+from .models import OperacionSincronizacion
+from .serializers import ResumenDiarioUsuarioSerializer
+from .pagination import DiarioPaginacion, PublicacionPaginacion, ArticuloPaginacion, CatalogoPaginacion
+from .pagination import PublicacionPopularPaginacion, ComentarioPaginacion
+from . import likes, metricas, popularidad, puntajes
+
+
+def crear_usuario(n, **extra):
+    return Usuario.objects.create_user(
+        email=f'usuario{n}@test.com', password='clave-segura-123', seudonimo=f'usuario{n}', **extra
+    )
+
+
+# --- FORO ---
+class ForoConsultasTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def crear_publicaciones(self, cantidad):
+        for i in range(cantidad):
+            autor = crear_usuario(f'autor{Publicacion.objects.count()}')
+            publicacion = Publicacion.objects.create(usuario=autor, titulo=f'Post {i}', contenido='...')
+            publicacion.likes.add(autor, self.usuario)
+            Comentario.objects.create(publicacion=publicacion, usuario=autor, contenido='Hola')
+
+    def contar_consultas_feed(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('foro-lista'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_feed_no_hace_consultas_por_fila(self):
+        self.crear_publicaciones(2)
+        pocas = self.contar_consultas_feed()
+        self.crear_publicaciones(10)
+        muchas = self.contar_consultas_feed()
+        self.assertEqual(pocas, muchas)
+
+    def test_detalle_devuelve_contadores_y_like_propio(self):
+        publicacion = Publicacion.objects.create(usuario=crear_usuario(1), titulo='Post', contenido='...')
+        self.client.post(reverse('foro-like', args=[publicacion.pk]))
+        self.client.post(reverse('foro-comentar', args=[publicacion.pk]), {'contenido': 'Hola'})
+        self.client.post(reverse('foro-comentar', args=[publicacion.pk]), {'contenido': 'Otro'})
+
+        response = self.client.get(reverse('foro-detalle', args=[publicacion.pk]))
+        self.assertEqual(response.data['num_likes'], 1)
+        self.assertEqual(response.data['num_comentarios'], 2)
+        self.assertTrue(response.data['ya_di_like'])
+        self.assertEqual(response.data['autor_seudonimo'], publicacion.usuario.seudonimo)
+
+
+class ContadoresPublicacionTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.publicacion = Publicacion.objects.create(usuario=self.usuario, titulo='Post', contenido='...')
+        self.url_like = reverse('foro-like', args=[self.publicacion.pk])
+
+    def test_toggle_like_actualiza_contador_sin_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url_like)
+        self.assertEqual(response.data, {'liked': True, 'total_likes': 1})
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+
+        response = self.client.post(self.url_like)
+        self.assertEqual(response.data, {'liked': False, 'total_likes': 0})
+        self.publicacion.refresh_from_db()
+        self.assertEqual(self.publicacion.num_likes, 0)
+        self.assertEqual(self.publicacion.total_likes(), 0)
+
+    def test_toggle_like_un_solo_update_sin_leer_antes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.url_like)
+        publicacion = [q['sql'] for q in ctx.captured_queries if '"api_publicacion"' in q['sql']]
+        self.assertEqual(len(publicacion), 2)
+        self.assertTrue(publicacion[0].startswith('UPDATE'))
+        self.assertTrue(publicacion[1].startswith('SELECT "api_publicacion"."num_likes" '))
+
+    def test_toggle_like_publicacion_inexistente(self):
+        response = self.client.post(reverse('foro-like', args=[self.publicacion.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_reconciliar_corrige_contadores_desfasados(self):
+        self.publicacion.likes.add(self.usuario)
+        Comentario.objects.create(publicacion=self.publicacion, usuario=self.usuario, contenido='Hola')
+        Publicacion.objects.filter(pk=self.publicacion.pk).update(num_likes=7)
+
+        salida = StringIO()
+        call_command('reconciliar_contadores', stdout=salida)
+        self.assertIn('1 publicaciones corregidas', salida.getvalue())
+        self.publicacion.refresh_from_db()
+        self.assertEqual((self.publicacion.num_likes, self.publicacion.num_comentarios), (1, 1))
+        self.assertAlmostEqual(
+            self.publicacion.puntaje_popular, popularidad.puntaje(1, 1, self.publicacion.fecha_creacion), places=4,
+        )
+
+
+@override_settings(LIKES_BUFFER=True)
+class LikesDiferidosTests(TestCase):
+    def setUp(self):
+        caches['likes'].clear()
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.publicacion = Publicacion.objects.create(usuario=self.usuario, titulo='Post', contenido='...')
+
+    def test_toggle_responde_sin_escribir_y_vaciar_lo_guarda(self):
+        url = reverse('foro-like', args=[self.publicacion.pk])
+        self.assertEqual(self.client.post(url).data, {'liked': True, 'total_likes': 1})
+        self.assertFalse(self.publicacion.likes.exists())
+
+        salida = StringIO()
+        call_command('vaciar_likes', stdout=salida)
+        self.assertIn('1 toggles', salida.getvalue())
+        self.publicacion.refresh_from_db()
+        self.assertEqual(self.publicacion.num_likes, 1)
+        self.assertTrue(self.publicacion.likes.filter(pk=self.usuario.pk).exists())
+        self.assertGreater(self.publicacion.puntaje_popular, popularidad.puntaje(0, 0, self.publicacion.fecha_creacion))
+
+        self.assertEqual(self.client.post(url).data, {'liked': False, 'total_likes': 0})
+        self.assertEqual(self.client.post(reverse('foro-like', args=[0])).status_code, 404)
+
+    def test_miles_de_toggles_concurrentes(self):
+        publicaciones = [self.publicacion] + [
+            Publicacion.objects.create(usuario=self.usuario, titulo=f'Post {i}', contenido='...') for i in range(2)
+        ]
+        # Sin create_user: hashear 40 contraseñas haría el test lento sin probar nada
+        usuarios = Usuario.objects.bulk_create(
+            Usuario(email=f'fan{i}@test.com', seudonimo=f'fan{i}') for i in range(40)
+        )
+        for usuario in usuarios[::2]:
+            self.publicacion.likes.add(usuario)  # estado inicial en la base
+        Publicacion.objects.filter(pk=self.publicacion.pk).update(num_likes=20)
+
+        # Primer toggle de cada par en este hilo (lee el estado inicial de la base);
+        # el resto llega en paralelo mientras se vacía
+        toques = {}
+        for publicacion in publicaciones:
+            for usuario in usuarios:
+                likes.alternar(publicacion.pk, usuario.pk)
+                toques[publicacion.pk, usuario.pk] = 1
+        pares = list(toques)
+        rafaga = [pares[(i * 7) % len(pares)] for i in range(3000)]
+        for par in rafaga:
+            toques[par] += 1
+
+        vaciador = likes.Vaciador(lote=200)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            pendientes = [pool.submit(likes.alternar, *par) for par in rafaga]
+            while not all(f.done() for f in pendientes):
+                vaciador.vaciar()
+            for f in pendientes:
+                f.result()
+        vaciador.vaciar_todo()
+
+        inicial = {(self.publicacion.pk, u.pk) for u in usuarios[::2]}
+        esperado = {par for par, n in toques.items() if (par in inicial) != (n % 2 == 1)}
+        Like = Publicacion.likes.through
+        self.assertEqual(set(Like.objects.values_list('publicacion_id', 'usuario_id')), esperado)
+        for publicacion in publicaciones:
+            publicacion.refresh_from_db()
+            self.assertEqual(publicacion.num_likes, sum(1 for p, _ in esperado if p == publicacion.pk))
+            self.assertEqual(likes.pendientes(publicacion.pk), 0)
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+class CacheContada:
+    def __init__(self, cache):
+        self.cache = cache
+        self.llamadas = []
+
+    def __getattr__(self, nombre):
+        self.llamadas.append(nombre)
+        return getattr(self.cache, nombre)
+
+
+class LimiteTasaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.publicacion = Publicacion.objects.create(usuario=self.usuario, titulo='Post', contenido='...')
+        self.reloj = Reloj()
+        parche = mock.patch.object(BaldeTokensThrottle, 'timer', self.reloj)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def comentar(self):
+        return self.client.post(reverse('foro-comentar', args=[self.publicacion.pk]), {'contenido': 'Hola'})
+
+    def test_balde_se_vacia_y_se_rellena(self):
+        # 'comentarios': '20/min' -> 20 tokens, uno nuevo cada 3 segundos
+        restantes = [int(self.comentar()['RateLimit-Remaining']) for _ in range(20)]
+        self.assertEqual(restantes, list(range(19, -1, -1)))
+
+        rechazada = self.comentar()
+        self.assertEqual(rechazada.status_code, 429)
+        self.assertEqual(rechazada['Retry-After'], '3')
+        self.assertEqual(rechazada['RateLimit-Limit'], '20')
+        self.assertEqual(rechazada['RateLimit-Remaining'], '0')
+        self.assertEqual(self.comentar().status_code, 429)  # el rechazo no gasta tokens
+
+        self.reloj.ahora += 3
+        self.assertEqual(self.comentar().status_code, 201)
+        self.assertEqual(self.comentar().status_code, 429)
+
+        self.reloj.ahora += 120
+        self.assertEqual(self.comentar()['RateLimit-Remaining'], '19')
+        self.assertEqual(Comentario.objects.count(), 22)
+
+    def test_solo_escrituras_y_por_usuario(self):
+        self.assertNotIn('RateLimit-Limit', self.client.get(reverse('foro-lista')))
+        respuesta = self.client.post(reverse('foro-lista'), {'titulo': 'Otro', 'contenido': '...', 'categoria': 'ANSIEDAD'})
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta['RateLimit-Limit'], '30')
+        self.assertEqual(respuesta['RateLimit-Remaining'], '29')
+
+        for _ in range(20):
+            self.comentar()
+        self.assertEqual(self.comentar().status_code, 429)
+        otro = APIClient()
+        otro.force_authenticate(crear_usuario(1))
+        respuesta = otro.post(reverse('foro-comentar', args=[self.publicacion.pk]), {'contenido': 'Hola'})
+        self.assertEqual(respuesta.status_code, 201)
+
+    def test_una_escritura_por_peticion_sin_consultas(self):
+        request = Request(APIRequestFactory().post('/'))
+        request.user = self.usuario
+        vista = SimpleNamespace(throttle_scope='likes')
+        throttle = BaldeTokensThrottle()
+        throttle.cache = CacheContada(cache)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(throttle.allow_request(request, vista))
+            self.assertEqual(throttle.cache.llamadas, ['get', 'set'])  # balde nuevo
+
+            throttle.cache.llamadas.clear()
+            for _ in range(59):
+                self.assertTrue(throttle.allow_request(request, vista))
+            self.assertEqual(throttle.cache.llamadas, ['get', 'incr'] * 59)
+
+            throttle.cache.llamadas.clear()
+            self.assertFalse(throttle.allow_request(request, vista))
+            self.assertEqual(throttle.cache.llamadas, ['get'])  # el rechazo no escribe
+
+            self.reloj.ahora += 3600  # sin uso: el balde se rellenó
+            throttle.cache.llamadas.clear()
+            self.assertTrue(throttle.allow_request(request, vista))
+            self.assertEqual(throttle.cache.llamadas, ['get', 'set'])
+
+
+class FeedPopularTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse('foro-lista') + '?orden=popular'
+
+    def crear_publicacion(self, titulo, horas=0):
+        publicacion = Publicacion.objects.create(usuario=self.usuario, titulo=titulo, contenido='...')
+        if horas:
+            fecha = timezone.now() - timedelta(hours=horas)
+            Publicacion.objects.filter(pk=publicacion.pk).update(
+                fecha_creacion=fecha, puntaje_popular=popularidad.puntaje(0, 0, fecha),
+            )
+        return publicacion
+
+    def test_like_y_comentario_actualizan_puntaje(self):
+        publicacion = self.crear_publicacion('Post')
+        inicial = Publicacion.objects.get(pk=publicacion.pk).puntaje_popular
+        self.client.post(reverse('foro-like', args=[publicacion.pk]))
+        con_like = Publicacion.objects.get(pk=publicacion.pk).puntaje_popular
+        self.client.post(reverse('foro-comentar', args=[publicacion.pk]), {'contenido': 'Hola'})
+        con_comentario = Publicacion.objects.get(pk=publicacion.pk).puntaje_popular
+        self.assertGreater(con_like, inicial)
+        self.assertGreater(con_comentario, con_like)
+
+        self.client.post(reverse('foro-like', args=[publicacion.pk]))
+        self.assertLess(Publicacion.objects.get(pk=publicacion.pk).puntaje_popular, con_comentario)
+
+    def test_puntaje_en_sql_igual_que_en_python(self):
+        publicacion = self.crear_publicacion('Post', horas=30)
+        self.client.post(reverse('foro-like', args=[publicacion.pk]))
+        self.client.post(reverse('foro-comentar', args=[publicacion.pk]), {'contenido': 'Hola'})
+        publicacion.refresh_from_db()
+        self.assertAlmostEqual(
+            publicacion.puntaje_popular, popularidad.puntaje(1, 1, publicacion.fecha_creacion), places=6,
+        )
+
+    def test_orden_popular_y_cursor(self):
+        vieja = self.crear_publicacion('Vieja', horas=48)
+        popular = self.crear_publicacion('Popular', horas=5)
+        nueva = self.crear_publicacion('Nueva')
+        Publicacion.objects.filter(pk=popular.pk).update(
+            num_likes=10, puntaje_popular=popularidad.puntaje(10, 0, timezone.now() - timedelta(hours=5)),
+        )
+
+        vistos = []
+        url = self.url + '&page_size=2'
+        while url:
+            response = self.client.get(url)
+            vistos += [p['id'] for p in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(vistos, [popular.pk, nueva.pk, vieja.pk])
+
+    def test_misma_cantidad_de_consultas_que_el_cronologico(self):
+        for i in range(5):
+            self.crear_publicacion(f'Post {i}', horas=i)
+        with CaptureQueriesContext(connection) as cronologico:
+            self.client.get(reverse('foro-lista'))
+        with CaptureQueriesContext(connection) as popular:
+            self.client.get(self.url)
+        self.assertEqual(len(cronologico.captured_queries), len(popular.captured_queries))
+
+    def test_recalcular_aplica_decaimiento(self):
+        publicacion = self.crear_publicacion('Post')
+        fecha = timezone.now() - timedelta(days=3)
+        Publicacion.objects.filter(pk=publicacion.pk).update(fecha_creacion=fecha)
+
+        salida = StringIO()
+        call_command('recalcular_popularidad', stdout=salida)
+        self.assertIn('1 puntajes recalculados', salida.getvalue())
+        publicacion.refresh_from_db()
+        self.assertAlmostEqual(publicacion.puntaje_popular, popularidad.puntaje(0, 0, fecha), places=6)
+
+
+class ComentariosTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.publicacion = Publicacion.objects.create(usuario=self.usuario, titulo='Post', contenido='...')
+        self.url = reverse('foro-comentarios', args=[self.publicacion.pk])
+
+    def comentar(self, cantidad):
+        Comentario.objects.bulk_create(
+            Comentario(publicacion=self.publicacion, usuario=self.usuario, contenido=f'Comentario {i}')
+            for i in range(cantidad)
+        )
+
+    def test_lista_cronologica_paginada(self):
+        self.comentar(25)
+        vistos = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            vistos += response.data['results']
+            url = response.data['next']
+        self.assertEqual([c['contenido'] for c in vistos], [f'Comentario {i}' for i in range(25)])
+        self.assertEqual(vistos[0]['autor_seudonimo'], self.usuario.seudonimo)
+
+    def test_primera_pagina_no_depende_del_total(self):
+        self.comentar(5)
+        with CaptureQueriesContext(connection) as pocos:
+            self.client.get(self.url)
+        self.comentar(10000)
+        with CaptureQueriesContext(connection) as muchos:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(len(pocos.captured_queries), len(muchos.captured_queries))
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in muchos.captured_queries))
+
+    def test_publicacion_inexistente(self):
+        url = reverse('foro-comentarios', args=[self.publicacion.pk + 1])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(self.url).data['results'], [])
+
+        response = self.client.post(reverse('foro-comentar', args=[self.publicacion.pk + 1]), {'contenido': 'Hola'})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Comentario.objects.exists())
+
+    def test_comentar_no_carga_la_publicacion_completa(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('foro-comentar', args=[self.publicacion.pk]), {'contenido': 'Hola'})
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(any('"contenido"' in q['sql'] and 'FROM "api_publicacion"' in q['sql']
+                             for q in ctx.captured_queries))
+
+
+# --- PAGINACIÓN ---
+class PaginacionCursorTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        DiarioEmocional.objects.bulk_create(
+            DiarioEmocional(usuario=self.usuario, titulo=f'Entrada {i}', contenido='...') for i in range(25)
+        )
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        vistos = []
+        url = reverse('diario-list-create') + '?page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 10)
+            vistos += [entrada['id'] for entrada in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(len(set(vistos)), 25)
+
+    def test_page_size_tiene_maximo(self):
+        DiarioEmocional.objects.bulk_create(
+            DiarioEmocional(usuario=self.usuario, contenido='...') for _ in range(100)
+        )
+        response = self.client.get(reverse('diario-list-create') + '?page_size=1000')
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertIsNotNone(response.data['next'])
+
+
+# --- ÍNDICES ---
+class IndicesExplainTests(TestCase):
+    """
+    Comprueba con EXPLAIN que las consultas de los listados usan los índices compuestos.
+    En Postgres se desactiva el seq scan porque con tablas de prueba tan pequeñas el
+    planificador prefiere recorrerlas enteras.
+    """
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+
+    def assertUsaIndice(self, queryset, indice):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(indice, plan)
+
+    def test_listados_por_usuario(self):
+        self.assertUsaIndice(
+            DiarioEmocional.objects.filter(usuario=self.usuario).order_by(*DiarioPaginacion.ordering)[:21],
+            'diario_usuario_fecha_idx',
+        )
+        self.assertUsaIndice(
+            RegistroEmocion.objects.filter(usuario=self.usuario)[:21], 'emocion_usuario_fecha_idx'
+        )
+        self.assertUsaIndice(
+            EjercicioCompletado.objects.filter(usuario=self.usuario)[:21], 'completado_usuario_fecha_idx'
+        )
+
+    def test_feed_del_foro(self):
+        queryset = Publicacion.objects.con_interacciones(self.usuario).order_by(*PublicacionPaginacion.ordering)
+        self.assertUsaIndice(queryset[:21], 'publicacion_fecha_idx')
+        self.assertUsaIndice(queryset.filter(categoria='ANSIEDAD')[:21], 'publicacion_cat_fecha_idx')
+
+        populares = queryset.order_by(*PublicacionPopularPaginacion.ordering)
+        self.assertUsaIndice(populares[:21], 'publicacion_popular_idx')
+        self.assertUsaIndice(populares.filter(categoria='ANSIEDAD')[:21], 'publicacion_cat_popular_idx')
+
+    def test_comentarios_de_una_publicacion(self):
+        publicacion = Publicacion.objects.create(usuario=self.usuario, titulo='Post', contenido='...')
+        self.assertUsaIndice(
+            Comentario.objects.filter(publicacion=publicacion).order_by(*ComentarioPaginacion.ordering)[:21],
+            'comentario_pub_fecha_idx',
+        )
+
+    def test_catalogos(self):
+        self.assertUsaIndice(
+            Articulo.objects.filter(categoria='SUENO').order_by(*ArticuloPaginacion.ordering)[:11],
+            'articulo_cat_fecha_idx',
+        )
+        self.assertUsaIndice(Tip.objects.order_by(*CatalogoPaginacion.ordering)[:51], 'tip_fecha_idx')
+        self.assertUsaIndice(Ejercicio.objects.order_by(*CatalogoPaginacion.ordering)[:51], 'ejercicio_fecha_idx')
+        self.assertUsaIndice(
+            Cuestionario.objects.filter(activo=True).order_by(*CatalogoPaginacion.ordering)[:51],
+            'cuestionario_activo_idx',
+        )
+
+
+# --- CACHÉ DEL CATÁLOGO ---
+class CatalogoCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario(0))
+        self.tip = Tip.objects.create(titulo='Respira', contenido='...', categoria='ESTRES')
+        Tip.objects.create(titulo='Duerme', contenido='...', categoria='SUENO')
+
+    def test_segunda_lectura_no_consulta_la_base(self):
+        primera = self.client.get(reverse('lista-tips'))
+        with self.assertNumQueries(0):
+            segunda = self.client.get(reverse('lista-tips'))
+        self.assertEqual(primera.data, segunda.data)
+
+    def test_cache_separada_por_filtro(self):
+        response = self.client.get(reverse('lista-tips') + '?categoria=SUENO')
+        self.assertEqual([t['titulo'] for t in response.data['results']], ['Duerme'])
+        response = self.client.get(reverse('lista-tips') + '?categoria=ESTRES')
+        self.assertEqual([t['titulo'] for t in response.data['results']], ['Respira'])
+
+    def test_guardar_o_borrar_invalida(self):
+        self.client.get(reverse('lista-tips'))
+        self.tip.titulo = 'Respira hondo'
+        self.tip.save()
+        response = self.client.get(reverse('lista-tips'))
+        self.assertIn('Respira hondo', [t['titulo'] for t in response.data['results']])
+
+        self.tip.delete()
+        response = self.client.get(reverse('lista-tips'))
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_pregunta_invalida_cuestionarios(self):
+        cuestionario = Cuestionario.objects.create(nombre='PHQ-9')
+        self.client.get(reverse('cuestionario-list'))
+        cuestionario.preguntas.create(texto='¿Cómo dormiste?', orden=1)
+        response = self.client.get(reverse('cuestionario-list'))
+        self.assertEqual(len(response.data['results'][0]['preguntas']), 1)
+
+
+class TipDelDiaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario(0))
+        self.tips = [Tip.objects.create(titulo=f'Tip {i}', contenido='...') for i in range(5)]
+
+    def test_sin_consultas_tras_calentar(self):
+        primera = self.client.get(reverse('tip-del-dia'))
+        with self.assertNumQueries(0):
+            segunda = self.client.get(reverse('tip-del-dia'))
+        self.assertEqual(primera.data, segunda.data)
+
+    def test_prioriza_destacados(self):
+        destacado = self.tips[2]
+        destacado.es_destacado = True
+        destacado.save()
+        response = self.client.get(reverse('tip-del-dia'))
+        self.assertEqual(response.data['id'], destacado.pk)
+
+    def test_sin_tips_devuelve_404(self):
+        Tip.objects.all().delete()
+        response = self.client.get(reverse('tip-del-dia'))
+        self.assertEqual(response.status_code, 404)
+
+
+# --- PETICIONES CONDICIONALES ---
+class RespuestaCondicionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_diario_304_con_una_sola_consulta(self):
+        entrada = DiarioEmocional.objects.create(usuario=self.usuario, contenido='Hoy...')
+        response = self.client.get(reverse('diario-list-create'))
+        etag = response['ETag']
+        # Borrar una entrada no cambia ninguna fecha del diario: solo ETag
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('diario-list-create'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        entrada.contenido = 'Editado'
+        entrada.save()
+        response = self.client.get(reverse('diario-list-create'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_articulo_editado_cambia_etag(self):
+        articulo = Articulo.objects.create(titulo='Dormir mejor', resumen='...', contenido='...')
+        url = reverse('detalle-articulo', args=[articulo.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        articulo.titulo = 'Dormir aún mejor'
+        articulo.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['titulo'], 'Dormir aún mejor')
+
+    def test_if_modified_since_tras_editar_y_borrar(self):
+        articulo = Articulo.objects.create(titulo='Dormir mejor', resumen='...', contenido='...')
+        Articulo.objects.create(titulo='Respirar', resumen='...', contenido='...')
+        url = reverse('detalle-articulo', args=[articulo.pk])
+        fecha = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=fecha).status_code, 304)
+
+        # Edición sin tocar fecha_publicacion, en el mismo segundo
+        articulo.titulo = 'Dormir aún mejor'
+        articulo.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=fecha).status_code, 200)
+
+        lista = reverse('lista-articulos')
+        fecha = self.client.get(lista)['Last-Modified']
+        Articulo.objects.exclude(pk=articulo.pk).delete()
+        response = self.client.get(lista, HTTP_IF_MODIFIED_SINCE=fecha)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+        # Por la API, para que el resumen diario cuente las entradas que luego se borran
+        entrada = self.client.post(reverse('diario-list-create'), {'contenido': 'Hoy...'}).data
+        self.client.post(reverse('diario-list-create'), {'contenido': 'Ayer...'})
+        self.assertEqual(self.client.delete(reverse('diario-detail', args=[entrada['id']])).status_code, 204)
+        response = self.client.get(reverse('diario-list-create'), HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_tip_del_dia_revalida_sin_consultas(self):
+        Tip.objects.create(titulo='Respira', contenido='...')
+        etag = self.client.get(reverse('tip-del-dia'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('tip-del-dia'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+# --- BÚSQUEDA ---
+class BusquedaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario(0))
+
+    def test_busca_articulos_tambien_en_contenido(self):
+        Articulo.objects.create(titulo='Dormir mejor', resumen='Hábitos', contenido='Contra el insomnio...')
+        Articulo.objects.create(titulo='Respirar', resumen='Calma', contenido='Técnica 4-7-8')
+        response = self.client.get(reverse('lista-articulos') + '?search=insomnio')
+        resultados = response.data['results']
+        self.assertEqual([a['titulo'] for a in resultados], ['Dormir mejor'])
+        self.assertIn('insomnio', resultados[0]['fragmento'])
+        self.assertIn('relevancia', resultados[0])
+
+    def test_busca_en_el_foro(self):
+        autor = crear_usuario(1)
+        Publicacion.objects.create(usuario=autor, titulo='No puedo dormir', contenido='Insomnio otra vez')
+        Publicacion.objects.create(usuario=autor, titulo='Exámenes', contenido='Mucho estrés')
+        response = self.client.get(reverse('foro-lista') + '?search=insomnio')
+        self.assertEqual([p['titulo'] for p in response.data['results']], ['No puedo dormir'])
+        self.assertEqual(response.data['count'], 1)
+
+
+# --- ESTADÍSTICAS DE EMOCIONES ---
+class EstadisticasEmocionTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        # Un año de datos: dos registros por día (bulk_update para saltar auto_now_add)
+        self.inicio = timezone.make_aware(datetime(2025, 1, 1, 12))
+        registros = RegistroEmocion.objects.bulk_create(
+            RegistroEmocion(usuario=self.usuario, emocion=emocion, intensidad=intensidad)
+            for _ in range(365) for emocion, intensidad in (('FELIZ', 8), ('ANSIOSO', 4))
+        )
+        for i, registro in enumerate(registros):
+            registro.fecha_registro = self.inicio + timedelta(days=i // 2)
+        RegistroEmocion.objects.bulk_update(registros, ['fecha_registro'])
+
+    def pedir(self, **parametros):
+        return self.client.get(reverse('estadisticas-emociones'), parametros)
+
+    def test_agrega_por_mes_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            response = self.pedir(desde='2025-01-01', hasta='2025-12-31', bucket='month')
+        periodos = response.data['periodos']
+        self.assertEqual(len(periodos), 12)
+        enero = periodos[0]
+        self.assertEqual(enero['total'], 62)
+        self.assertEqual(enero['emociones']['FELIZ']['total'], 31)
+        self.assertEqual(enero['intensidad_promedio'], 6)
+        self.assertEqual(enero['intensidad_maxima'], 8)
+        self.assertEqual(enero['emocion_dominante'], 'FELIZ')
+
+    def test_buckets_diarios_y_semanales(self):
+        response = self.pedir(desde='2025-03-01', hasta='2025-03-07', bucket='day')
+        self.assertEqual(len(response.data['periodos']), 7)
+        response = self.pedir(desde='2025-01-01', hasta='2025-12-31', bucket='week')
+        self.assertEqual(sum(p['total'] for p in response.data['periodos']), 730)
+
+    def test_rango_invalido(self):
+        response = self.pedir(desde='2025-02-01', hasta='2025-01-01')
+        self.assertEqual(response.status_code, 400)
+
+
+# --- RESUMEN DIARIO ---
+class ResumenDiarioTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def resumen_de_hoy(self):
+        return ResumenDiarioUsuario.objects.get(usuario=self.usuario, fecha=timezone.localdate())
+
+    def test_diario_crear_editar_borrar(self):
+        response = self.client.post(reverse('diario-list-create'), {'contenido': 'Hoy...', 'humor': 4})
+        self.client.post(reverse('diario-list-create'), {'contenido': 'Más tarde', 'humor': 2})
+        resumen = self.resumen_de_hoy()
+        self.assertEqual((resumen.entradas_diario, resumen.humor_suma), (2, 6))
+
+        url = reverse('diario-detail', args=[response.data['id']])
+        self.client.patch(url, {'humor': 5})
+        self.assertEqual(self.resumen_de_hoy().humor_suma, 7)
+
+        self.client.delete(url)
+        resumen = self.resumen_de_hoy()
+        self.assertEqual((resumen.entradas_diario, resumen.humor_suma), (1, 2))
+
+    def test_registro_emocion(self):
+        self.client.post(reverse('registrar-emocion'), {'emocion': 'FELIZ', 'intensidad': 7})
+        self.client.post(reverse('registrar-emocion'), {'emocion': 'FELIZ', 'intensidad': 9})
+        self.client.post(reverse('registrar-emocion'), {'emocion': 'TRISTE', 'intensidad': 3})
+        resumen = self.resumen_de_hoy()
+        self.assertEqual((resumen.registros_emocion, resumen.intensidad_suma), (3, 19))
+        self.assertEqual(resumen.emociones['FELIZ'], {'total': 2, 'intensidad_suma': 16})
+
+        response = self.client.get(reverse('resumen-diario'))
+        self.assertEqual(len(response.data), 1)
+        self.assertAlmostEqual(response.data[0]['intensidad_promedio'], 19 / 3)
+
+    def test_reconstruir_coincide_con_incremental(self):
+        self.client.post(reverse('diario-list-create'), {'contenido': 'Hoy...', 'humor': 4})
+        self.client.post(reverse('registrar-emocion'), {'emocion': 'ANSIOSO', 'intensidad': 6})
+        antes = ResumenDiarioUsuarioSerializer(self.resumen_de_hoy()).data
+
+        ResumenDiarioUsuario.objects.all().delete()
+        call_command('reconstruir_resumenes', stdout=StringIO())
+        self.assertEqual(ResumenDiarioUsuarioSerializer(self.resumen_de_hoy()).data, antes)
+
+
+# --- CUESTIONARIOS ---
+class ResponderCuestionarioTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.cuestionario = Cuestionario.objects.create(nombre='GAD-7')
+        self.preguntas = [
+            self.cuestionario.preguntas.create(texto=f'Pregunta {i}', orden=i, tipo_pregunta='ESCALA')
+            for i in range(1, 21)
+        ]
+        self.url = reverse('responder-cuestionario', args=[self.cuestionario.pk])
+
+    def test_hoja_completa_en_pocas_consultas(self):
+        hoja = {'respuestas': [{'pregunta': p.id, 'valor_respuesta': 5} for p in self.preguntas]}
+        # cuestionario + preguntas + savepoint/insert respuestas/insert resultado/release
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, hoja, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(RespuestaUsuario.objects.filter(usuario=self.usuario).count(), 20)
+        fechas = RespuestaUsuario.objects.values_list('fecha_respuesta', flat=True).distinct()
+        self.assertEqual(len(fechas), 1)
+
+    def test_errores_por_pregunta_sin_guardar_nada(self):
+        otra = Cuestionario.objects.create(nombre='Otro').preguntas.create(texto='?', orden=1)
+        hoja = {'respuestas': [
+            {'pregunta': self.preguntas[0].id, 'valor_respuesta': 5},
+            {'pregunta': self.preguntas[1].id, 'valor_respuesta': 11},
+            {'pregunta': otra.id, 'valor_respuesta': 1},
+            {'pregunta': self.preguntas[0].id, 'valor_respuesta': 3},
+        ]}
+        response = self.client.post(self.url, hoja, format='json')
+        self.assertEqual(response.status_code, 400)
+        errores = response.data['respuestas']
+        self.assertEqual(errores[0], {})
+        self.assertIn('valor_respuesta', errores[1])
+        self.assertIn('pregunta', errores[2])
+        self.assertIn('pregunta', errores[3])
+        self.assertFalse(RespuestaUsuario.objects.exists())
+
+    def test_hoja_parcial_rechazada(self):
+        self.preguntas[3].tipo_pregunta = 'TEXTO'
+        self.preguntas[3].save()
+        hoja = {'respuestas': [
+            {'pregunta': p.id, 'valor_respuesta': 5} for p in self.preguntas if p.orden not in (4, 7)
+        ]}
+        response = self.client.post(self.url, hoja, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['respuestas'], ['Faltan respuestas para las preguntas 7.'])
+        self.assertFalse(ResultadoCuestionario.objects.exists())
+
+    def test_cuestionario_inactivo(self):
+        self.cuestionario.activo = False
+        self.cuestionario.save()
+        response = self.client.post(self.url, {'respuestas': []}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class ArbolCuestionariosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(crear_usuario(0))
+        for i in range(5):
+            cuestionario = Cuestionario.objects.create(nombre=f'Cuestionario {i}')
+            for orden in range(1, 4):
+                cuestionario.preguntas.create(texto='?', orden=orden, tipo_pregunta='BOOLEAN')
+
+    def test_arbol_en_consultas_constantes(self):
+        # validadores (ETag) + cuestionarios + preguntas
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('cuestionario-list'))
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['preguntas'][0]['tipo_pregunta'], 'BOOLEAN')
+
+    def test_detalle_cacheado_e_invalidado(self):
+        cuestionario = Cuestionario.objects.first()
+        url = reverse('cuestionario-detail', args=[cuestionario.pk])
+        self.assertEqual(len(self.client.get(url).data['preguntas']), 3)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        cuestionario.preguntas.first().delete()
+        self.assertEqual(len(self.client.get(url).data['preguntas']), 2)
+
+
+class PuntajeCuestionarioTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.cuestionario = Cuestionario.objects.create(
+            nombre='Estrés percibido',
+            rangos_severidad=[{'hasta': 10, 'nivel': 'Bajo'}, {'hasta': 20, 'nivel': 'Moderado'},
+                              {'hasta': 30, 'nivel': 'Alto'}],
+        )
+        self.p1 = self.cuestionario.preguntas.create(texto='?', orden=1, tipo_pregunta='ESCALA')
+        self.p2 = self.cuestionario.preguntas.create(texto='?', orden=2, tipo_pregunta='ESCALA', invertida=True)
+        self.p3 = self.cuestionario.preguntas.create(texto='?', orden=3, tipo_pregunta='BOOLEAN', peso=4)
+
+    def responder(self, v1, v2, v3):
+        hoja = {'respuestas': [
+            {'pregunta': self.p1.id, 'valor_respuesta': v1},
+            {'pregunta': self.p2.id, 'valor_respuesta': v2},
+            {'pregunta': self.p3.id, 'valor_respuesta': v3},
+        ]}
+        return self.client.post(reverse('responder-cuestionario', args=[self.cuestionario.pk]), hoja, format='json')
+
+    def test_puntua_al_guardar(self):
+        # 8 + (11 - 3) + 1 = 17
+        response = self.responder(8, 3, 1)
+        self.assertEqual(response.data['resultado']['puntaje'], 17)
+        self.assertEqual(response.data['resultado']['severidad'], 'Moderado')
+
+        response = self.client.get(reverse('resultados-cuestionarios'))
+        self.assertEqual([r['puntaje'] for r in response.data['results']], [17])
+
+    def test_recalcular_tras_cambiar_estrategia(self):
+        self.responder(8, 3, 1)
+        self.responder(2, 10, 0)
+        self.cuestionario.estrategia_puntaje = 'PONDERADA'
+        self.cuestionario.save()
+
+        call_command('recalcular_puntajes', stdout=StringIO())
+        puntajes = sorted(ResultadoCuestionario.objects.values_list('puntaje', flat=True))
+        # 2 + 1 + 0 = 3 ; 8 + 8 + 4 = 20
+        self.assertEqual(puntajes, [3, 20])
+        self.assertEqual(ResultadoCuestionario.objects.get(puntaje=20).estrategia, 'PONDERADA')
+
+    def test_endpoint_de_una_respuesta_puntua_o_rechaza(self):
+        url = reverse('responder-pregunta')
+        response = self.client.post(url, {'pregunta': self.p1.id, 'valor_respuesta': 8}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Faltan respuestas para las preguntas 2, 3.', str(response.data))
+        self.assertFalse(RespuestaUsuario.objects.exists())
+
+        # Con una sola pregunta puntuable, la respuesta es la hoja entera
+        corto = Cuestionario.objects.create(nombre='Ánimo', rangos_severidad=[{'hasta': 5, 'nivel': 'Bajo'}])
+        pregunta = corto.preguntas.create(texto='?', orden=1, tipo_pregunta='ESCALA')
+        response = self.client.post(url, {'pregunta': pregunta.id, 'valor_respuesta': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['resultado']['puntaje'], response.data['resultado']['severidad']), (4, 'Bajo'))
+        self.assertEqual(self.client.post(url, {'pregunta': 0, 'valor_respuesta': 4}).status_code, 400)
+
+    def test_estrategia_incompleta_no_se_puede_registrar(self):
+        class SoloPython(puntajes.EstrategiaPuntaje):
+            def puntuar(self, respuestas):
+                return 0.0
+        with self.assertRaises(TypeError):
+            SoloPython()
+
+    def test_recalcular_ignora_respuestas_sueltas(self):
+        # Respuestas del endpoint antiguo: cada una con su propia fecha
+        for pregunta, valor in [(self.p1, 9), (self.p2, 1), (self.p3, 1)]:
+            RespuestaUsuario.objects.create(usuario=self.usuario, pregunta=pregunta, valor_respuesta=valor)
+        self.responder(8, 3, 1)
+
+        call_command('recalcular_puntajes', stdout=StringIO())
+        self.assertEqual(list(ResultadoCuestionario.objects.values_list('puntaje', flat=True)), [17])
+
+
+# --- SINCRONIZACIÓN OFFLINE ---
+class SincronizacionTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse('sincronizacion')
+
+    def operacion(self, tipo, accion, **extra):
+        return {'clave': str(uuid.uuid4()), 'tipo': tipo, 'accion': accion, **extra}
+
+    def sincronizar(self, operaciones):
+        return self.client.post(self.url, {'operaciones': operaciones}, format='json')
+
+    def test_lote_mixto_y_reintento_idempotente(self):
+        entrada = DiarioEmocional.objects.create(usuario=self.usuario, contenido='Vieja', humor=2)
+        operaciones = [
+            self.operacion('diario', 'crear', datos={'contenido': 'Offline', 'humor': 4}),
+            self.operacion('emocion', 'crear', datos={'emocion': 'TRISTE', 'intensidad': 6}),
+            self.operacion('diario', 'actualizar', id=entrada.pk, datos={'humor': 5}),
+            self.operacion('emocion', 'crear', datos={'emocion': 'NO_EXISTE'}),
+            self.operacion('diario', 'eliminar', id=999),
+        ]
+        primera = self.sincronizar(operaciones).data['resultados']
+        self.assertEqual([r['estado'] for r in primera], ['creado', 'creado', 'actualizado', 'error', 'error'])
+
+        segunda = self.sincronizar(operaciones).data['resultados']
+        self.assertEqual(primera[:3], segunda[:3])
+        self.assertEqual(DiarioEmocional.objects.count(), 2)
+        self.assertEqual(RegistroEmocion.objects.count(), 1)
+        entrada.refresh_from_db()
+        self.assertEqual(entrada.humor, 5)
+
+    def test_consultas_no_crecen_con_el_lote(self):
+        def consultas(cantidad):
+            operaciones = [
+                self.operacion('emocion', 'crear', datos={'emocion': 'FELIZ', 'intensidad': 5})
+                for _ in range(cantidad)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                self.sincronizar(operaciones)
+            return len(ctx.captured_queries)
+        consultas(1)  # crea la fila del resumen del día
+        self.assertEqual(consultas(5), consultas(100))
+
+    def test_resumen_diario_sigue_al_lote(self):
+        creadas = self.sincronizar([
+            self.operacion('diario', 'crear', datos={'contenido': 'A', 'humor': 4}),
+            self.operacion('diario', 'crear', datos={'contenido': 'B', 'humor': 2}),
+        ]).data['resultados']
+        self.sincronizar([self.operacion('diario', 'eliminar', id=creadas[0]['id'])])
+        resumen = ResumenDiarioUsuario.objects.get(usuario=self.usuario)
+        self.assertEqual((resumen.entradas_diario, resumen.humor_suma), (1, 2))
+
+    def test_descarga_de_cambios_desde_marca(self):
+        vieja = DiarioEmocional.objects.create(usuario=self.usuario, contenido='Antes')
+        borrar = self.sincronizar([
+            self.operacion('emocion', 'crear', datos={'emocion': 'FELIZ'}),
+        ]).data['resultados'][0]['id']
+        marca = self.client.get(self.url).data['marca']
+
+        DiarioEmocional.objects.create(usuario=self.usuario, contenido='Después')
+        self.sincronizar([self.operacion('emocion', 'eliminar', id=borrar)])
+
+        cambios = self.client.get(self.url, {'desde': marca}).data
+        self.assertEqual([e['contenido'] for e in cambios['diario']], ['Después'])
+        self.assertNotIn(vieja.pk, [e['id'] for e in cambios['diario']])
+        self.assertEqual(cambios['eliminados'], [{'tipo': 'emocion', 'id': borrar}])
+        self.assertFalse(cambios['hay_mas'])
+
+    def test_marca_no_salta_filas_confirmadas_tarde(self):
+        # Sin filas todavía la marca es vacía y vale como "desde el principio"
+        marca = self.client.get(self.url).data['marca']
+        primera = DiarioEmocional.objects.create(usuario=self.usuario, contenido='Primera')
+        cambios = self.client.get(self.url, {'desde': marca}).data
+        self.assertEqual([e['id'] for e in cambios['diario']], [primera.pk])
+        marca = cambios['marca']
+
+        # Una transacción que empezó antes de la lectura confirma después: su fecha es
+        # anterior al momento de la lectura pero posterior a la última fila entregada
+        tardia = DiarioEmocional.objects.create(usuario=self.usuario, contenido='Tardía')
+        DiarioEmocional.objects.filter(pk=tardia.pk).update(
+            fecha_actualizacion=primera.fecha_actualizacion + timedelta(microseconds=1),
+        )
+        cambios = self.client.get(self.url, {'desde': marca}).data
+        self.assertEqual([e['id'] for e in cambios['diario']], [tardia.pk])
+
+    def test_lote_enviado_dos_veces_a_la_vez(self):
+        operaciones = [self.operacion('diario', 'crear', datos={'contenido': 'Offline'})]
+        self.sincronizar(operaciones)
+        # El segundo envío no ve las claves del primero, como si ambos leyeran a la vez
+        with mock.patch.object(
+            OperacionSincronizacion.objects, 'filter', return_value=OperacionSincronizacion.objects.none(),
+        ):
+            response = self.sincronizar(operaciones)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(DiarioEmocional.objects.count(), 1)
+        self.assertEqual(self.sincronizar(operaciones).status_code, 200)
+
+    def test_marca_no_valida(self):
+        for desde in ['basura', timezone.now().isoformat(), 'ZGlhcmlvOjE6MjAyNC0wMS0wMQ==']:
+            self.assertEqual(self.client.get(self.url, {'desde': desde}).status_code, 400)
+
+    @mock.patch('api.views.SincronizacionView.LIMITE_CAMBIOS', 3)
+    def test_paginas_con_la_misma_fecha_avanzan(self):
+        # Cada lote pone la misma fecha a todas sus filas: más filas que el límite con
+        # una sola fecha no pueden dejar la marca quieta
+        creadas = self.sincronizar(
+            [self.operacion('diario', 'crear', datos={'contenido': str(i)}) for i in range(7)]
+            + [self.operacion('emocion', 'crear', datos={'emocion': 'FELIZ'}) for _ in range(8)]
+        ).data['resultados']
+        emociones = [r['id'] for r in creadas[7:]]
+        self.sincronizar([self.operacion('emocion', 'eliminar', id=pk) for pk in emociones[:5]])
+
+        diario, vivas, eliminados = [], [], []
+        params = {}
+        for _ in range(10):
+            cambios = self.client.get(self.url, params).data
+            diario += [e['id'] for e in cambios['diario']]
+            vivas += [e['id'] for e in cambios['emociones']]
+            eliminados += [e['id'] for e in cambios['eliminados']]
+            params = {'desde': cambios['marca']}
+            if not cambios['hay_mas']:
+                break
+        self.assertFalse(cambios['hay_mas'])
+        self.assertEqual(sorted(diario), sorted(r['id'] for r in creadas[:7]))
+        self.assertEqual(sorted(vivas), sorted(emociones[5:]))
+        self.assertEqual(sorted(eliminados), sorted(emociones[:5]))
+
+        # Y desde la última marca ya no hay nada
+        cambios = self.client.get(self.url, params).data
+        self.assertEqual((cambios['diario'], cambios['emociones'], cambios['eliminados']), ([], [], []))
+
+
+# --- IDEMPOTENCIA ---
+class IdempotenciaTests(TestCase):
+    def setUp(self):
+        caches['idempotencia'].clear()
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        # El middleware lee el usuario del token, así que aquí se usa un JWT real
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.usuario).access_token}')
+        self.url = reverse('registrar-emocion')
+
+    def registrar(self, clave, **datos):
+        return self.client.post(
+            self.url, {'emocion': 'FELIZ', 'intensidad': 7, **datos}, format='json', HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def test_cors_permite_la_cabecera_desde_el_navegador(self):
+        origen = {'HTTP_ORIGIN': 'http://localhost:5173'}
+        preflight = self.client.options(
+            self.url, HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST',
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS='authorization,content-type,idempotency-key', **origen,
+        )
+        self.assertIn('idempotency-key', preflight['Access-Control-Allow-Headers'])
+        respuesta = self.client.post(
+            self.url, {'emocion': 'FELIZ', 'intensidad': 7}, format='json', HTTP_IDEMPOTENCY_KEY='k', **origen,
+        )
+        self.assertIn('idempotent-replayed', respuesta['Access-Control-Expose-Headers'])
+
+    def test_reintento_repite_la_respuesta_sin_ejecutar_la_vista(self):
+        primera = self.registrar('abc-1')
+        with self.assertNumQueries(0):
+            segunda = self.registrar('abc-1')
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(RegistroEmocion.objects.count(), 1)
+
+    def test_misma_clave_con_otro_cuerpo_es_rechazada(self):
+        self.registrar('abc-1')
+        respuesta = self.registrar('abc-1', intensidad=3)
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(RegistroEmocion.objects.count(), 1)
+
+    def test_claves_separadas_por_usuario(self):
+        self.registrar('compartida')
+        otro = APIClient()
+        otro.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(crear_usuario(1)).access_token}')
+        respuesta = otro.post(
+            self.url, {'emocion': 'FELIZ', 'intensidad': 7}, format='json', HTTP_IDEMPOTENCY_KEY='compartida',
+        )
+        self.assertNotIn('Idempotent-Replayed', respuesta)
+        self.assertEqual(RegistroEmocion.objects.count(), 2)
+
+    def test_peticion_en_curso_devuelve_409(self):
+        # Simula una copia todavía en ejecución: el bloqueo existe pero no hay respuesta
+        base = hashlib.md5(f'{self.usuario.pk}|abc-2'.encode()).hexdigest()
+        caches['idempotencia'].add(f'idem:{base}:bloqueo', 'x')
+        respuesta = self.registrar('abc-2')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta['Retry-After'], '1')
+
+    def test_sin_cabecera_no_cambia_nada(self):
+        self.client.post(self.url, {'emocion': 'FELIZ'}, format='json')
+        self.client.post(self.url, {'emocion': 'FELIZ'}, format='json')
+        self.assertEqual(RegistroEmocion.objects.count(), 2)
+
+
+# --- AUTENTICACIÓN JWT SIN CONSULTA ---
+class AutenticacionSinConsultaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        estado_usuarios.olvidar()
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        respuesta = self.client.post(
+            reverse('token_obtain_pair'), {'email': 'usuario0@test.com', 'password': 'clave-segura-123'},
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {respuesta.data['access']}")
+        Tip.objects.create(titulo='Respira', contenido='...', categoria='ESTRES')
+
+    def consultas_a_usuarios(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'api_usuario' in q['sql']]
+
+    def test_peticiones_seguidas_no_consultan_el_usuario(self):
+        self.assertEqual(len(self.consultas_a_usuarios(reverse('tip-del-dia'))), 1)
+        self.assertEqual(self.consultas_a_usuarios(reverse('tip-del-dia')), [])
+        self.assertEqual(self.consultas_a_usuarios(reverse('lista-articulos')), [])
+
+    def test_campos_no_incluidos_en_el_token_se_cargan_en_una_consulta(self):
+        self.client.get(reverse('tip-del-dia'))
+        consultas = self.consultas_a_usuarios(reverse('user-me'))
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(self.client.get(reverse('user-me')).data['email'], 'usuario0@test.com')
+
+    def test_el_usuario_del_token_sirve_como_clave_foranea(self):
+        respuesta = self.client.post(reverse('diario-list-create'), {'contenido': 'Hoy', 'humor': 4})
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(DiarioEmocional.objects.get().usuario, self.usuario)
+
+    def test_cambio_de_contrasena_y_baja_revocan_el_token(self):
+        url = reverse('tip-del-dia')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.usuario.set_password('otra-clave-456')
+        self.usuario.save()
+        # Dentro del TTL el proceso todavía recuerda el estado anterior
+        self.assertEqual(self.client.get(url).status_code, 200)
+        estado_usuarios.olvidar(str(self.usuario.pk))
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        estado_usuarios.olvidar()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_quitar_staff_no_espera_a_que_venza_el_token(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_staff=True)
+        self.usuario.refresh_from_db()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenUsuario.for_user(self.usuario).access_token}')
+        self.assertEqual(client.get(reverse('metricas')).status_code, 200)
+
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_staff=False)
+        estado_usuarios.olvidar()  # lo que pasa al vencer JWT_ESTADO_USUARIO_TTL
+        self.assertEqual(client.get(reverse('metricas')).status_code, 403)
+
+
+# --- HASH DE CONTRASEÑAS ---
+class HashContrasenasTests(TestCase):
+    def login(self, client, clave='clave-segura-123'):
+        return client.post(reverse('token_obtain_pair'), {'email': 'usuario0@test.com', 'password': clave})
+
+    def test_usuarios_nuevos_usan_scrypt_con_los_parametros_ajustados(self):
+        usuario = crear_usuario(0)
+        self.assertTrue(usuario.password.startswith('scrypt$32768$'))
+        self.assertEqual(identify_hasher(usuario.password).safe_summary(usuario.password)['parallelism'], 3)
+
+    def test_pool_y_calculo_en_linea_dan_el_mismo_hash(self):
+        hasher = ScryptEnPoolPasswordHasher()
+        en_pool = hasher.encode('clave', 'salsalsalsal')
+        with self.settings(HASH_PROCESOS=0):
+            self.assertEqual(hasher.encode('clave', 'salsalsalsal'), en_pool)
+
+    def test_hash_viejo_se_actualiza_en_el_login(self):
+        usuario = crear_usuario(0)
+        Usuario.objects.filter(pk=usuario.pk).update(
+            password=make_password('clave-segura-123', hasher='pbkdf2_sha256'),
+        )
+        usuario.refresh_from_db()
+        # Sesión abierta antes del cambio de hasher: el proceso recuerda la huella vieja
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {TokenUsuario.for_user(usuario).access_token}')
+        self.assertEqual(client.get(reverse('user-me')).status_code, 200)
+
+        respuesta = self.login(APIClient())
+        usuario.refresh_from_db()
+        self.assertTrue(usuario.password.startswith('scrypt$'))
+        # El token del login lleva la huella nueva y vale enseguida
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {respuesta.data['access']}")
+        self.assertEqual(client.get(reverse('user-me')).status_code, 200)
+        self.assertEqual(self.login(APIClient()).status_code, 200)
+
+
+# --- LECTURAS ASYNC ---
+class VistasAsyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        estado_usuarios.olvidar()
+        self.usuario = crear_usuario(0)
+        self.token = f'Bearer {TokenUsuario.for_user(self.usuario).access_token}'
+        self.client = AsyncClient()
+        Tip.objects.create(titulo='Respira', contenido='...', categoria='ESTRES')
+        for i in range(5):
+            Articulo.objects.create(titulo=f'Artículo {i}', resumen='...', contenido='...', categoria='SUENO')
+        autor = crear_usuario(1)
+        for i in range(3):
+            Publicacion.objects.create(usuario=autor, titulo=f'Post {i}', contenido='...').likes.add(self.usuario)
+
+    async def get(self, url, data=None, cabeceras=None):
+        # AsyncClient solo manda las cabeceras pasadas en cada petición
+        return await self.client.get(url, data, headers={'Authorization': self.token, **(cabeceras or {})})
+
+    def sincrona(self, nombre, **params):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=self.token)
+        return client.get(reverse(nombre), params).json()
+
+    async def test_mismo_json_que_las_vistas_sincronas(self):
+        tip = await self.get(reverse('tip-del-dia-async'))
+        self.assertEqual(tip.json(), await sync_to_async(self.sincrona)('tip-del-dia'))
+        perfil = await self.get(reverse('user-me-async'))
+        self.assertEqual(perfil.json(), await sync_to_async(self.sincrona)('user-me'))
+        feed = (await self.get(reverse('foro-lista-async'))).json()
+        self.assertEqual(feed['results'], (await sync_to_async(self.sincrona)('foro-lista'))['results'])
+        self.assertTrue(all(p['ya_di_like'] for p in feed['results']))
+        popular = (await self.get(reverse('foro-lista-async'), {'orden': 'popular', 'page_size': 2})).json()
+        resto = (await self.get(popular['next'])).json()
+        self.assertEqual(
+            popular['results'] + resto['results'],
+            (await sync_to_async(self.sincrona)('foro-lista', orden='popular'))['results'],
+        )
+
+    async def test_paginacion_por_cursor(self):
+        url = reverse('lista-articulos-async')
+        primera = (await self.get(url, {'page_size': 3})).json()
+        segunda = (await self.get(primera['next'])).json()
+        titulos = [a['titulo'] for a in primera['results'] + segunda['results']]
+        self.assertEqual(titulos, [f'Artículo {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(segunda['next'])
+        self.assertEqual((await self.get(segunda['previous'])).json(), primera)
+        self.assertEqual((await self.get(url, {'cursor': 'basura'})).status_code, 404)
+
+    async def test_cursores_compartidos_con_la_vista_sincrona(self):
+        sincrona = await sync_to_async(self.sincrona)('lista-articulos', page_size=2)
+        cursor = parse_qs(urlsplit(sincrona['next']).query)['cursor'][0]
+        asincrona = (await self.get(reverse('lista-articulos-async'), {'page_size': 2, 'cursor': cursor})).json()
+        esperada = await sync_to_async(self.sincrona)('lista-articulos', page_size=2, cursor=cursor)
+        self.assertEqual(asincrona['results'], esperada['results'])
+        for enlace in ('next', 'previous'):
+            self.assertEqual(  # misma posición; solo cambia la ruta
+                parse_qs(urlsplit(asincrona[enlace]).query), parse_qs(urlsplit(esperada[enlace]).query),
+            )
+
+    async def test_generacion_nueva_marca_el_catalogo(self):
+        cache.clear()  # como tras un reinicio de la caché: sin generación ni fecha
+        await self.get(reverse('lista-articulos-async'))
+        self.assertIsNotNone(modificado('articulos'))
+
+    async def test_next_absoluto_segun_esquema_y_host(self):
+        url = reverse('lista-articulos-async')
+        for secure, esquema in [(False, 'http'), (True, 'https')]:
+            respuesta = await self.client.get(url, {'page_size': 2}, headers={'Authorization': self.token}, secure=secure)
+            self.assertTrue(respuesta.json()['next'].startswith(f'{esquema}://testserver/'))
+
+        # AsyncClient no deja cambiar el Host; la vista síncrona usa la misma clave
+        def siguiente(host):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=self.token)
+            return client.get(reverse('lista-articulos'), {'page_size': 2}, HTTP_HOST=host).json()['next']
+        with self.settings(ALLOWED_HOSTS=['a.test', 'b.test']):
+            for host in ('a.test', 'b.test'):
+                self.assertTrue((await sync_to_async(siguiente)(host)).startswith(f'http://{host}/'))
+
+    async def test_etag_y_304(self):
+        url = reverse('detalle-articulo-async', args=[(await Articulo.objects.afirst()).pk])
+        respuesta = await self.get(url)
+        repetida = await self.get(url, cabeceras={'If-None-Match': respuesta['ETag']})
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual((await self.get(reverse('detalle-articulo-async', args=[0]))).status_code, 404)
+
+    async def test_autenticacion(self):
+        anonimo = AsyncClient()
+        self.assertEqual((await anonimo.get(reverse('user-me-async'))).status_code, 401)
+        self.assertEqual((await anonimo.get(reverse('lista-articulos-async'))).status_code, 200)
+        malo = await anonimo.get(reverse('tip-del-dia-async'), headers={'Authorization': 'Bearer no-es-un-token'})
+        self.assertEqual(malo.status_code, 401)
+        self.assertEqual((await self.client.post(reverse('tip-del-dia-async'))).status_code, 405)
+
+
+# --- EXPORTACIÓN ---
+class ExportacionTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        base = timezone.now() - timedelta(days=10)
+
+        def en(modelo, campo, dias, **datos):
+            objeto = modelo.objects.create(usuario=self.usuario, **datos)
+            modelo.objects.filter(pk=objeto.pk).update(**{campo: base + timedelta(days=dias)})
+
+        pregunta = Cuestionario.objects.create(nombre='PHQ-9').preguntas.create(texto='¿Ánimo?', orden=1)
+        ejercicio = Ejercicio.objects.create(titulo='Respiración 4-7-8', descripcion='...', categoria='RESPIRACION', duracion=5)
+        en(DiarioEmocional, 'fecha_entrada', 3, contenido='Día tranquilo', humor=4)
+        en(RegistroEmocion, 'fecha_registro', 1, emocion='TRISTE', intensidad=6)
+        en(EjercicioCompletado, 'fecha_completado', 4, ejercicio=ejercicio)
+        RespuestaUsuario.objects.create(
+            usuario=self.usuario, pregunta=pregunta, valor_respuesta=2, fecha_respuesta=base + timedelta(days=2),
+        )
+        DiarioEmocional.objects.create(usuario=crear_usuario(1), contenido='Ajeno')
+
+    def descargar(self, **extra):
+        respuesta = self.client.get(reverse('exportacion'), {'formato': extra.pop('formato', 'ndjson')}, **extra)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_ndjson_intercala_por_fecha(self):
+        with self.assertNumQueries(4):  # una consulta por modelo, sin importar el tamaño
+            respuesta, cuerpo = self.descargar()
+        registros = [json.loads(linea) for linea in cuerpo.decode().splitlines()]
+        self.assertEqual([r['tipo'] for r in registros], ['emocion', 'respuesta', 'diario', 'ejercicio'])
+        self.assertEqual(registros[1]['pregunta__texto'], '¿Ánimo?')
+        self.assertEqual(registros[3]['ejercicio__titulo'], 'Respiración 4-7-8')
+        self.assertIn('attachment;', respuesta['Content-Disposition'])
+
+    def test_csv_con_columnas_unificadas(self):
+        _, cuerpo = self.descargar(formato='csv')
+        filas = list(csv.DictReader(StringIO(cuerpo.decode())))
+        self.assertEqual(len(filas), 4)
+        self.assertEqual((filas[0]['tipo'], filas[0]['emocion'], filas[0]['humor']), ('emocion', 'TRISTE', ''))
+        self.assertEqual(filas[2]['contenido'], 'Día tranquilo')
+
+    def test_sin_cursores_del_servidor_pagina_por_keyset(self):
+        # Dos registros más con la misma fecha: el id desempata entre páginas
+        fecha = DiarioEmocional.objects.get(usuario=self.usuario).fecha_entrada
+        for contenido in ('Otro', 'Y otro'):
+            entrada = DiarioEmocional.objects.create(usuario=self.usuario, contenido=contenido)
+            DiarioEmocional.objects.filter(pk=entrada.pk).update(fecha_entrada=fecha)
+        _, esperado = self.descargar()
+
+        with mock.patch.dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True), \
+                mock.patch('api.exportacion.CHUNK_SIZE', 2):
+            # diario: 3 filas en 2 páginas; los demás: 1 fila en 1 página
+            with self.assertNumQueries(5):
+                _, cuerpo = self.descargar()
+        self.assertEqual(cuerpo, esperado)
+
+    async def test_asgi_entrega_por_lotes(self):
+        _, esperado = await sync_to_async(self.descargar)()
+        token = f'Bearer {TokenUsuario.for_user(self.usuario).access_token}'
+        with mock.patch('api.exportacion.CHUNK_SIZE', 1):
+            respuesta = await AsyncClient().get(reverse('exportacion'), headers={'Authorization': token})
+            self.assertTrue(respuesta.is_async)  # Django no lo junta en memoria
+            lotes = [lote async for lote in respuesta.streaming_content]
+        self.assertEqual(len(lotes), 4)
+        self.assertEqual(b''.join(lotes), esperado)
+
+    def test_gzip(self):
+        respuesta, comprimido = self.descargar(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(comprimido).decode().splitlines()), 4)
+
+    def test_formato_invalido(self):
+        self.assertEqual(self.client.get(reverse('exportacion'), {'formato': 'xml'}).status_code, 400)
+
+
+# --- MÉTRICAS ---
+@override_settings(METRICAS=True)
+class MetricasTests(TestCase):
+    def setUp(self):
+        metricas.registro.reiniciar()
+        self.staff = crear_usuario(0, is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_server_timing_y_prometheus(self):
+        Publicacion.objects.create(usuario=self.staff, titulo='Post', contenido='...')
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse('foro-lista'))
+        consultas = len(ctx.captured_queries)
+        timing = respuesta['Server-Timing']
+        self.assertIn(f'desc="{consultas} consultas"', timing)
+        self.assertIn('render;dur=', timing)
+
+        texto = self.client.get(reverse('metricas'))
+        self.assertEqual(texto['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        contenido = texto.content.decode()
+        etiquetas = 'vista="foro-lista",metodo="GET"'
+        self.assertIn(f'menteabierta_peticion_segundos_count{{{etiquetas}}} 1', contenido)
+        self.assertIn(f'menteabierta_bd_consultas_sum{{{etiquetas}}} {consultas}', contenido)
+        self.assertIn(f'menteabierta_respuesta_bytes_bucket{{{etiquetas},le="+Inf"}} 1', contenido)
+        self.assertIn(f'menteabierta_respuestas_total{{{etiquetas},estado="200"}} 1', contenido)
+
+    async def test_consultas_contadas_bajo_asgi(self):
+        await Publicacion.objects.acreate(usuario=self.staff, titulo='Post', contenido='...')
+        await sync_to_async(cache.clear)()
+        token = f'Bearer {TokenUsuario.for_user(self.staff).access_token}'
+        wsgi = APIClient()
+        wsgi.credentials(HTTP_AUTHORIZATION=token)
+        estado_usuarios.olvidar()
+        sincrona = await sync_to_async(wsgi.get)(reverse('foro-lista'))
+        consultas = sincrona['Server-Timing'].split(';desc=')[1].split(',')[0]
+
+        # Vista síncrona de DRF (corre en un hilo) y vista async con el ORM async
+        client = AsyncClient()
+        estado_usuarios.olvidar()
+        respuesta = await client.get(reverse('foro-lista'), headers={'Authorization': token})
+        self.assertIn(f';desc={consultas}', respuesta['Server-Timing'])
+        respuesta = await client.get(reverse('lista-articulos-async'), headers={'Authorization': token})
+        self.assertNotIn('desc="0 consultas"', respuesta['Server-Timing'])
+
+    def test_solo_staff(self):
+        otro = APIClient()
+        self.assertEqual(otro.get(reverse('metricas')).status_code, 401)
+        otro.force_authenticate(crear_usuario(1))
+        self.assertEqual(otro.get(reverse('metricas')).status_code, 403)
+
+    def test_desactivado_o_sin_muestreo(self):
+        with self.settings(METRICAS=False):
+            self.assertNotIn('Server-Timing', APIClient().get(reverse('lista-articulos')))
+        with self.settings(METRICAS_MUESTREO=0):
+            self.assertNotIn('Server-Timing', APIClient().get(reverse('lista-articulos')))
+        self.assertEqual(metricas.registro.histogramas, {})
@@ -6,19 +6,29 @@ from .views import (
     DiarioEmocionalRetrieveUpdateDestroyView,
     PerfilUsuarioView,
     CuestionarioListView,
+    CuestionarioDetailView,
     RespuestaCreateView,
+    ResponderCuestionarioView,
+    ResultadoCuestionarioListView,
     RegistroEmocionCreateView,
+    EstadisticasEmocionView,
+    ResumenDiarioListView,
+    SincronizacionView,
+    ExportacionView,
     EjercicioListView,
     MarcarEjercicioCompletadoView,
     PublicacionListCreateView,
     PublicacionDetailView,
     ComentarPublicacionView,
+    ComentarioListView,
     ToggleLikeView,
     ArticuloListView,
     ArticuloDetailView,
     TipListView,
-    TipDelDiaView
+    TipDelDiaView,
+    MetricasView,
 )
+from . import vistas_async
 
 urlpatterns = [
     # --- ENDPOINTS DE AUTENTICACIÓN (RF1, RF2) ---
@@ -40,15 +50,26 @@ urlpatterns = [
     # 4. Listar y Crear Entradas (GET, POST /api/v1/diario/)
     path('diario/', DiarioEmocionalListCreateView.as_view(), name='diario-list-create'),
     # 5. Detalle, Actualizar y Eliminar (GET, PUT, DELETE /api/v1/diario/{id}/)
-    path('diario/<uuid:pk>/', DiarioEmocionalRetrieveUpdateDestroyView.as_view(), name='diario-detail'),
-    # Nota sobre <uuid:pk>: indica que el parámetro de la URL es un UUID y se pasa como 'pk' a la vista.
+    path('diario/<int:pk>/', DiarioEmocionalRetrieveUpdateDestroyView.as_view(), name='diario-detail'),
+    # Nota sobre <int:pk>: el id de DiarioEmocional es numérico (BigAutoField) y se pasa como 'pk' a la vista.
     
     # --- ENDPOINTS DE CUESTIONARIOS ---
     path('cuestionarios/', CuestionarioListView.as_view(), name='cuestionario-list'),
+    path('cuestionarios/<int:pk>/', CuestionarioDetailView.as_view(), name='cuestionario-detail'),
     path('cuestionarios/responder/', RespuestaCreateView.as_view(), name='responder-pregunta'),
+    path('cuestionarios/<int:pk>/responder/', ResponderCuestionarioView.as_view(), name='responder-cuestionario'),
+    path('cuestionarios/resultados/', ResultadoCuestionarioListView.as_view(), name='resultados-cuestionarios'),
     
     # --- ENDPOINT DE EMOCIONES ---
     path('emociones/', RegistroEmocionCreateView.as_view(), name='registrar-emocion'),
+    path('emociones/estadisticas/', EstadisticasEmocionView.as_view(), name='estadisticas-emociones'),
+    path('resumen/diario/', ResumenDiarioListView.as_view(), name='resumen-diario'),
+
+    # --- SINCRONIZACIÓN OFFLINE ---
+    path('sync/', SincronizacionView.as_view(), name='sincronizacion'),
+
+    # --- EXPORTACIÓN DEL HISTORIAL ---
+    path('export/', ExportacionView.as_view(), name='exportacion'),
     
     # --- ENDPOINTS DE EJERCICIOS ---
     path('ejercicios/', EjercicioListView.as_view(), name='lista-ejercicios'),
@@ -58,6 +79,7 @@ urlpatterns = [
     path('foro/publicaciones/', PublicacionListCreateView.as_view(), name='foro-lista'),
     path('foro/publicaciones/<int:pk>/', PublicacionDetailView.as_view(), name='foro-detalle'),
     path('foro/publicaciones/<int:pk>/comentar/', ComentarPublicacionView.as_view(), name='foro-comentar'),
+    path('foro/publicaciones/<int:pk>/comentarios/', ComentarioListView.as_view(), name='foro-comentarios'),
     path('foro/publicaciones/<int:pk>/like/', ToggleLikeView.as_view(), name='foro-like'),
     
     # --- ENDPOINTS DE CONTENIDO ---
@@ -67,4 +89,14 @@ urlpatterns = [
     # --- ENDPOINTS DE TIPS ---
     path('tips/', TipListView.as_view(), name='lista-tips'),
     path('tips/dia/', TipDelDiaView.as_view(), name='tip-del-dia'),
+
+    # --- LECTURAS ASYNC (ASGI, ver api/vistas_async.py) ---
+    path('async/tips/dia/', vistas_async.tip_del_dia_async, name='tip-del-dia-async'),
+    path('async/contenido/articulos/', vistas_async.articulos_async, name='lista-articulos-async'),
+    path('async/contenido/articulos/<int:pk>/', vistas_async.articulo_detalle_async, name='detalle-articulo-async'),
+    path('async/foro/publicaciones/', vistas_async.publicaciones_async, name='foro-lista-async'),
+    path('async/user/me/', vistas_async.perfil_async, name='user-me-async'),
+
+    # --- MÉTRICAS (staff, ver api/metricas.py) ---
+    path('_metrics', MetricasView.as_view(), name='metricas'),
 ]
\ No newline at end of file
@@ -1,26 +1,54 @@
 from django.shortcuts import render
 from rest_framework import generics, permissions
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from .autenticacion import TokenUsuario
 from .models import DiarioEmocional
 from .serializers import UsuarioRegistroSerializer, DiarioEmocionalSerializer
 from .serializers import UsuarioRegistroSerializer, DiarioEmocionalSerializer, UsuarioPerfilSerializer
-from .models import Cuestionario, RespuestaUsuario
-from .serializers import CuestionarioDetailSerializer, RespuestaUsuarioSerializer
-from .models import RegistroEmocion
-from .serializers import RegistroEmocionSerializer
+from .models import Cuestionario, Pregunta, RespuestaUsuario
+from .serializers import CuestionarioDetailSerializer, RespuestaUsuarioSerializer, HojaRespuestasSerializer
+from .serializers import RespuestaItemSerializer
+from .serializers import ResultadoCuestionarioSerializer
+from .models import ResultadoCuestionario
+from .models import RegistroEmocion, ResumenDiarioUsuario, RegistroEliminado
+from .serializers import RegistroEmocionSerializer, EstadisticasEmocionParametrosSerializer
+from .serializers import RangoFechasParametrosSerializer, ResumenDiarioUsuarioSerializer
+from .serializers import LoteSincronizacionSerializer, CambiosParametrosSerializer
+from .serializers import ExportacionParametrosSerializer
 from .models import Ejercicio, EjercicioCompletado
 from .serializers import EjercicioSerializer, EjercicioCompletadoSerializer
 from .models import Publicacion, Comentario
-from .serializers import PublicacionSerializer, ComentarioSerializer
+from .serializers import PublicacionSerializer, ComentarioSerializer, PublicacionBusquedaSerializer
 from .models import Articulo
-from .serializers import ArticuloSerializer
-from rest_framework import filters
+from .serializers import ArticuloSerializer, ArticuloBusquedaSerializer
+from .busqueda import BusquedaMixin, BusquedaTextoCompleto
 from .models import Tip
 from .serializers import TipSerializer
+from . import cache as catalogo_cache
+from . import resumenes
+from . import puntajes
+from . import sincronizacion
+from . import exportacion
+from . import popularidad
+from . import likes
+from . import metricas
+from .cache import CatalogoCacheMixin, RespuestaCondicionalMixin
+from .pagination import DiarioPaginacion, PublicacionPaginacion, ArticuloPaginacion, CatalogoPaginacion
+from .pagination import ResultadoPaginacion, PublicacionPopularPaginacion, ComentarioPaginacion
+from django.conf import settings
 from django.utils import timezone
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from django.db import IntegrityError, transaction
+from django.db.models import F, Avg, Count, DateField, Max, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from datetime import datetime, timedelta
 
 # --- 1. VISTAS DE AUTENTICACIÓN (RF1, RF2) ---
 
@@ -32,6 +60,7 @@ class RegistroUsuarioView(generics.CreateAPIView):
     serializer_class = UsuarioRegistroSerializer
     # Permite acceso a cualquiera, ya que es la vista de registro
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'registro'  # por IP (ver api/limites.py)
     
     # Sobrescribimos el método post para añadir la generación de tokens tras el registro.
     def post(self, request, *args, **kwargs):
@@ -41,7 +70,7 @@ class RegistroUsuarioView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generar tokens JWT para iniciar sesión inmediatamente
-        refresh = RefreshToken.for_user(user)
+        refresh = TokenUsuario.for_user(user)
         
         return Response({
             "user": UsuarioRegistroSerializer(user).data,
@@ -52,7 +81,7 @@ class RegistroUsuarioView(generics.CreateAPIView):
 
 # --- 2. VISTAS DEL DIARIO EMOCIONAL (RF3) ---
 
-class DiarioEmocionalListCreateView(generics.ListCreateAPIView):
+class DiarioEmocionalListCreateView(RespuestaCondicionalMixin, generics.ListCreateAPIView):
     """
     Endpoint: GET /api/v1/diario/ (Lista las entradas)
     Endpoint: POST /api/v1/diario/ (Crea una nueva entrada)
@@ -60,6 +89,8 @@ class DiarioEmocionalListCreateView(generics.ListCreateAPIView):
     serializer_class = DiarioEmocionalSerializer
     # Solo permite el acceso a usuarios que han iniciado sesión (autenticados)
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DiarioPaginacion
+    campo_fecha = 'fecha_actualizacion'
 
     # Sobreescribe este método para asegurar que solo se muestren las entradas del usuario actual
     def get_queryset(self):
@@ -68,8 +99,10 @@ class DiarioEmocionalListCreateView(generics.ListCreateAPIView):
 
     # Sobreescribe este método para asignar automáticamente el usuario que crea la entrada
     def perform_create(self, serializer):
-        # Asigna el usuario autenticado (request.user) al campo 'usuario' del modelo
-        serializer.save(usuario=self.request.user)
+        with transaction.atomic():
+            # Asigna el usuario autenticado (request.user) al campo 'usuario' del modelo
+            entrada = serializer.save(usuario=self.request.user)
+            resumenes.aplicar_entrada_diario(entrada)
 
 
 class DiarioEmocionalRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -84,6 +117,20 @@ class DiarioEmocionalRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPI
     # o borrar sus propias entradas.
     def get_queryset(self):
         return DiarioEmocional.objects.filter(usuario=self.request.user)
+
+    # Edición y borrado mantienen el resumen diario en la misma transacción
+    def perform_update(self, serializer):
+        humor_anterior = serializer.instance.humor
+        with transaction.atomic():
+            entrada = serializer.save()
+            resumenes.cambiar_humor_diario(entrada, humor_anterior)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            resumenes.aplicar_entrada_diario(instance, signo=-1)
+            # Marca de borrado para que los otros dispositivos se enteren al sincronizar
+            RegistroEliminado.objects.create(usuario=instance.usuario, tipo='diario', objeto_id=instance.pk)
+            instance.delete()
         
         
 class PerfilUsuarioView(generics.RetrieveAPIView):
@@ -100,22 +147,122 @@ class PerfilUsuarioView(generics.RetrieveAPIView):
   
   
 # --- VISTAS DE CUESTIONARIOS (RF4) ---
-class CuestionarioListView(generics.ListAPIView):
+class CuestionarioListView(RespuestaCondicionalMixin, CatalogoCacheMixin, generics.ListAPIView):
     """
     GET /api/v1/cuestionarios/
     Lista los cuestionarios activos con sus preguntas.
     """
-    queryset = Cuestionario.objects.filter(activo=True)
+    # Árbol completo en dos consultas: cuestionarios + todas sus preguntas
+    queryset = Cuestionario.objects.filter(activo=True).prefetch_related('preguntas')
     serializer_class = CuestionarioDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CatalogoPaginacion
+    catalogo = 'cuestionarios'
+    campo_fecha = 'fecha_creacion'
+
 
-class RespuestaCreateView(generics.CreateAPIView):
+class CuestionarioDetailView(RespuestaCondicionalMixin, CatalogoCacheMixin, generics.RetrieveAPIView):
     """
-    POST /api/v1/cuestionarios/responder/
-    Permite enviar una respuesta a una pregunta específica.
+    GET /api/v1/cuestionarios/{id}/
+    Un cuestionario activo con sus preguntas. Comparte la caché del catálogo
+    'cuestionarios': se invalida al guardar cualquier Cuestionario o Pregunta.
+    """
+    queryset = Cuestionario.objects.filter(activo=True).prefetch_related('preguntas')
+    serializer_class = CuestionarioDetailSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    catalogo = 'cuestionarios'
+    campo_fecha = 'fecha_creacion'
+
+class ResponderCuestionarioView(generics.GenericAPIView):
+    """
+    POST /api/v1/cuestionarios/{id}/responder/
+    Recibe la hoja completa: {"respuestas": [{"pregunta": 1, "valor_respuesta": 3}, ...]}
+    Valida todas las respuestas contra las preguntas del cuestionario (una sola consulta)
+    y las guarda con un único bulk_create en una transacción: o se guarda la hoja
+    entera o no se guarda nada. Todas comparten la misma fecha_respuesta.
+    """
+    serializer_class = HojaRespuestasSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    queryset = Cuestionario.objects.filter(activo=True).prefetch_related('preguntas')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['cuestionario'] = self.cuestionario
+        return context
+
+    def post(self, request, *args, **kwargs):
+        self.cuestionario = self.get_object()
+        return self.responder(request.data)
+
+    def responder(self, datos):
+        serializer = self.get_serializer(data=datos)
+        serializer.is_valid(raise_exception=True)
+
+        fecha = timezone.now()
+        with transaction.atomic():
+            respuestas = RespuestaUsuario.objects.bulk_create([
+                RespuestaUsuario(
+                    usuario=self.request.user, pregunta=respuesta['pregunta'],
+                    valor_respuesta=respuesta['valor_respuesta'], fecha_respuesta=fecha,
+                )
+                for respuesta in serializer.validated_data['respuestas']
+            ])
+            resultado = self.puntuar(respuestas, fecha)
+
+        return Response({
+            'cuestionario': self.cuestionario.id,
+            'fecha_respuesta': fecha,
+            'respuestas': RespuestaUsuarioSerializer(respuestas, many=True).data,
+            'resultado': ResultadoCuestionarioSerializer(resultado).data,
+        }, status=status.HTTP_201_CREATED)
+
+    def puntuar(self, respuestas, fecha):
+        # El envío se puntúa una sola vez, al guardarlo (ver api/puntajes.py)
+        estrategia = puntajes.ESTRATEGIAS[self.cuestionario.estrategia_puntaje]
+        puntaje = estrategia.puntuar([(r.pregunta, r.valor_respuesta) for r in respuestas])
+        return ResultadoCuestionario.objects.create(
+            usuario=self.request.user, cuestionario=self.cuestionario, fecha_respuesta=fecha,
+            estrategia=self.cuestionario.estrategia_puntaje, puntaje=puntaje,
+            severidad=puntajes.severidad(self.cuestionario, puntaje), num_respuestas=len(respuestas),
+        )
+
+
+class ResultadoCuestionarioListView(generics.ListAPIView):
+    """
+    GET /api/v1/cuestionarios/resultados/ (?cuestionario=ID opcional)
+    Historial de puntajes del usuario, leído de los resultados ya calculados.
     """
-    serializer_class = RespuestaUsuarioSerializer
+    serializer_class = ResultadoCuestionarioSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ResultadoPaginacion
+
+    def get_queryset(self):
+        queryset = ResultadoCuestionario.objects.filter(usuario=self.request.user).select_related('cuestionario')
+        cuestionario = self.request.query_params.get('cuestionario')
+        if cuestionario and cuestionario.isdigit():
+            queryset = queryset.filter(cuestionario_id=cuestionario)
+        return queryset
+
+
+class RespuestaCreateView(ResponderCuestionarioView):
+    """
+    POST /api/v1/cuestionarios/responder/
+    Endpoint antiguo de una sola respuesta: {"pregunta": 1, "valor_respuesta": 3}.
+    Se trata como una hoja de un ítem del cuestionario de esa pregunta: si con ella el
+    cuestionario queda completo se guarda y se puntúa como cualquier hoja; si no, 400
+    con las preguntas que faltan (hay que usar /cuestionarios/{id}/responder/).
+    """
+    def post(self, request, *args, **kwargs):
+        item = RespuestaItemSerializer(data=request.data)
+        item.is_valid(raise_exception=True)
+        self.kwargs['pk'] = (
+            Pregunta.objects.filter(pk=item.validated_data['pregunta'])
+            .values_list('cuestionario_id', flat=True).first()
+        )
+        if self.kwargs['pk'] is None:
+            raise ValidationError({'pregunta': ['La pregunta no existe.']})
+        self.cuestionario = self.get_object()
+        return self.responder({'respuestas': [item.validated_data]})
     
     
 # --- VISTA PARA REGISTRO DE EMOCIONES (Módulo 3) ---
@@ -127,10 +274,164 @@ class RegistroEmocionCreateView(generics.CreateAPIView):
     queryset = RegistroEmocion.objects.all()
     serializer_class = RegistroEmocionSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            registro = serializer.save()
+            resumenes.aplicar_registro_emocion(registro)
+
+
+class EstadisticasEmocionView(APIView):
+    """
+    GET /api/v1/emociones/estadisticas/?desde=2025-01-01&hasta=2025-12-31&bucket=week
+    Resumen por periodo (day|week|month) de las emociones del usuario: cantidad por
+    emoción, intensidad promedio y máxima, y emoción dominante.
+    La agregación se hace en la base de datos (una sola consulta); la respuesta crece
+    con la cantidad de periodos, no con la cantidad de registros.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    FUNCIONES_TRUNC = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+
+    def get(self, request):
+        parametros = EstadisticasEmocionParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        desde = parametros.validated_data['desde']
+        hasta = parametros.validated_data['hasta']
+        bucket = parametros.validated_data['bucket']
+
+        # Rango como datetimes (no __date) para que use el índice (usuario, fecha_registro)
+        inicio = timezone.make_aware(datetime.combine(desde, datetime.min.time()))
+        fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+        filas = (
+            RegistroEmocion.objects
+            .filter(usuario=request.user, fecha_registro__gte=inicio, fecha_registro__lt=fin)
+            .annotate(periodo=self.FUNCIONES_TRUNC[bucket]('fecha_registro', output_field=DateField()))
+            .values('periodo', 'emocion')
+            .annotate(total=Count('id'), suma=Sum('intensidad'), promedio=Avg('intensidad'), maximo=Max('intensidad'))
+            .order_by('periodo', 'emocion')
+        )
+
+        periodos = {}
+        for fila in filas:
+            periodo = periodos.setdefault(fila['periodo'], {
+                'periodo': fila['periodo'], 'total': 0, 'suma': 0, 'intensidad_maxima': 0, 'emociones': {},
+            })
+            periodo['total'] += fila['total']
+            periodo['suma'] += fila['suma']
+            periodo['intensidad_maxima'] = max(periodo['intensidad_maxima'], fila['maximo'])
+            periodo['emociones'][fila['emocion']] = {
+                'total': fila['total'],
+                'intensidad_promedio': round(fila['promedio'], 2),
+                'intensidad_maxima': fila['maximo'],
+            }
+
+        resultado = []
+        for periodo in periodos.values():
+            suma = periodo.pop('suma')
+            periodo['intensidad_promedio'] = round(suma / periodo['total'], 2)
+            # Dominante: la más registrada; si empatan, la de mayor intensidad promedio
+            periodo['emocion_dominante'] = max(
+                periodo['emociones'],
+                key=lambda emocion: (periodo['emociones'][emocion]['total'],
+                                     periodo['emociones'][emocion]['intensidad_promedio']),
+            )
+            resultado.append(periodo)
+
+        return Response({'desde': desde, 'hasta': hasta, 'bucket': bucket, 'periodos': resultado})
+
+
+class ResumenDiarioListView(generics.ListAPIView):
+    """
+    GET /api/v1/resumen/diario/?desde=2025-01-01&hasta=2025-03-31
+    Resumen por día (diario + emociones) del usuario, leído de ResumenDiarioUsuario:
+    una fila por día con actividad, sin recorrer el historial completo.
+    """
+    serializer_class = ResumenDiarioUsuarioSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None # El rango acotado ya limita la cantidad de filas
+
+    MAX_DIAS = 366
+
+    def get_queryset(self):
+        parametros = RangoFechasParametrosSerializer(data=self.request.query_params)
+        parametros.is_valid(raise_exception=True)
+        desde = parametros.validated_data['desde']
+        hasta = parametros.validated_data['hasta']
+        desde = max(desde, hasta - timedelta(days=self.MAX_DIAS))
+        return ResumenDiarioUsuario.objects.filter(
+            usuario=self.request.user, fecha__gte=desde, fecha__lte=hasta,
+        )
     
     
+# --- SINCRONIZACIÓN OFFLINE (diario + emociones) ---
+class SincronizacionView(APIView):
+    """
+    POST /api/v1/sync/
+    Aplica un lote de operaciones encoladas sin conexión:
+    {"operaciones": [{"clave": "<uuid>", "tipo": "diario", "accion": "crear", "datos": {...}},
+                     {"clave": "<uuid>", "tipo": "emocion", "accion": "eliminar", "id": 12}, ...]}
+    Devuelve un resultado por operación, en el mismo orden. Reenviar una clave ya
+    aplicada devuelve el mismo resultado sin repetir la operación.
+
+    GET /api/v1/sync/?desde=<marca>
+    Devuelve lo que cambió desde la marca (entradas, registros y borrados) y la nueva
+    marca. Si 'hay_mas' es true, repetir con la nueva marca.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    LIMITE_CAMBIOS = 500
+
+    def get(self, request):
+        parametros = CambiosParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        desde = parametros.validated_data.get('desde')
+        return Response(sincronizacion.cambios_desde(request.user, desde, self.LIMITE_CAMBIOS))
+
+    def post(self, request):
+        serializer = LoteSincronizacionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lote = sincronizacion.LoteSincronizacion(request.user, serializer.validated_data['operaciones'])
+        try:
+            resultados = lote.aplicar()
+        except sincronizacion.LoteEnCurso:
+            return Response(
+                {'detail': 'Otra petición está aplicando las mismas operaciones. Reintenta el lote.'},
+                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+            )
+        return Response({'resultados': resultados})
+
+
+# --- EXPORTACIÓN DEL HISTORIAL ---
+@method_decorator(gzip_page, name='dispatch')
+class ExportacionView(APIView):
+    """
+    GET /api/v1/export/?formato=ndjson|csv
+    Descarga todo el historial del usuario (diario, emociones, respuestas y ejercicios
+    completados) ordenado por fecha. La respuesta se genera mientras se envía (ver
+    api/exportacion.py), también bajo ASGI, y va comprimida con gzip si el cliente
+    manda Accept-Encoding.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    TIPOS_CONTENIDO = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+    def get(self, request):
+        parametros = ExportacionParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        formato = parametros.validated_data['formato']
+
+        registros = exportacion.historial(request.user)
+        lineas = exportacion.como_csv(registros) if formato == 'csv' else exportacion.como_ndjson(registros)
+        if isinstance(request._request, ASGIRequest):
+            lineas = exportacion.en_lotes_async(lineas)
+        respuesta = StreamingHttpResponse(lineas, content_type=f'{self.TIPOS_CONTENIDO[formato]}; charset=utf-8')
+        nombre = f'menteabierta-historial-{timezone.localdate():%Y%m%d}.{formato}'
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return respuesta
+
+
 # --- VISTAS DE EJERCICIOS (RF7) ---
-class EjercicioListView(generics.ListAPIView):
+class EjercicioListView(RespuestaCondicionalMixin, CatalogoCacheMixin, generics.ListAPIView):
     """
     GET /api/v1/ejercicios/
     Lista todos los ejercicios disponibles (para llenar las tarjetas).
@@ -138,6 +439,9 @@ class EjercicioListView(generics.ListAPIView):
     queryset = Ejercicio.objects.all()
     serializer_class = EjercicioSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CatalogoPaginacion
+    catalogo = 'ejercicios'
+    campo_fecha = 'fecha_creacion'
 
 class MarcarEjercicioCompletadoView(generics.CreateAPIView):
     """
@@ -152,16 +456,32 @@ class MarcarEjercicioCompletadoView(generics.CreateAPIView):
         
         
 # --- VISTAS DEL FORO (RF6) --- 
-class PublicacionListCreateView(generics.ListCreateAPIView):
+class PublicacionListCreateView(BusquedaMixin, generics.ListCreateAPIView):
     """
     GET /api/v1/foro/publicaciones/ (Listar con filtros)
+    GET /api/v1/foro/publicaciones/?search=insomnio (Búsqueda por relevancia)
+    GET /api/v1/foro/publicaciones/?orden=popular (Más populares primero, ver api/popularidad.py)
     POST /api/v1/foro/publicaciones/ (Crear)
     """
     serializer_class = PublicacionSerializer
+    serializer_busqueda_class = PublicacionBusquedaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'publicaciones'  # solo el POST (las lecturas no se limitan)
+
+    filter_backends = [BusquedaTextoCompleto]
+    campos_busqueda = ['titulo', 'contenido']
+    campo_fragmento = 'contenido'
+
+    @property
+    def pagination_class(self):
+        # Ambos órdenes son un recorrido keyset sobre su propio índice
+        if self.request.query_params.get('orden') == 'popular':
+            return PublicacionPopularPaginacion
+        return PublicacionPaginacion
 
     def get_queryset(self):
-        queryset = Publicacion.objects.all()
+        # Autor, conteos y "ya di like" se resuelven en la misma consulta (sin N+1)
+        queryset = Publicacion.objects.con_interacciones(self.request.user)
         # Filtro opcional por categoría: ?categoria=ANSIEDAD
         categoria = self.request.query_params.get('categoria')
         if categoria and categoria != 'TODOS':
@@ -173,9 +493,11 @@ class PublicacionDetailView(generics.RetrieveDestroyAPIView):
     GET /api/v1/foro/publicaciones/{id}/ (Ver detalle para comentar)
     DELETE /api/v1/foro/publicaciones/{id}/ (Borrar si es mía)
     """
-    queryset = Publicacion.objects.all()
     serializer_class = PublicacionSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Publicacion.objects.con_interacciones(self.request.user)
     
     # Opcional: Asegurar que solo el dueño pueda borrar (requiere permisos custom, 
     # por ahora IsAuthenticated permite borrar a cualquiera si no restringimos más, 
@@ -193,11 +515,42 @@ class ComentarPublicacionView(generics.CreateAPIView):
     """
     serializer_class = ComentarioSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'comentarios'
 
     def perform_create(self, serializer):
         publicacion_id = self.kwargs.get('pk')
-        publicacion = Publicacion.objects.get(id=publicacion_id)
-        serializer.save(usuario=self.request.user, publicacion=publicacion)
+        # El comentario, el contador y el puntaje popular se confirman juntos o no se
+        # confirma ninguno. Contador y puntaje van en un solo UPDATE, sobre la fila tal
+        # como está al escribirla; si no hay fila, la publicación no existe y se deshace todo.
+        with transaction.atomic():
+            serializer.save(usuario=self.request.user, publicacion_id=publicacion_id)
+            if not Publicacion.objects.filter(pk=publicacion_id).update(
+                num_comentarios=F('num_comentarios') + 1,
+                puntaje_popular=popularidad.puntaje_sql(F('num_likes'), F('num_comentarios') + 1),
+            ):
+                raise Http404('No encontrado.')
+
+
+class ComentarioListView(generics.ListAPIView):
+    """
+    GET /api/v1/foro/publicaciones/{id}/comentarios/
+    Comentarios de la publicación, los más viejos primero, paginados por cursor.
+    """
+    serializer_class = ComentarioSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ComentarioPaginacion
+
+    def get_queryset(self):
+        # Recorre el índice (publicacion, fecha_creacion, id); el autor viene en el mismo JOIN
+        return Comentario.objects.filter(publicacion_id=self.kwargs['pk']).select_related('usuario')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Una página vacía puede ser una publicación sin comentarios o una que no existe:
+        # solo en ese caso se consulta la publicación
+        if not response.data['results'] and not Publicacion.objects.filter(pk=self.kwargs['pk']).exists():
+            raise Http404('No encontrado.')
+        return response
 
 class ToggleLikeView(APIView):
     """
@@ -205,38 +558,66 @@ class ToggleLikeView(APIView):
     Alterna el like (si no tiene like, lo pone; si ya tiene, lo quita).
     """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'likes'
 
     def post(self, request, pk):
-        try:
-            publicacion = Publicacion.objects.get(pk=pk)
-            user = request.user
-            if publicacion.likes.filter(id=user.id).exists():
-                publicacion.likes.remove(user)
-                liked = False
-            else:
-                publicacion.likes.add(user)
-                liked = True
-            return Response({'liked': liked, 'total_likes': publicacion.total_likes()})
-        except Publicacion.DoesNotExist:
+        if settings.LIKES_BUFFER:
+            return self.post_diferido(request, pk)
+        Like = Publicacion.likes.through
+        with transaction.atomic():
+            # Si el DELETE borró una fila, el like existía: se quita. Si no, se pone.
+            borrados, _ = Like.objects.filter(publicacion_id=pk, usuario_id=request.user.id).delete()
+            liked, delta = (False, -1) if borrados else (True, 1)
+            if liked:
+                try:
+                    with transaction.atomic():
+                        Like.objects.create(publicacion_id=pk, usuario_id=request.user.id)
+                except IntegrityError:
+                    delta = 0  # otro toggle del mismo usuario lo puso a la vez: ya cuenta
+
+            # Contador y puntaje en un solo UPDATE, sobre la fila tal como está al escribirla
+            # (sin leerla antes). Si no hay fila, la publicación no existe y se deshace todo.
+            if not Publicacion.objects.filter(pk=pk).update(
+                num_likes=F('num_likes') + delta,
+                puntaje_popular=popularidad.puntaje_sql(F('num_likes') + delta, F('num_comentarios')),
+            ):
+                raise Http404('No encontrado.')
+            total_likes = Publicacion.objects.filter(pk=pk).values_list('num_likes', flat=True).get()
+
+        return Response({'liked': liked, 'total_likes': total_likes})
+
+    def post_diferido(self, request, pk):
+        # Sin bloquear la fila: el toggle queda en la caché (api/likes.py) y el total es
+        # optimista, lo guardado más lo pendiente
+        total_likes = Publicacion.objects.filter(pk=pk).values_list('num_likes', flat=True).first()
+        if total_likes is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        likes.asegurar_hilo()
+        liked = likes.alternar(pk, request.user.id)
+        return Response({'liked': liked, 'total_likes': max(total_likes + likes.pendientes(pk), 0)})
             
             
 # --- VISTA DE CONTENIDO PSICOEDUCATIVO (RF8) ---
-class ArticuloListView(generics.ListAPIView):
+class ArticuloListView(BusquedaMixin, RespuestaCondicionalMixin, CatalogoCacheMixin, generics.ListAPIView):
     """
     GET /api/v1/contenido/articulos/
     Lista artículos con opción de búsqueda y filtro.
     Ejemplos:
-    - ?search=ansiedad (Busca en título y resumen)
+    - ?search=ansiedad (Busca en título, resumen y contenido; ordena por relevancia)
     - ?categoria=SUENO (Filtra por categoría)
     """
     queryset = Articulo.objects.all()
     serializer_class = ArticuloSerializer
+    serializer_busqueda_class = ArticuloBusquedaSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly] # Permitir lectura a todos (opcional) o solo auth
+    pagination_class = ArticuloPaginacion
+    catalogo = 'articulos'
+    campo_fecha = 'fecha_publicacion'
     
-    # Configuración de búsqueda y filtrado
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['titulo', 'resumen', 'categoria']
+    # Configuración de búsqueda (texto completo en Postgres, ver api/busqueda.py)
+    filter_backends = [BusquedaTextoCompleto]
+    campos_busqueda = ['titulo', 'resumen', 'contenido']
+    campo_fragmento = 'contenido'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -245,7 +626,7 @@ class ArticuloListView(generics.ListAPIView):
             queryset = queryset.filter(categoria=categoria)
         return queryset
 
-class ArticuloDetailView(generics.RetrieveAPIView):
+class ArticuloDetailView(RespuestaCondicionalMixin, CatalogoCacheMixin, generics.RetrieveAPIView):
     """
     GET /api/v1/contenido/articulos/{id}/
     Ver el contenido completo de un artículo.
@@ -253,9 +634,11 @@ class ArticuloDetailView(generics.RetrieveAPIView):
     queryset = Articulo.objects.all()
     serializer_class = ArticuloSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    catalogo = 'articulos'
+    campo_fecha = 'fecha_publicacion'
     
 # --- VISTAS DE TIPS (RF9) ---
-class TipListView(generics.ListAPIView):
+class TipListView(RespuestaCondicionalMixin, CatalogoCacheMixin, generics.ListAPIView):
     """
     GET /api/v1/tips/
     Lista todos los tips con filtro por categoría.
@@ -264,6 +647,9 @@ class TipListView(generics.ListAPIView):
     queryset = Tip.objects.all()
     serializer_class = TipSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CatalogoPaginacion
+    catalogo = 'tips'
+    campo_fecha = 'fecha_creacion'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -272,7 +658,7 @@ class TipListView(generics.ListAPIView):
             queryset = queryset.filter(categoria=categoria)
         return queryset
 
-class TipDelDiaView(generics.RetrieveAPIView):
+class TipDelDiaView(RespuestaCondicionalMixin, generics.RetrieveAPIView):
     """
     GET /api/v1/tips/dia/
     Devuelve UN solo tip basado en la fecha actual (rotación automática).
@@ -280,17 +666,49 @@ class TipDelDiaView(generics.RetrieveAPIView):
     serializer_class = TipSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_object(self):
-        # 1. Obtenemos todos los tips
-        tips = Tip.objects.all()
-        count = tips.count()
-        
-        if count == 0:
-            return None # O manejar un 404
-        
-        # 2. Lógica matemática para rotar 
-        # Usamos el día del año (1 a 365) para elegir el índice
-        dia_actual = timezone.now().timetuple().tm_yday
-        indice = dia_actual % count # Operación Módulo para ciclar si se acaban
-        
-        return tips[indice]
\ No newline at end of file
+    def retrieve(self, request, *args, **kwargs):
+        # El tip se calcula una vez al día y queda en caché hasta la medianoche (TIME_ZONE).
+        # La clave incluye la generación de 'tips': cualquier cambio en un Tip la invalida.
+        hoy = timezone.localdate()
+        key = catalogo_cache.clave('tips', 'tip-del-dia', hoy)
+        datos = cache.get(key)
+        if datos is None:
+            datos = self.get_serializer(self.elegir_tip(hoy)).data
+            cache.set(key, datos, catalogo_cache.segundos_hasta_medianoche())
+        return Response(datos)
+
+    def validadores(self):
+        # El tip solo cambia con el día o con la generación de 'tips': no hace falta consultar
+        return None, [timezone.localdate(), catalogo_cache.generacion('tips')]
+
+    def elegir_tip(self, fecha):
+        tips = list(Tip.objects.order_by('pk').values_list('pk', 'es_destacado'))
+        return Tip.objects.get(pk=tip_del_dia(fecha, tips))
+
+
+def tip_del_dia(fecha, tips):
+    """
+    Id del tip que toca en `fecha`, dados los (pk, es_destacado) ordenados por pk.
+    La usan TipDelDiaView y su versión async (api/vistas_async.py).
+    """
+    if not tips:
+        raise Http404('No hay tips disponibles.')
+    # 1. Si hay tips destacados, la rotación se hace solo entre ellos
+    candidatos = [pk for pk, es_destacado in tips if es_destacado] or [pk for pk, _ in tips]
+
+    # 2. Rotación determinista: el ordinal del día (no se reinicia en enero) módulo
+    # la cantidad de candidatos, sobre un orden estable por id
+    return candidatos[fecha.toordinal() % len(candidatos)]
+
+
+# --- MÉTRICAS (solo staff) ---
+class MetricasView(APIView):
+    """
+    GET /api/v1/_metrics
+    Histogramas por endpoint de este proceso en formato de texto de Prometheus
+    (vacío si settings.METRICAS no está activo).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(metricas.registro.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,155 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+
+from . import cache as catalogo_cache
+from .autenticacion import JWTAutenticacionSinConsulta
+from .models import Articulo, Publicacion, Tip, Usuario
+from .pagination import ArticuloPaginacion, PublicacionPaginacion, PublicacionPopularPaginacion, paginar_async
+from .serializers import ArticuloSerializer, PublicacionSerializer, TipSerializer, UsuarioPerfilSerializer
+from .views import ArticuloListView, PublicacionListCreateView, tip_del_dia
+
+
+# --- LECTURAS ASÍNCRONAS (ASGI) ---
+# Bajo ASGI cada vista síncrona de DRF pasa por sync_to_async (un salto a un hilo por
+# petición). Estas son versiones async nativas de las lecturas más pedidas, montadas en
+# /api/v1/async/...: autentican con JWTAutenticacionSinConsulta.aauthenticate, consultan
+# con el ORM async y devuelven el mismo JSON que su vista DRF, con los mismos cursores
+# (api/pagination.py: paginar_async). Las escrituras y las
+# búsquedas (?search=) siguen en las vistas síncronas.
+
+autenticacion = JWTAutenticacionSinConsulta()
+
+
+def _error(detalle, status):
+    respuesta = JsonResponse({'detail': str(detalle)}, status=status)
+    if status == 401:
+        respuesta['WWW-Authenticate'] = autenticacion.authenticate_header(None)
+    return respuesta
+
+
+def vista_async(requiere_usuario=True):
+    """GET async con la misma autenticación que las vistas DRF (request.user o 401)."""
+    def decorador(vista):
+        @require_GET
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            try:
+                resultado = await autenticacion.aauthenticate(request)
+            except APIException as exc:
+                return _error(exc.detail, exc.status_code)
+            if resultado is not None:
+                request.user = resultado[0]
+            elif requiere_usuario:
+                return _error('Las credenciales de autenticación no se proveyeron.', 401)
+            try:
+                return await vista(request, *args, **kwargs)
+            except Http404 as exc:
+                return _error(exc or 'No encontrado.', 404)
+            except NotFound as exc:  # cursor inválido
+                return _error(exc.detail, 404)
+        return envoltura
+    return decorador
+
+
+def _responder(request, cuerpo):
+    """JSON ya renderizado con ETag por contenido; 304 si el cliente tiene la misma versión."""
+    etag = quote_etag(hashlib.md5(cuerpo).hexdigest())
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(cuerpo, content_type='application/json')
+        respuesta['ETag'] = etag
+    patch_vary_headers(respuesta, ['Authorization'])
+    return respuesta
+
+
+async def _vista_sincrona(vista, request, **kwargs):
+    def ejecutar():
+        return vista(request, **kwargs).render()
+    return await sync_to_async(ejecutar)()
+
+
+@vista_async()
+async def tip_del_dia_async(request):
+    """GET /api/v1/async/tips/dia/ (misma caché que TipDelDiaView)"""
+    hoy = timezone.localdate()
+    key = await catalogo_cache.aclave('tips', 'tip-del-dia', hoy)
+    datos = await cache.aget(key)
+    if datos is None:
+        tips = [tip async for tip in Tip.objects.order_by('pk').values_list('pk', 'es_destacado')]
+        tip = await Tip.objects.aget(pk=tip_del_dia(hoy, tips))
+        datos = TipSerializer(tip).data
+        await cache.aset(key, datos, catalogo_cache.segundos_hasta_medianoche())
+    return _responder(request, JSONRenderer().render(datos))
+
+
+@vista_async(requiere_usuario=False)
+async def articulos_async(request):
+    """GET /api/v1/async/contenido/articulos/?categoria=SUENO"""
+    if request.GET.get('search'):
+        return await _vista_sincrona(ArticuloListView.as_view(), request)
+
+    # El cuerpo lleva 'next'/'previous' absolutos: host y esquema son parte de la clave
+    key = await catalogo_cache.aclave(
+        'articulos', 'async', request.scheme, request.get_host(), request.path, sorted(request.GET.lists()),
+    )
+    cuerpo = await cache.aget(key)
+    if cuerpo is None:
+        queryset = Articulo.objects.all()
+        categoria = request.GET.get('categoria')
+        if categoria and categoria != 'TODOS':
+            queryset = queryset.filter(categoria=categoria)
+        pagina = await paginar_async(ArticuloPaginacion(), request, queryset)
+        pagina['results'] = ArticuloSerializer(pagina['results'], many=True).data
+        cuerpo = JSONRenderer().render(pagina)
+        await cache.aset(key, cuerpo, settings.CATALOGO_CACHE_TIMEOUT)
+    return _responder(request, cuerpo)
+
+
+@vista_async(requiere_usuario=False)
+async def articulo_detalle_async(request, pk):
+    """GET /api/v1/async/contenido/articulos/{id}/"""
+    key = await catalogo_cache.aclave('articulos', 'async', request.path)
+    cuerpo = await cache.aget(key)
+    if cuerpo is None:
+        try:
+            articulo = await Articulo.objects.aget(pk=pk)
+        except Articulo.DoesNotExist:
+            raise Http404('No encontrado.')
+        cuerpo = JSONRenderer().render(ArticuloSerializer(articulo).data)
+        await cache.aset(key, cuerpo, settings.CATALOGO_CACHE_TIMEOUT)
+    return _responder(request, cuerpo)
+
+
+@vista_async()
+async def publicaciones_async(request):
+    """GET /api/v1/async/foro/publicaciones/?categoria=ANSIEDAD&orden=popular"""
+    if request.GET.get('search'):
+        return await _vista_sincrona(PublicacionListCreateView.as_view(), request)
+
+    # Autor, conteos y "ya di like" en la misma consulta, igual que el feed síncrono
+    queryset = Publicacion.objects.con_interacciones(request.user)
+    categoria = request.GET.get('categoria')
+    if categoria and categoria != 'TODOS':
+        queryset = queryset.filter(categoria=categoria)
+    paginacion = PublicacionPopularPaginacion if request.GET.get('orden') == 'popular' else PublicacionPaginacion
+    pagina = await paginar_async(paginacion(), request, queryset)
+    pagina['results'] = PublicacionSerializer(pagina['results'], many=True).data
+    return _responder(request, JSONRenderer().render(pagina))
+
+
+@vista_async()
+async def perfil_async(request):
+    """GET /api/v1/async/user/me/"""
+    usuario = await Usuario.objects.aget(pk=request.user.pk)
+    return _responder(request, JSONRenderer().render(UsuarioPerfilSerializer(usuario).data))
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres', # Búsqueda de texto completo (SearchVector, unaccent)
     'api',
     # --- Terceros (Django REST Framework y JWT) ---
     'rest_framework',
@@ -46,12 +48,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware', # Nueva línea (Debe ir primero)
+    'api.middleware.MetricasMiddleware',  # Solo con METRICAS=1: Server-Timing y /api/v1/_metrics
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.IdempotenciaMiddleware',  # Idempotency-Key en los POST (ver api/middleware.py)
+    'api.middleware.CabecerasLimiteMiddleware',  # RateLimit-* del límite de peticiones (ver api/limites.py)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,16 +84,144 @@ WSGI_APPLICATION = 'menteabierta.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'bd_mente_abierta',      # Debe coincidir con POSTGRES_DB del docker-compose
-        'USER': 'usuario_admin',      # Debe coincidir con POSTGRES_USER
-        'PASSWORD': 'mi_clave_secreta', # Debe coincidir con POSTGRES_PASSWORD
-        'HOST': 'localhost',          # 'localhost' porque corremos Django en nuestra PC, no en Docker
-        'PORT': '5430',
+# Todo se puede cambiar con variables de entorno; los valores por defecto apuntan a la
+# base del docker-compose. Con DB_ENGINE=sqlite se usa db.sqlite3 (pruebas locales).
+#
+# Conexiones (ver `manage.py benchmark_conexiones`):
+# - Por defecto cada proceso reutiliza su conexión durante DB_CONN_MAX_AGE segundos en
+#   vez de abrir una por petición, y CONN_HEALTH_CHECKS la verifica antes de reusarla.
+# - DB_POOL=1 usa el pool nativo de psycopg 3 (pip install "psycopg[pool]"): las
+#   conexiones se toman y devuelven al pool en cada petición. Requiere CONN_MAX_AGE=0.
+#   Es la opción para ASGI (uvicorn): ahí las conexiones persistentes no se reutilizan.
+# - DB_PGBOUNCER=1 para un pooler externo en modo transacción (PgBouncer): no se pueden
+#   usar cursores del lado del servidor ni sentencias preparadas fuera de la transacción,
+#   así que se desactivan. Sin cursor del servidor, .iterator() no lee por lotes: psycopg
+#   trae el resultado entero a memoria. Por eso la exportación pagina por (fecha, id)
+#   con esta opción (ver api/exportacion.py).
+
+if os.environ.get('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'bd_mente_abierta'),       # Debe coincidir con POSTGRES_DB del docker-compose
+            'USER': os.environ.get('POSTGRES_USER', 'usuario_admin'),        # Debe coincidir con POSTGRES_USER
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'mi_clave_secreta'),  # Debe coincidir con POSTGRES_PASSWORD
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),  # 'localhost' porque corremos Django en nuestra PC, no en Docker
+            'PORT': os.environ.get('POSTGRES_PORT', '5430'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL') == '1':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    if os.environ.get('DB_PGBOUNCER') == '1':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+        try:
+            import psycopg  # psycopg 3; psycopg2 no prepara sentencias por su cuenta
+        except ImportError:
+            pass
+        else:
+            # psycopg 3 prepara las sentencias repetidas en el servidor; con PgBouncer en modo
+            # transacción la siguiente transacción puede caer en otra conexión sin ellas
+            DATABASES['default']['OPTIONS']['prepare_threshold'] = None
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Por defecto en memoria del proceso (locmem). Con un servidor Redis disponible basta con
+# definir REDIS_URL (ej: redis://localhost:6379/0) y pip install redis.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+        # Respuestas guardadas por Idempotency-Key; Redis las desaloja por TTL
+        'idempotencia': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'idem',
+            'TIMEOUT': 60 * 60 * 24,
+        },
+        # Likes diferidos (ver api/likes.py); compartida por todos los procesos
+        'likes': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'likes',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'menteabierta',
+        },
+        'idempotencia': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'menteabierta-idempotencia',
+            'TIMEOUT': 60 * 60 * 24,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        # En memoria solo sirve con un único proceso; sin purga para no perder toggles
+        'likes': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'menteabierta-likes',
+            'OPTIONS': {'MAX_ENTRIES': 10 ** 7},
+        },
     }
-}
+
+# Segundos que se guarda una respuesta del catálogo (artículos, tips, ejercicios,
+# cuestionarios). Cualquier cambio en el admin la invalida antes (ver api/signals.py).
+CATALOGO_CACHE_TIMEOUT = 60 * 60
+
+# Segundos que se recuerda la respuesta de un POST con Idempotency-Key (ver api/middleware.py).
+# Debe cubrir la ventana de reintentos de la app; pasado ese tiempo la clave se puede reusar.
+IDEMPOTENCIA_TIMEOUT = 60 * 60 * 24
+
+# Likes diferidos (ver api/likes.py). Con LIKES_BUFFER=1 los toggles van a la caché 'likes'
+# y se llevan a la base por lotes con `manage.py vaciar_likes --intervalo 2` o, con
+# LIKES_BUFFER_HILO=1, con un hilo en cada proceso del servidor cada LIKES_BUFFER_INTERVALO
+# segundos. LIKES_BUFFER_TTL debe ser mucho mayor que el intervalo de vaciado.
+LIKES_BUFFER = os.environ.get('LIKES_BUFFER') == '1'
+LIKES_BUFFER_HILO = os.environ.get('LIKES_BUFFER_HILO') == '1'
+LIKES_BUFFER_INTERVALO = float(os.environ.get('LIKES_BUFFER_INTERVALO', 2))
+LIKES_BUFFER_TTL = 60 * 60 * 24
+
+# Métricas por endpoint (ver api/metricas.py). METRICAS_MUESTREO es la fracción de
+# peticiones medidas (1 = todas).
+METRICAS = os.environ.get('METRICAS') == '1'
+METRICAS_MUESTREO = float(os.environ.get('METRICAS_MUESTREO', 1))
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# El primero se usa para hashes nuevos; los demás solo verifican hashes existentes, que se
+# regeneran con el primero en el siguiente login (ver api/hashers.py).
+
+PASSWORD_HASHERS = [
+    'api.hashers.ScryptEnPoolPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Procesos dedicados a calcular hashes de contraseñas por cada proceso del servidor.
+# 0 = calcular en el mismo hilo de la petición (sin pool).
+HASH_PROCESOS = int(os.environ.get('HASH_PROCESOS', os.cpu_count() or 1))
 
 
 # Password validation
@@ -137,11 +270,33 @@ AUTH_USER_MODEL = 'api.Usuario'
 # --- Configuración de Django REST Framework ---
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Arma el usuario con los claims del token, sin SELECT por petición (ver api/autenticacion.py)
+        'api.autenticacion.JWTAutenticacionSinConsulta',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Paginación por cursor (keyset); cada vista de lista define su orden y tamaño
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPaginacion',
+    'PAGE_SIZE': 20,
+    # Igual que los de DRF por defecto; el JSON mide su render para las métricas (api/metricas.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.metricas.JSONRendererMedido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Token bucket por usuario (o IP si es anónimo) y por scope; solo en las escrituras
+    # de las vistas con throttle_scope (ver api/limites.py)
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.limites.BaldeTokensThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        # Los registros anónimos se cuentan por IP: detrás de un NAT (un campus, una
+        # empresa) muchas personas comparten la misma. Se ajusta con THROTTLE_REGISTRO.
+        'registro': os.environ.get('THROTTLE_REGISTRO', '100/hour'),
+        'publicaciones': '30/hour',
+        'comentarios': '20/min',
+        'likes': '60/min',
+    },
 }
 
 # --- Configuración de Simple JWT ---
@@ -155,8 +310,16 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.serializers.LoginSerializer',
+    # Los tokens llevan el hash de la contraseña: cambiarla invalida los tokens emitidos antes
+    'CHECK_REVOKE_TOKEN': True,
 }
 
+# Segundos que cada proceso recuerda si un usuario sigue activo, con la misma contraseña
+# y si es staff antes de volver a consultarlo (api/autenticacion.py). Es el retraso
+# máximo con que se aplica una baja, un cambio de contraseña o quitar el staff.
+JWT_ESTADO_USUARIO_TTL = 30
+
 # --- Configuración de CORS ---
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
@@ -168,6 +331,12 @@ CORS_ALLOWED_ORIGINS = [
 # Opcional: Para permitir credenciales (cookies, tokens) a través de CORS
 CORS_ALLOW_CREDENTIALS = True
 
+# Cabeceras del límite de peticiones, de métricas y de idempotencia que el frontend puede leer
+CORS_EXPOSE_HEADERS = [
+    'retry-after', 'ratelimit-limit', 'ratelimit-remaining', 'ratelimit-reset', 'server-timing',
+    'idempotent-replayed',
+]
+
 # Permitir headers necesarios para JWT
 CORS_ALLOW_HEADERS = [
     'accept',
@@ -179,4 +348,5 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',  # Reintentos seguros de los POST (ver api/middleware.py)
 ]
\ No newline at end of file